@@ -109,12 +109,12 @@ def main(argv=None):
     if baseDirPath is None:
         baseDirPath = os.path.join(homeCalcAl,
                                    configApp.get('Resources', 'DatabaseDir'))
-    installUserDatabases(configApp, logger, baseDirPath, dirProject)
 
     # Init database manager
     databaseManager = DatabaseManager.DatabaseManager(configApp,
                                                       dirProject,
                                                       baseDirPath)
+    installUserDatabases(configApp, logger, baseDirPath, dirProject, databaseManager)
 
     # Launch GUI
     CalcAlGUI.CalcAlGUI(configApp, dirProject, databaseManager).mainloop()
@@ -182,8 +182,10 @@ def setLocaleCalcal(configApp, dirProject):
         os.environ['LANG'] = locale.getlocale()[0]
     gettext.install(configApp.get('Resources', 'MessageNameFile'), localeDirPath)
 
-def installUserDatabases(configApp, logger, baseDirPath, dirProject):
-    """ Init user database location and user demo database """
+def installUserDatabases(configApp, logger, baseDirPath, dirProject, databaseManager):
+    """ Init user database location and user demo database
+        V0.56 : layered demo database only holds user data,
+                demo database of installation directory is its reference """
 
     if not os.path.exists(baseDirPath):
         os.mkdir(baseDirPath)
@@ -197,8 +199,14 @@ def installUserDatabases(configApp, logger, baseDirPath, dirProject):
     pathDBDemo = os.path.join(baseDirPath,
                               configApp.get('Resources', 'DemoDatabaseName2017'))
     if not os.path.exists(pathDBDemo):
-        shutil.copyfile(pathDBDemoSvg, pathDBDemo)
-        logger.info(_("Demo DB copied") + " : " + pathDBDemo)
+        if configApp.getboolean('Resources', 'LayeredDemoDatabase'):
+            databaseManager.createLayeredDatabase(configApp.get('Resources',
+                                                                'DemoDatabaseName2017'),
+                                                  pathDBDemoSvg)
+            logger.info(_("Demo DB created on reference") + " : " + pathDBDemoSvg)
+        else:
+            shutil.copyfile(pathDBDemoSvg, pathDBDemo)
+            logger.info(_("Demo DB copied") + " : " + pathDBDemo)
     else:
         logger.info(_("Demo DB already exists") + " : " + pathDBDemo)
 
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+************************************************************************************
+Class  : AsyncDatabase
+Author : Thierry Maillard (TMD)
+Date  : 18/10/2026
+
+Role : Execute Database read requests in a dedicated thread, awaited by asyncio coroutines.
+
+GUI frames must not be frozen by slow requests : a coroutine awaits the result of
+a Database method executed by the database thread on a read only connection
+of the pool, then updates widgets.
+Cancelling the awaiting task cancels the request : if it is not started, it is never
+executed, if it is running, its SQL statement is interrupted.
+Requests superseded by a newer one of the same kind (a search updated at each
+keystroke) are cancelled by cancelling their task : see gui/AsyncTkBridge.runTask().
+Modifications are still done by Database writer connection in GUI thread.
+
+Licence : GPLv3
+Copyright (c) 2016 - Thierry Maillard
+
+This file is part of CalcAl project.
+
+CalcAl project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CalcAl project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
+************************************************************************************
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+
+class AsyncDatabase():
+    """ Awaitable read requests on a Database executed by a dedicated thread """
+
+    def __init__(self, configApp, database):
+        """ Initialize facade on opened Database database : thread started on first request """
+        self.configApp = configApp
+        self.database = database
+        self.logger = logging.getLogger(self.configApp.get('Log', 'LoggerName'))
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                              thread_name_prefix="CalcAlDatabase")
+        # Connections used by running requests : {request Id : connection}
+        self.dictRunningConnections = dict()
+        self.lock = threading.Lock()
+
+    def runRequest(self, requestId, methodName, args):
+        """ Executed by database thread : return result of methodName(*args)
+            called on a Database using a read only connection """
+        readerDatabase = self.database.getReaderDatabase()
+        try:
+            with self.lock:
+                self.dictRunningConnections[requestId] = readerDatabase.connDB
+            return getattr(readerDatabase, methodName)(*args)
+        finally:
+            with self.lock:
+                del self.dictRunningConnections[requestId]
+            self.database.releaseReaderDatabase(readerDatabase)
+
+    async def call(self, methodName, *args):
+        """ Return result of Database method methodName(*args) executed by database thread
+            If awaiting task is cancelled, request is cancelled or interrupted """
+        requestId = object()
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.runRequest,
+                                                            requestId, methodName, args)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Running request : its connection is interrupted only while used by it
+            with self.lock:
+                connDB = self.dictRunningConnections.get(requestId)
+                if connDB is not None:
+                    connDB.interrupt()
+            self.logger.debug("AsyncDatabase : " + methodName + " cancelled")
+            raise
+
+    def close(self):
+        """ Cancel pending requests, interrupt running ones and stop database thread
+            Must be called before closing Database """
+        with self.lock:
+            for connDB in self.dictRunningConnections.values():
+                connDB.interrupt()
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+************************************************************************************
+Class  : ChangeTracker
+Author : Thierry Maillard (TMD)
+Date  : 18/10/2026
+
+Role : Detect tables modified in a database by other programs.
+
+Another CalcAl instance may write in the same database file.
+PRAGMA data_version of a connection changes only when another connection
+commits : it is cheap enough to be polled.
+When it has changed, counters of table tablesChanges, incremented by triggers
+(see SchemaMigrator migration 12), tell which tables were modified.
+Changes made by the connection itself are not reported.
+
+Licence : GPLv3
+Copyright (c) 2016 - Thierry Maillard
+
+This file is part of CalcAl project.
+
+CalcAl project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CalcAl project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
+************************************************************************************
+"""
+import logging
+
+class ChangeTracker():
+    """ Tables modified by other connections since last check """
+
+    def __init__(self, configApp, connDB):
+        """ Initialize tracker on connection connDB : current state is the reference """
+        self.configApp = configApp
+        self.connDB = connDB
+        self.logger = logging.getLogger(self.configApp.get('Log', 'LoggerName'))
+        self.dataVersion = self.readDataVersion()
+        self.totalChanges = self.connDB.total_changes
+        self.dictCounters = self.readCounters()
+
+    def readDataVersion(self):
+        """ Return data version of this connection """
+        cursor = self.connDB.cursor()
+        cursor.execute("PRAGMA data_version")
+        dataVersion = cursor.fetchone()[0]
+        cursor.close()
+        return dataVersion
+
+    def readCounters(self):
+        """ Return dict {tableName : number of changes} """
+        cursor = self.connDB.cursor()
+        cursor.execute("SELECT tableName, counter FROM tablesChanges")
+        dictCounters = dict(cursor.fetchall())
+        cursor.close()
+        return dictCounters
+
+    def getChangedTables(self):
+        """ Return set of tables names modified by other connections since last call
+            If this connection has also modified some of them, they are reported too """
+        dataVersion = self.readDataVersion()
+        totalChanges = self.connDB.total_changes
+        if dataVersion == self.dataVersion and totalChanges == self.totalChanges:
+            return set()
+        dictCounters = self.readCounters()
+        setChangedTables = set()
+        if dataVersion != self.dataVersion:
+            setChangedTables = set(tableName for tableName, counter in dictCounters.items()
+                                   if counter != self.dictCounters.get(tableName))
+            self.logger.debug("ChangeTracker : tables modified by another program : " +
+                              ", ".join(sorted(setChangedTables)))
+        self.dataVersion = dataVersion
+        self.totalChanges = totalChanges
+        self.dictCounters = dictCounters
+        return setChangedTables
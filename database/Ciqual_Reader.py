@@ -104,13 +104,24 @@ class Ciqual_Reader():
                 urlSource TEXT
                 )""")
         # Create constituants values table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS constituantsValues(
-                productCode INTEGER,
-                constituantCode INTEGER,
-                value REAL,
-                qualifValue TEXT
-                )""")
+        # V0.56 : compact layout : values clustered on their primary key
+        if self.configApp.getboolean('Database', 'CompactValuesLayout'):
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS constituantsValues(
+                    productCode INTEGER NOT NULL,
+                    constituantCode INTEGER NOT NULL,
+                    value REAL,
+                    qualifValue TEXT,
+                    PRIMARY KEY(productCode, constituantCode)
+                    ) WITHOUT ROWID""")
+        else:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS constituantsValues(
+                    productCode INTEGER,
+                    constituantCode INTEGER,
+                    value REAL,
+                    qualifValue TEXT
+                    )""")
 
         # Source for Ciqual file
         self.source = os.path.basename(pathXlsFileInit)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+************************************************************************************
+Class  : ConnectionPool
+Author : Thierry Maillard (TMD)
+Date  : 18/10/2026
+
+Role : Own sqlite connections to one database file.
+
+One writer connection is used by Database in GUI thread.
+Read only connections are lent to background tasks (search threads) and given back
+when task is over : they are reused by next tasks instead of reopening database.
+In WAL journal mode, readers never block and are never blocked by the writer.
+Layered database : reference tables are read in a shared file attached read only
+to each connection, user tables are in the database file itself.
+
+Licence : GPLv3
+Copyright (c) 2016 - Thierry Maillard
+
+This file is part of CalcAl project.
+
+CalcAl project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CalcAl project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
+************************************************************************************
+"""
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+
+from util import QualifierReducer
+from util import StringUtil
+from . import QueryStats
+
+class ConnectionPool():
+    """ One writer connection and a pool of read only connections to a database """
+
+    # V0.56 : tables of a layered database found in reference file and in user file :
+    #   (table name, columns)
+    LAYERED_TABLES = (("products", "familyName, code, name, source, dateSource, urlSource"),
+                      ("constituantsValues", "productCode, constituantCode, value, qualifValue"),
+                      ("constituantsNames", "code, name, unit, shortcut"))
+
+    def __init__(self, configApp, databasePath):
+        """ Initialize a pool for database file databasePath : no connection opened """
+        self.configApp = configApp
+        self.databasePath = databasePath
+        self.logger = logging.getLogger(self.configApp.get('Log', 'LoggerName'))
+        self.isWALMode = self.configApp.getboolean('Database', 'WALMode')
+        self.synchronous = self.configApp.get('Database', 'Synchronous').upper()
+        if self.synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError("ConnectionPool : invalid [Database] Synchronous value : " +
+                             self.synchronous)
+        self.nbMaxIdleReaders = int(self.configApp.get('Database', 'NbMaxIdleReaders'))
+        self.cacheSizeKiB = int(self.configApp.get('Database', 'CacheSizeKiB'))
+        self.mmapSizeMB = int(self.configApp.get('Database', 'MmapSizeMB'))
+        self.nbCachedStatements = int(self.configApp.get('Database', 'StatementsCacheSize'))
+        self.qualifierReducer = QualifierReducer.QualifierReducer(self.configApp)
+        self.queryStats = None
+        if self.configApp.getboolean('Database', 'QueryStatsEnabled'):
+            self.queryStats = QueryStats.QueryStats(self.configApp)
+        self.referencePath = None
+        self.writerConnection = None
+        self.listIdleReaders = []
+        self.listReaders = []
+        self.lock = threading.Lock()
+        self.threadLocal = threading.local()
+
+    def connect(self, database, **kwargs):
+        """ Open a new connection to database with statements cache
+            and requests measurement if configured """
+        if self.queryStats is not None:
+            connDB = sqlite3.connect(database, cached_statements=self.nbCachedStatements,
+                                     factory=QueryStats.InstrumentedConnection, **kwargs)
+            connDB.queryStats = self.queryStats
+        else:
+            connDB = sqlite3.connect(database, cached_statements=self.nbCachedStatements,
+                                     **kwargs)
+        return connDB
+
+    def getQueryStats(self):
+        """ Return QueryStats object shared by all connections, None if disabled """
+        return self.queryStats
+
+    def configureConnection(self, connDB):
+        """ Set performance pragmas and SQL functions used by CalcAl on a new connection """
+        cursor = connDB.cursor()
+        cursor.execute("PRAGMA cache_size = " + str(-self.cacheSizeKiB))
+        cursor.execute("PRAGMA mmap_size = " + str(self.mmapSizeMB * 1024 * 1024))
+        # V0.56 : cascading deletes of user tables details
+        cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.close()
+        # V0.56 : used by products names index triggers and searches
+        connDB.create_function("foldName", 1, StringUtil.foldName, deterministic=True)
+        # V0.56 : used to compute totals of portions and groups in SQL
+        connDB.create_function("reduceQualifier", 2, self.qualifierReducer.reduce,
+                               deterministic=True)
+        if self.referencePath is not None:
+            self.attachReference(connDB)
+
+    def setReferenceDatabase(self, referencePath):
+        """ V0.56 : Read reference tables of a layered database in file referencePath
+            Attached to writer connection and to readers opened after this call """
+        if self.referencePath is None:
+            self.referencePath = referencePath
+            if self.writerConnection is not None:
+                self.attachReference(self.writerConnection)
+
+    def attachReference(self, connDB):
+        """ V0.56 : Attach reference file as schema ref to connDB
+            Read only file is immutable : sqlite doesn't lock it nor look for its journal,
+            a file that can be written by another program is read with locks and journal
+            Temporary views hide user tables of the same name : requests read both files,
+            modifications must be written in main tables """
+        uriReference = pathlib.Path(self.referencePath).absolute().as_uri() + "?mode=ro"
+        if not os.access(self.referencePath, os.W_OK):
+            uriReference += "&immutable=1"
+        cursor = connDB.cursor()
+        cursor.execute("ATTACH DATABASE ? AS ref", (uriReference,))
+        for tableName, columns in self.LAYERED_TABLES:
+            cursor.execute("CREATE TEMP VIEW " + tableName + " AS " +
+                           "SELECT " + columns + " FROM ref." + tableName + " UNION ALL " +
+                           "SELECT " + columns + " FROM main." + tableName)
+        cursor.close()
+
+    def getWriterConnection(self):
+        """ Return the writer connection, open it on first call
+            WAL mode and auto vacuum mode are recorded in database file by this connection """
+        if self.writerConnection is None:
+            self.writerConnection = self.connect(self.databasePath)
+            # V0.56 : free pages given back by maintenance without rebuilding database,
+            #   applied to new databases, and to existing ones by their next VACUUM
+            self.writerConnection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            if self.isWALMode:
+                cursor = self.writerConnection.cursor()
+                cursor.execute("PRAGMA journal_mode = WAL")
+                journalMode = cursor.fetchone()[0]
+                cursor.close()
+                if journalMode.lower() != "wal":
+                    self.logger.warning("ConnectionPool : WAL mode not available for " +
+                                        self.databasePath + ", journal mode : " + journalMode)
+            # V0.56 : durability level of writer commits
+            self.writerConnection.execute("PRAGMA synchronous = " + self.synchronous)
+            self.configureConnection(self.writerConnection)
+        return self.writerConnection
+
+    def acquireReader(self):
+        """ Return a read only connection for calling thread
+            A thread acquiring twice gets the same connection
+            Connection must be given back with releaseReader() """
+        connDB = getattr(self.threadLocal, "connDB", None)
+        if connDB is not None:
+            self.threadLocal.nbAcquire += 1
+            return connDB
+        with self.lock:
+            if self.listIdleReaders:
+                connDB = self.listIdleReaders.pop()
+        if connDB is None:
+            uriDatabase = pathlib.Path(self.databasePath).absolute().as_uri() + "?mode=ro"
+            # Connection is used by only one thread at a time but may change of thread
+            connDB = self.connect(uriDatabase, uri=True, check_same_thread=False)
+            self.configureConnection(connDB)
+            with self.lock:
+                self.listReaders.append(connDB)
+            self.logger.debug("ConnectionPool : new reader, " + str(len(self.listReaders)) +
+                              " readers opened")
+        self.threadLocal.connDB = connDB
+        self.threadLocal.nbAcquire = 1
+        return connDB
+
+    def releaseReader(self, connDB):
+        """ Give back a connection obtained with acquireReader() """
+        assert connDB is getattr(self.threadLocal, "connDB", None), \
+            "ConnectionPool/releaseReader() : connection not acquired by this thread"
+        self.threadLocal.nbAcquire -= 1
+        if self.threadLocal.nbAcquire > 0:
+            return
+        self.threadLocal.connDB = None
+        if connDB.in_transaction:
+            connDB.rollback()
+        with self.lock:
+            if len(self.listIdleReaders) < self.nbMaxIdleReaders:
+                self.listIdleReaders.append(connDB)
+                connDB = None
+            else:
+                self.listReaders.remove(connDB)
+        if connDB is not None:
+            connDB.close()
+
+    def getNbReaders(self):
+        """ Return the number of read only connections opened """
+        with self.lock:
+            return len(self.listReaders)
+
+    def close(self):
+        """ Close all connections : readers first, then writer """
+        with self.lock:
+            for connDB in self.listReaders:
+                connDB.close()
+            self.listReaders = []
+            self.listIdleReaders = []
+        if self.writerConnection is not None:
+            self.writerConnection.close()
+            self.writerConnection = None
@@ -26,16 +26,31 @@ You should have received a copy of the GNU General Public License
 along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
 ************************************************************************************
 """
+import bisect
+import contextlib
 import logging
 import os.path
+import pathlib
 import sqlite3
 import time
 
+from . import AsyncDatabase
+from . import ChangeTracker
+from . import ConnectionPool
 from . import DatabaseReaderFactory
+from . import NutrientMatrixCache
+from . import SchemaMigrator
+from util import CalcalExceptions
+from util import StringUtil
 
 class Database():
     """ Define a database """
 
+    # V0.56 : Operators accepted in search filters
+    FILTER_OPERATORS = ("<", "<=", "=", ">=", ">")
+    # V0.56 : portions fields filtered by getPortionsPage()
+    PORTIONS_FILTER_FIELDS = ("name", "date", "patient", "type", "period")
+
     def __init__(self, configApp, dirProject):
         """ Initialize a database
             dirProject : project directory
@@ -47,6 +62,15 @@ class Database():
         self.databasePath = None
         self.connDB = None
         self.dbname = None
+        self.nutrientCache = None
+        self.isProductsNamesIndexed = False
+        self.isPortionTotalsTable = False
+        self.isCatalogTables = False
+        self.connectionPool = None
+        self.changeTracker = None
+        self.referenceDatabasePath = None
+        self.transactionDepth = 0
+        self.asyncDatabase = None
 
     def initDBFromFile(self, databasePath, databaseType, initFile):
         """ Create a new database databasePath by reading a file initFile """
@@ -57,22 +81,389 @@ class Database():
                                                                                  self.connDB,
                                                                                  self.dbname)
         databaseReader.initDBFromFile(initFile)
+        self.upgradeSchema()
+
+    def initLayeredDatabase(self, databasePath, referencePath):
+        """ V0.56 : Create a new layered database databasePath :
+            products, their values and constituants names are read in referencePath file,
+            opened read only and never modified, and in databasePath for products added
+            by user or by joins. User tables are only saved in databasePath. """
+        if not os.path.isfile(referencePath):
+            raise ValueError(_("Reference database not found") + " : " + referencePath)
+        uriReference = pathlib.Path(referencePath).absolute().as_uri() + "?mode=ro"
+        connectionPool = ConnectionPool.ConnectionPool(self.configApp, databasePath)
+        connDB = connectionPool.getWriterConnection()
+        try:
+            cursor = connDB.cursor()
+            cursor.execute("ATTACH DATABASE ? AS ref", (uriReference,))
+            # Same tables structures as in reference file
+            for tableName in ("products", "constituantsNames"):
+                cursor.execute("SELECT sql FROM ref.sqlite_master WHERE type='table' AND name=?",
+                               (tableName,))
+                cursor.execute(cursor.fetchone()[0])
+            cursor.execute("""
+                CREATE TABLE constituantsValues(
+                    productCode INTEGER NOT NULL,
+                    constituantCode INTEGER NOT NULL,
+                    value REAL,
+                    qualifValue TEXT,
+                    PRIMARY KEY(productCode, constituantCode)
+                    ) WITHOUT ROWID""")
+            cursor.execute("""CREATE TABLE IF NOT EXISTS databaseState(
+                                name TEXT PRIMARY KEY,
+                                value TEXT
+                                ) WITHOUT ROWID""")
+            cursor.execute("""INSERT INTO databaseState(name, value)
+                              VALUES('referenceDatabasePath', ?)""",
+                           (os.path.abspath(referencePath),))
+            connDB.commit()
+            cursor.execute("DETACH DATABASE ref")
+            cursor.close()
+        finally:
+            connectionPool.close()
+        self.open(databasePath)
+
+    def getReferenceDatabasePath(self):
+        """ V0.56 : Return path of reference file of a layered database, None if not layered
+            Raise DatabaseException if reference file is missing """
+        cursor = self.connDB.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='databaseState'")
+        referencePath = None
+        if cursor.fetchone() is not None:
+            cursor.execute("SELECT value FROM databaseState WHERE name='referenceDatabasePath'")
+            result = cursor.fetchone()
+            if result is not None:
+                referencePath = result[0]
+        cursor.close()
+        if referencePath is not None and not os.path.isfile(referencePath):
+            raise CalcalExceptions.DatabaseException(self.configApp,
+                                                     _("Reference database not found") +
+                                                     " : " + referencePath)
+        return referencePath
+
+    def existsCatalogTables(self, cursor):
+        """ V0.56 : Return True if families and databaseCounters tables can be used
+            Not used by a layered database : they don't count reference products """
+        cursor.execute("""SELECT 1 FROM sqlite_master
+                          WHERE type='table' AND name='databaseCounters'""")
+        return cursor.fetchone() is not None and self.referenceDatabasePath is None
+
+    def peekInfoDatabase(self, databasePath):
+        """ V0.56 : Return counters of getInfoDatabase() for databasePath
+            without opening it : read only connection, no schema upgrade,
+            no energy correction, counters tables read if available """
+        self.databasePath = databasePath
+        self.dbname = os.path.basename(databasePath)
+        self.connectionPool = ConnectionPool.ConnectionPool(self.configApp, databasePath)
+        try:
+            self.connDB = self.connectionPool.acquireReader()
+            self.referenceDatabasePath = self.getReferenceDatabasePath()
+            if self.referenceDatabasePath is not None:
+                self.connectionPool.setReferenceDatabase(self.referenceDatabasePath)
+                self.connectionPool.attachReference(self.connDB)
+            cursor = self.connDB.cursor()
+            self.isCatalogTables = self.existsCatalogTables(cursor)
+            cursor.close()
+            dictCounters = self.getInfoDatabase()
+            self.connectionPool.releaseReader(self.connDB)
+        finally:
+            self.close()
+        return dictCounters
+
+    def isLayered(self):
+        """ V0.56 : Return True if reference tables are read in a shared file """
+        return self.referenceDatabasePath is not None
 
     def open(self, databasePath):
         """ Open or create a sqlite database """
         self.databasePath = databasePath
-        self.connDB = sqlite3.connect(databasePath)
+        # V0.56 : connections owned by a pool : this one is the writer
+        self.connectionPool = ConnectionPool.ConnectionPool(self.configApp, databasePath)
+        self.connDB = self.connectionPool.getWriterConnection()
         self.dbname = os.path.basename(databasePath)
         self.logger.info("Database : " + databasePath + " opened.")
         self.createUserTables() # V0.32
+        self.referenceDatabasePath = self.getReferenceDatabasePath()
+        self.upgradeSchema()
+        if self.configApp.getboolean('Database', 'NutrientCacheEnabled'):
+            self.nutrientCache = NutrientMatrixCache.NutrientMatrixCache(self.configApp)
+        # V0.56 : changes made by other programs, not available before migration 12
+        cursor = self.connDB.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='tablesChanges'")
+        if cursor.fetchone() is not None:
+            self.changeTracker = ChangeTracker.ChangeTracker(self.configApp, self.connDB)
+        cursor.close()
+
+    def upgradeSchema(self):
+        """ Apply schema migrations not yet applied to this database
+            Migrations are postponed while reference tables are not created :
+            initDBFromFile() calls this method again at the end of the import. """
+        cursor = self.connDB.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='products'")
+        isReferenceTablesCreated = cursor.fetchone() is not None
+        cursor.close()
+        if isReferenceTablesCreated:
+            SchemaMigrator.SchemaMigrator(self.configApp, self.connDB).upgrade()
+        else:
+            self.logger.debug("Database : upgradeSchema postponed, no reference tables")
+        # V0.56 : layered database : migrations only apply to user file,
+        #   then requests read reference and user files
+        if self.referenceDatabasePath is not None:
+            self.connectionPool.setReferenceDatabase(self.referenceDatabasePath)
+            self.queueReferenceEnergyCorrection()
+        cursor = self.connDB.cursor()
+        # V0.56 : names index of a layered database doesn't contain reference products
+        cursor.execute("""SELECT 1 FROM sqlite_master
+                          WHERE type='table' AND name='productsNamesIndex'""")
+        self.isProductsNamesIndexed = cursor.fetchone() is not None and \
+            self.referenceDatabasePath is None
+        self.isCatalogTables = self.existsCatalogTables(cursor)
+        cursor.execute("""SELECT 1 FROM sqlite_master
+                          WHERE type='table' AND name='constituantsStats'""")
+        isStatsToBuild = False
+        if cursor.fetchone() is not None:
+            cursor.execute("SELECT NOT EXISTS(SELECT 1 FROM constituantsStats)")
+            isStatsToBuild = cursor.fetchone()[0]
+        cursor.execute("""SELECT 1 FROM sqlite_master
+                          WHERE type='table' AND name='portionTotals'""")
+        self.isPortionTotalsTable = cursor.fetchone() is not None
+        isPortionTotalsToBuild = False
+        if self.isPortionTotalsTable:
+            cursor.execute("""SELECT NOT EXISTS(SELECT 1 FROM portionTotals) AND
+                                     EXISTS(SELECT 1 FROM portionsDetails)""")
+            isPortionTotalsToBuild = cursor.fetchone()[0]
+        cursor.close()
+        # V0.56 : products inserted or renamed by other programs
+        self.updateProductsNamesIndex()
+        if isStatsToBuild:
+            self.updateConstituantsStats()
+        if isPortionTotalsToBuild:
+            with self.connDB:
+                self.updatePortionTotals()
+
+    def queueReferenceEnergyCorrection(self):
+        """ V0.56 : Queue products of reference file of a layered database
+            for correctEnergyKcal() : migration 5 and its trigger only see products
+            of user file. Done once for each reference file """
+        cursor = self.connDB.cursor()
+        cursor.execute("""SELECT 1 FROM sqlite_master
+                          WHERE type='table' AND name='energyCorrectionPending'""")
+        isQueueToFill = cursor.fetchone() is not None
+        if isQueueToFill:
+            cursor.execute("""SELECT value FROM databaseState
+                              WHERE name='energyCorrectionReference'""")
+            result = cursor.fetchone()
+            isQueueToFill = result is None or result[0] != self.referenceDatabasePath
+        cursor.close()
+        if isQueueToFill:
+            with self.transaction():
+                cursor = self.connDB.cursor()
+                cursor.execute("""INSERT OR IGNORE INTO main.energyCorrectionPending(productCode)
+                                  SELECT code FROM ref.products""")
+                cursor.execute("""INSERT OR REPLACE INTO databaseState(name, value)
+                                  VALUES('energyCorrectionReference', ?)""",
+                               (self.referenceDatabasePath,))
+                cursor.close()
+
+    def getSchemaVersion(self):
+        """ Return the last migration version applied to this database """
+        return SchemaMigrator.SchemaMigrator(self.configApp, self.connDB).getVersion()
 
     def close(self):
         """ Close database """
-        if self.connDB:
-            self.connDB.close()
+        # V0.56 : background requests stopped before closing their connections
+        if self.asyncDatabase is not None:
+            self.asyncDatabase.close()
+            self.asyncDatabase = None
+        if self.connectionPool is not None:
+            self.connectionPool.close()
+            self.connectionPool = None
             self.connDB = None
+            self.nutrientCache = None
+            self.changeTracker = None
+            self.referenceDatabasePath = None
             self.logger.info("Database : " + self.getDbname() + " closed.")
 
+    def getReaderDatabase(self):
+        """ V0.56 : Return a Database object using a read only pooled connection
+            for a background thread
+            Must be given back with releaseReaderDatabase() instead of being closed """
+        readerDatabase = Database(self.configApp, self.dirProject)
+        readerDatabase.databasePath = self.databasePath
+        readerDatabase.dbname = self.dbname
+        readerDatabase.isProductsNamesIndexed = self.isProductsNamesIndexed
+        readerDatabase.isPortionTotalsTable = self.isPortionTotalsTable
+        readerDatabase.isCatalogTables = self.isCatalogTables
+        readerDatabase.referenceDatabasePath = self.referenceDatabasePath
+        readerDatabase.connDB = self.connectionPool.acquireReader()
+        return readerDatabase
+
+    def getAsyncDatabase(self):
+        """ V0.56 : Return facade executing read requests of this database
+            in a background thread for asyncio coroutines, see AsyncDatabase """
+        if self.asyncDatabase is None:
+            self.asyncDatabase = AsyncDatabase.AsyncDatabase(self.configApp, self)
+        return self.asyncDatabase
+
+    def releaseReaderDatabase(self, readerDatabase):
+        """ V0.56 : Give back connection of a Database got with getReaderDatabase() """
+        self.connectionPool.releaseReader(readerDatabase.connDB)
+        readerDatabase.connDB = None
+
+    def getQueryStats(self):
+        """ V0.56 : Return dict[methodName] = dict with keys calls, rows, totalTime, maxTime
+            for SQL requests executed by this database methods since opening
+            Empty dict if QueryStatsEnabled is False """
+        queryStats = self.connectionPool.getQueryStats()
+        if queryStats is None:
+            return dict()
+        return queryStats.getStats()
+
+    def resetQueryStats(self):
+        """ V0.56 : Set counters of getQueryStats() to 0 """
+        queryStats = self.connectionPool.getQueryStats()
+        if queryStats is not None:
+            queryStats.reset()
+
+    def checkpoint(self):
+        """ V0.56 : Copy WAL journal content in database file
+            to be called before copying database file or measuring its size """
+        cursor = self.connDB.cursor()
+        cursor.execute("PRAGMA main.wal_checkpoint(TRUNCATE)")
+        cursor.close()
+
+    def runMaintenance(self, isAfterBulkOperation=True, isFullVacuumAllowed=True):
+        """ V0.56 : Refresh sqlite planner statistics and give back free pages
+            isAfterBulkOperation : True after import or join : all tables are analyzed,
+                                   else only tables that need it, as sqlite decides
+            Free pages are given back if their ratio is over MaintenanceFreePagesRatio :
+            by incremental vacuum if database allows it, else by VACUUM
+            isFullVacuumAllowed : False to skip VACUUM, that rewrites the whole file
+            Return a report dict with keys :
+                sizeBefore, sizeAfter : file size in bytes
+                freePagesRatio : before maintenance
+                vacuumMode : "", "incremental" or "full"
+                analyzeTime, optimizeTime, vacuumTime : in seconds """
+        maxFreePagesRatio = float(self.configApp.get('Database', 'MaintenanceFreePagesRatio'))
+        if self.connDB.in_transaction:
+            self.connDB.commit()
+        dictReport = dict()
+        self.checkpoint()
+        dictReport["sizeBefore"] = os.path.getsize(self.databasePath)
+        cursor = self.connDB.cursor()
+
+        startTime = time.perf_counter()
+        if isAfterBulkOperation:
+            cursor.execute("ANALYZE main")
+            self.connDB.commit()
+        dictReport["analyzeTime"] = time.perf_counter() - startTime
+
+        startTime = time.perf_counter()
+        cursor.execute("PRAGMA main.optimize")
+        self.connDB.commit()
+        dictReport["optimizeTime"] = time.perf_counter() - startTime
+
+        cursor.execute("PRAGMA freelist_count")
+        nbFreePages = cursor.fetchone()[0]
+        cursor.execute("PRAGMA page_count")
+        nbPages = cursor.fetchone()[0]
+        dictReport["freePagesRatio"] = nbFreePages / nbPages if nbPages > 0 else 0.0
+        cursor.execute("PRAGMA auto_vacuum")
+        isIncremental = cursor.fetchone()[0] == 2
+        cursor.close()
+
+        startTime = time.perf_counter()
+        dictReport["vacuumMode"] = ""
+        if dictReport["freePagesRatio"] > maxFreePagesRatio:
+            # executescript() runs pragma until all pages are freed
+            if isIncremental:
+                dictReport["vacuumMode"] = "incremental"
+                self.connDB.executescript("PRAGMA incremental_vacuum")
+            elif isFullVacuumAllowed:
+                dictReport["vacuumMode"] = "full"
+                self.connDB.execute("VACUUM")
+        dictReport["vacuumTime"] = time.perf_counter() - startTime
+
+        self.checkpoint()
+        dictReport["sizeAfter"] = os.path.getsize(self.databasePath)
+        self.logger.info("Database/runMaintenance() : " + self.getDbname() + " : " +
+                         str(dictReport["sizeBefore"]) + " -> " +
+                         str(dictReport["sizeAfter"]) + " bytes, vacuum " +
+                         (dictReport["vacuumMode"] or "not needed"))
+        return dictReport
+
+    def getExternalChanges(self):
+        """ V0.56 : Return set of tables names modified by another program
+            since last call, empty set if none or if changes are not tracked
+            Nutrient cache is invalidated if products or their values changed """
+        if self.changeTracker is None:
+            return set()
+        setChangedTables = self.changeTracker.getChangedTables()
+        if setChangedTables & {"products", "compositionProducts", "databaseState"}:
+            self.invalidateNutrientCache()
+        return setChangedTables
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """ V0.56 : Unit of work : modifications done in this context are committed once
+            when leaving it, cancelled if an exception is raised
+            Nested contexts are savepoints : an exception cancels only their modifications
+            Usage : with database.transaction(): ... """
+        savepointName = "unitOfWork" + str(self.transactionDepth)
+        if self.transactionDepth == 0:
+            # Pending modifications of callers not using this context are in transaction
+            if not self.connDB.in_transaction:
+                self.connDB.execute("BEGIN IMMEDIATE")
+        else:
+            self.connDB.execute("SAVEPOINT " + savepointName)
+        self.transactionDepth += 1
+        try:
+            yield self
+        except BaseException:
+            self.transactionDepth -= 1
+            if self.transactionDepth == 0:
+                self.connDB.rollback()
+            else:
+                self.connDB.execute("ROLLBACK TO " + savepointName)
+                self.connDB.execute("RELEASE " + savepointName)
+            raise
+        self.transactionDepth -= 1
+        if self.transactionDepth == 0:
+            self.connDB.commit()
+        else:
+            self.connDB.execute("RELEASE " + savepointName)
+
+    def isInTransaction(self):
+        """ V0.56 : Return True if called in a transaction() context """
+        return self.transactionDepth > 0
+
+    def getDataVersion(self):
+        """ V0.56 : Return data version of writer connection :
+            changed only when another connection commits in database file """
+        cursor = self.connDB.cursor()
+        cursor.execute("PRAGMA data_version")
+        dataVersion = cursor.fetchone()[0]
+        cursor.close()
+        return dataVersion
+
+    def isModified(self):
+        """ V0.56 : Return True if database has been modified since it was opened """
+        return self.connDB is not None and self.connDB.total_changes > 0
+
+    def getNutrientCache(self):
+        """ V0.56 : Return nutrient cache loaded on first call
+            or None if cache is disabled or over its memory budget """
+        nutrientCache = self.nutrientCache
+        if nutrientCache is not None and not nutrientCache.isLoaded():
+            if nutrientCache.isOverBudget or not nutrientCache.load(self.connDB):
+                nutrientCache = None
+        return nutrientCache
+
+    def invalidateNutrientCache(self):
+        """ Called when reference tables are modified """
+        if self.nutrientCache is not None:
+            self.nutrientCache.invalidate()
+
     def getDatabasePath(self):
         """ Return current database path """
         return self.databasePath
@@ -93,8 +484,15 @@ class Database():
 
     def getListFamilyFoodstuff(self):
         """ Return list of family from products table """
+        nutrientCache = self.getNutrientCache()
+        if nutrientCache is not None:
+            return nutrientCache.getListFamilyFoodstuff()
         cursor = self.connDB.cursor()
-        cursor.execute("SELECT DISTINCT familyName FROM products ORDER BY familyName")
+        # V0.56 : families catalog kept up to date by triggers
+        if self.isCatalogTables:
+            cursor.execute("SELECT familyName FROM families ORDER BY familyName")
+        else:
+            cursor.execute("SELECT DISTINCT familyName FROM products ORDER BY familyName")
         listFamilyFoodstuff = [familyName[0] for familyName in cursor.fetchall()]
         cursor.close()
         self.logger.info(str(len(listFamilyFoodstuff)) + " family names available.")
@@ -102,6 +500,9 @@ class Database():
 
     def getListFoodstuffName(self, familyname):
         """ Return list of name in products table belonging to familyname """
+        nutrientCache = self.getNutrientCache()
+        if nutrientCache is not None:
+            return nutrientCache.getListFoodstuffName(familyname)
         cursor = self.connDB.cursor()
         cursor.execute("SELECT DISTINCT name FROM products WHERE familyName=? ORDER BY name",
                        (familyname,))
@@ -112,6 +513,9 @@ class Database():
 
     def existFoodstuffName(self, foodname):
         """ Return True if foodname exists in database """
+        nutrientCache = self.getNutrientCache()
+        if nutrientCache is not None:
+            return nutrientCache.existFoodstuffName(foodname)
         cursor = self.connDB.cursor()
         cursor.execute("SELECT DISTINCT name FROM products WHERE name=?",
                        (foodname,))
@@ -122,6 +526,9 @@ class Database():
 
     def getFamily4FoodName(self, foodName):
         """ Given a foodName return its family name """
+        nutrientCache = self.getNutrientCache()
+        if nutrientCache is not None:
+            return nutrientCache.getFamily4FoodName(foodName)
         cursor = self.connDB.cursor()
         familyName = []
         cursor.execute(""" SELECT familyName FROM products WHERE name=?""", (foodName,))
@@ -134,80 +541,236 @@ class Database():
             partWildcard may contain wilcards handle by sqlite3 like * or ?
             The asterisk sign represents zero or multiple numbers or characters.
             The ? represents a single number or character.
-            1st letter case is ignored
-            27/12/2016 : Pb capitalising all letters when there is accent."""
+            V0.56 : case and accents are ignored,
+            products names trigram index is used if available,
+            products not yet indexed are compared one by one."""
+        nutrientCache = self.getNutrientCache()
+        if nutrientCache is not None:
+            return nutrientCache.getProductsNamesContainingPart(partWildcard)
         cursor = self.connDB.cursor()
-        partWildcardLower = "*" + partWildcard + "*"
-        partWildcardCap = "*" + partWildcard.capitalize() + "*"
-        cursor.execute("""SELECT name FROM products
-        				WHERE name GLOB ? OR name GLOB ?
-        				ORDER BY name""",
-                       (partWildcardLower, partWildcardCap))
+        partWildcardFolded = "*" + StringUtil.foldName(partWildcard) + "*"
+        if self.isProductsNamesIndexed:
+            cursor.execute("""SELECT name FROM products
+                              WHERE code IN (SELECT rowid FROM productsNamesIndex
+                                             WHERE foldedName GLOB ?) OR
+                                    (code IN (SELECT productCode
+                                              FROM productsNamesIndexPending) AND
+                                     foldName(name) GLOB ?)
+                              ORDER BY name""",
+                           (partWildcardFolded, partWildcardFolded))
+        else:
+            cursor.execute("""SELECT name FROM products
+                              WHERE foldName(name) GLOB ?
+                              ORDER BY name""",
+                           (partWildcardFolded,))
         listeFoodstuffName = [name[0] for name in cursor.fetchall()]
         cursor.close()
         self.logger.info(str(len(listeFoodstuffName)) + " products names available for " +
                          partWildcard)
         return listeFoodstuffName
 
+    def updateProductsNamesIndex(self):
+        """ V0.56 : Index names of products listed in productsNamesIndexPending
+            by triggers : names are folded by foldName(), only known by CalcAl """
+        if not self.isProductsNamesIndexed:
+            return
+        with self.transaction():
+            cursor = self.connDB.cursor()
+            cursor.execute("""DELETE FROM productsNamesIndex
+                              WHERE rowid IN (SELECT productCode
+                                              FROM productsNamesIndexPending)""")
+            cursor.execute("""INSERT INTO productsNamesIndex(rowid, foldedName)
+                              SELECT code, foldName(name) FROM products
+                              WHERE code IN (SELECT productCode
+                                             FROM productsNamesIndexPending)""")
+            cursor.execute("DELETE FROM productsNamesIndexPending")
+            cursor.close()
+
     def getMinMaxForConstituants(self):
-        """ Get Min and Max values for each constituant """
+        """ Get Min and Max values for each constituant
+            V0.56 : read in constituantsStats table """
         cursor = self.connDB.cursor()
         cursor.execute("""
-                        SELECT constituantCode, shortcut, unit, MIN(value), MAX(value)
-                            FROM constituantsValues
+                        SELECT constituantCode, shortcut, unit, minValue, maxValue
+                            FROM constituantsStats
                             INNER JOIN constituantsNames
-                            ON constituantsValues.constituantCode = constituantsNames.code
-                            GROUP BY constituantCode
+                            ON constituantsStats.constituantCode = constituantsNames.code
+                            WHERE nbValues > 0
                             ORDER BY shortcut
                         """)
         listMinMax = cursor.fetchall()
         cursor.close()
         return listMinMax
 
-    def getProductComponents4Filters(self, listFilters, messageQueue):
-        """ Return list by filter [dict[product] = [constituantCode, qualifValue, value]]
-            that match the listfilter
+    def updateConstituantsStats(self):
+        """ V0.56 : Compute statistics on values of all constituants
+            Called after import or join of databases
+            Buckets bounds are values at regular ranks in sorted values """
+        nbBuckets = int(self.configApp.get('Search', 'nbStatsBuckets'))
+        cursor = self.connDB.cursor()
+        cursor.execute("SELECT COUNT(*) FROM products")
+        nbProducts = cursor.fetchone()[0]
+        cursor.execute("""SELECT constituantCode, value FROM constituantsValues
+                          WHERE value IS NOT NULL
+                          ORDER BY constituantCode, value""")
+        listStats = []
+        listValues = []
+        constituantCodePrev = None
+        for constituantCode, value in cursor.fetchall() + [(None, None)]:
+            if constituantCode != constituantCodePrev and listValues:
+                nbValues = len(listValues)
+                buckets = [listValues[(nbValues - 1) * numBound // nbBuckets]
+                           for numBound in range(nbBuckets + 1)]
+                listStats.append((constituantCodePrev, listValues[0], listValues[-1],
+                                  nbValues, max(nbProducts - nbValues, 0),
+                                  ";".join([repr(bound) for bound in buckets])))
+                listValues = []
+            constituantCodePrev = constituantCode
+            listValues.append(value)
+        cursor.execute("DELETE FROM constituantsStats")
+        cursor.executemany("""INSERT INTO constituantsStats(constituantCode, minValue, maxValue,
+                                                            nbValues, nbNulls, buckets)
+                              VALUES(?, ?, ?, ?, ?, ?)""", listStats)
+        self.connDB.commit()
+        cursor.close()
+        self.logger.info("Database : statistics computed for " + str(len(listStats)) +
+                         " constituants")
+
+    def getConstituantsStats(self, listConstituantsCodes):
+        """ V0.56 : Return dict[constituantCode] = [minValue, maxValue, nbValues, nbNulls,
+            list of buckets bounds] for constituants in listConstituantsCodes """
+        cursor = self.connDB.cursor()
+        cursor.execute("""SELECT constituantCode, minValue, maxValue, nbValues, nbNulls, buckets
+                          FROM constituantsStats
+                          WHERE constituantCode IN (""" +
+                       ",".join("?" * len(listConstituantsCodes)) + ")",
+                       list(listConstituantsCodes))
+        dictStats = {result[0]: [result[1], result[2], result[3], result[4],
+                                 [float(bound) for bound in result[5].split(";")]]
+                     for result in cursor.fetchall()}
+        cursor.close()
+        return dictStats
+
+    @staticmethod
+    def getRatioBelow(buckets, level, isIncluded):
+        """ V0.56 : Estimate ratio of values lower than level (or equal if isIncluded)
+            buckets : bounds of groups containing the same number of values """
+        nbBuckets = len(buckets) - 1
+        if isIncluded:
+            nbBoundsBelow = bisect.bisect_right(buckets, level)
+        else:
+            nbBoundsBelow = bisect.bisect_left(buckets, level)
+        if nbBoundsBelow == 0:
+            return 0.0
+        if nbBoundsBelow > nbBuckets:
+            return 1.0
+        lower = buckets[nbBoundsBelow - 1]
+        upper = buckets[nbBoundsBelow]
+        return (nbBoundsBelow - 1 + (level - lower) / (upper - lower)) / nbBuckets
+
+    def getSelectivity4Filters(self, listFilters, dictStats=None):
+        """ V0.56 : Estimate for each filter of listFilters the ratio of products it selects
+            Return list of ratios in listFilters order """
+        if dictStats is None:
+            dictStats = self.getConstituantsStats(set(fields[0] for fields in listFilters))
+        listSelectivity = []
+        for constituantCode, selectedOperator, level, dummy in listFilters:
+            selectivity = 0.0
+            if constituantCode in dictStats:
+                dummy, dummy, nbValues, nbNulls, buckets = dictStats[constituantCode]
+                if selectedOperator == "<":
+                    ratio = self.getRatioBelow(buckets, level, False)
+                elif selectedOperator == "<=":
+                    ratio = self.getRatioBelow(buckets, level, True)
+                elif selectedOperator == ">":
+                    ratio = 1.0 - self.getRatioBelow(buckets, level, True)
+                elif selectedOperator == ">=":
+                    ratio = 1.0 - self.getRatioBelow(buckets, level, False)
+                else:
+                    ratio = self.getRatioBelow(buckets, level, True) - \
+                            self.getRatioBelow(buckets, level, False)
+                if nbValues + nbNulls > 0:
+                    selectivity = ratio * nbValues / (nbValues + nbNulls)
+            listSelectivity.append(selectivity)
+        return listSelectivity
+
+    def estimateNbProducts4Filters(self, listFilters):
+        """ V0.56 : Estimate number of products selected by all filters of listFilters
+            Filters are considered as independent """
+        cursor = self.connDB.cursor()
+        cursor.execute("SELECT COUNT(*) FROM products")
+        nbEstimated = float(cursor.fetchone()[0])
+        cursor.close()
+        for selectivity in self.getSelectivity4Filters(listFilters):
+            nbEstimated *= selectivity
+        return int(round(nbEstimated))
+
+    def getProductComponents4Filters(self, listFilters, nbMaxResults):
+        """ V0.56 : Return products that match all filters of listFilters
+            listFilters : list of [constituantCode, operator, level, constituantName]
+            Filters are compiled in one SQL request : one join per filter
+            joined from the most selective to the least according constituants stats
+            Return at most nbMaxResults + 1 lines [name, [[qualifValue, value], ...]]
+            with one [qualifValue, value] for each constituant in filters order :
+            more than nbMaxResults lines means that some products are not returned.
             """
         if len(listFilters) == 0:
             raise ValueError(_("Please select at least one operator in a filter line"))
 
-        numFilter = 1
-        numberResults = 0
-        messageproductsCondition = ""
-        listDictProductValues = []
-        for constituantCode, selectedOperator, level, constituantName in listFilters:
-            dictProductValues = {}
-            # Build condition for extraction of products from BD
-            condition = " AND constituantCode=" + str(constituantCode) + \
-                " AND value" + selectedOperator + str(level)
-            productValues = self.getProductNamesCondition(condition)
-            for product in productValues:
-                dictProductValues[product[0]] = [product[1], product[2], product[3]]
-            numberResults += len(productValues)
-            messageproductsCondition = _("Filter") + " " + str(numFilter) + " : " + \
-                                        constituantName + " : " + \
-                                        str(len(productValues)) + " " + _("results")
-            messageQueue.put(messageproductsCondition)
-            listDictProductValues.append(dictProductValues)
-            numFilter += 1
-        return listDictProductValues
-
-    def getProductNamesCondition(self, condition):
-        """ Return a list [name, constituantCode, qualifValue, value]
-            that mach the given condition on their values """
+        listSelectedFields = []
+        listComponentCodes = []
+        for numFilter, (constituantCode, selectedOperator, level, dummy) in \
+                enumerate(listFilters):
+            if selectedOperator not in self.FILTER_OPERATORS:
+                raise ValueError(_("Invalid operator") + " : " + selectedOperator)
+            # Component can be in 2 filters if asked twice by user : take only the first
+            if constituantCode not in listComponentCodes:
+                listComponentCodes.append(constituantCode)
+                alias = "filter" + str(numFilter)
+                listSelectedFields.append(alias + ".qualifValue, " + alias + ".value")
+
+        # CROSS JOIN keeps join order : most selective filter read first with its index
+        listSelectivity = self.getSelectivity4Filters(listFilters)
+        listNumFilters = sorted(range(len(listFilters)),
+                                key=lambda numFilter: listSelectivity[numFilter])
+        aliasFirst = "filter" + str(listNumFilters[0])
+        listJoins = []
+        listConditions = []
+        parameters = []
+        for numFilter in listNumFilters:
+            constituantCode, selectedOperator, level, dummy = listFilters[numFilter]
+            alias = "filter" + str(numFilter)
+            if alias == aliasFirst:
+                listJoins.append("constituantsValues AS " + alias)
+            else:
+                listJoins.append("CROSS JOIN constituantsValues AS " + alias + " ON " +
+                                 alias + ".productCode = " + aliasFirst + ".productCode")
+            # Unary + : joined filters are read by product, not by level index
+            valueField = alias + ".value " if alias == aliasFirst else "+" + alias + ".value "
+            listConditions.append(alias + ".constituantCode = ? AND " +
+                                  valueField + selectedOperator + " ?")
+            parameters.extend([constituantCode, level])
+        listJoins.append("CROSS JOIN products ON products.code = " +
+                         aliasFirst + ".productCode")
+        parameters.append(nbMaxResults + 1)
+
         cursor = self.connDB.cursor()
-        cursor.execute("""SELECT products.name, constituantCode, qualifValue, value
-            FROM products, constituantsValues
-            WHERE constituantsValues.productCode = products.code""" + condition)
-        listProductNamesConstitValues = cursor.fetchall()
+        cursor.execute("SELECT products.name, " + ", ".join(listSelectedFields) +
+                       " FROM " + " ".join(listJoins) +
+                       " WHERE " + " AND ".join(listConditions) + " LIMIT ?", parameters)
+        listProductsValues = [[result[0], [list(result[index:index+2])
+                                           for index in range(1, len(result), 2)]]
+                              for result in cursor.fetchall()]
         cursor.close()
-        return listProductNamesConstitValues
+        return listProductsValues
 
     def insertNewComposedProduct(self, productName, familyName,
                                  totalQuantity, dictComponentsQualifierQuantity,
                                  listFoodNameAndQty2Group):
         """ Insert new composed product in database
-            return total quantity for all food """
+            return total quantity for all food
+            V0.56 : if dictComponentsQualifierQuantity is None, components values for 100g
+                    are computed by sqlite with parts values """
         if productName is None or  len(productName.strip()) < 2:
             raise ValueError(_("Invalid food name : use more than one letter"))
 
@@ -217,19 +780,13 @@ class Database():
         assert (listFoodNameAndQty2Group is not None) and len(listFoodNameAndQty2Group) > 1, \
                              "insertNewComposedProduct() : Invalid listFoodNameAndQty2Group"
         try:
-            with self.connDB:
+            with self.transaction():
                 cursor = self.connDB.cursor()
                 # Set the new productCode
                 cursor.execute("SELECT min(code) from products")
                 newProductCode = min(cursor.fetchone()[0] - 1,
                                      int(self.configApp.get('Limits', 'startGroupProductCodes'))-1)
 
-                # Prepare components values to record in database
-                # Format of record to insert : productCode, componentCode, qualifValue, value
-                fieldsComposants = []
-                for componentCode, fields in dictComponentsQualifierQuantity.items():
-                    fieldsComposants.append([newProductCode, componentCode, fields[0], fields[1]])
-
                 # Prepare composition product % to record in database
                 # Format of record to insert : productCode, productCodePart, quantityPercent
                 fieldsCompositionProducts = []
@@ -246,28 +803,115 @@ class Database():
                         VALUES(?, ?, ?)
                         """, fieldsCompositionProducts)
 
+                # V0.56 : Save base products of new group : parts that are groups
+                #   are replaced by their base products already in compositionClosure
+                cursor.execute("""
+                    INSERT INTO compositionClosure(productCode, baseProductCode,
+                                                   quantityPercent)
+                        SELECT ?, baseProductCode, SUM(quantityPercent)
+                        FROM (SELECT compositionClosure.baseProductCode AS baseProductCode,
+                                     compositionProducts.quantityPercent *
+                                         compositionClosure.quantityPercent / 100.0
+                                         AS quantityPercent
+                              FROM compositionProducts
+                                JOIN compositionClosure
+                                  ON compositionClosure.productCode =
+                                         compositionProducts.productCodePart
+                              WHERE compositionProducts.productCode = ?
+                              UNION ALL
+                              SELECT productCodePart, quantityPercent
+                              FROM compositionProducts
+                              WHERE productCode = ? AND
+                                    productCodePart NOT IN
+                                        (SELECT productCode FROM compositionClosure))
+                        GROUP BY baseProductCode
+                    """, (newProductCode, newProductCode, newProductCode))
+
                 # Save components values of new product
-                cursor.executemany("""
-                    INSERT INTO constituantsValues(productCode, constituantCode,
-                                                   qualifValue, value)
-                    VALUES(?, ?, ?, ?)
-                    """, fieldsComposants)
+                if dictComponentsQualifierQuantity is None:
+                    dictComponentsQualifierQuantity = \
+                        self.insertComposedProductValues(cursor, newProductCode, totalQuantity)
+                else:
+                    # Format of record to insert : productCode, componentCode, qualifValue, value
+                    fieldsComposants = []
+                    for componentCode, fields in dictComponentsQualifierQuantity.items():
+                        fieldsComposants.append([newProductCode, componentCode,
+                                                 fields[0], fields[1]])
+                    cursor.executemany("""
+                        INSERT INTO main.constituantsValues(productCode, constituantCode,
+                                                            qualifValue, value)
+                        VALUES(?, ?, ?, ?)
+                        """, fieldsComposants)
 
                 # Insert new composed product in products table
+                # V0.56 : name may be used in reference file of a layered database
+                cursor.execute("SELECT 1 FROM products WHERE name=?", (productName,))
+                if cursor.fetchone() is not None:
+                    raise ValueError(
+                        _("Problem with this new composition product (name already exist)") +
+                        " : " + productName)
                 source = "Group"
                 dateSource = time.strftime("%G")
                 urlSource = "Group"
                 cursor.execute("""
-                    INSERT INTO products(familyName, code, name, source, dateSource, urlSource)
+                    INSERT INTO main.products(familyName, code, name, source, dateSource,
+                                              urlSource)
                     VALUES(?, ?, ?, ?, ?, ?)
                     """, (familyName, newProductCode, productName,
                           source, dateSource, urlSource))
+                self.updateProductsNamesIndex() # V0.56
+
+                # V0.56 : Update constituants statistics with new product values
+                #   buckets bounds are kept until next updateConstituantsStats()
+                cursor.execute("UPDATE constituantsStats SET nbNulls = nbNulls + 1")
+                cursor.executemany("""
+                    UPDATE constituantsStats
+                        SET minValue = MIN(minValue, ?), maxValue = MAX(maxValue, ?),
+                            nbValues = nbValues + 1, nbNulls = nbNulls - 1
+                        WHERE constituantCode = ?
+                    """, [(fields[1], fields[1], componentCode)
+                          for componentCode, fields in dictComponentsQualifierQuantity.items()
+                          if fields[1] is not None])
 
                 cursor.close()
         except sqlite3.IntegrityError:
             raise ValueError(_("Problem with this new composition product (name already exist)") +
                              " : " + productName)
 
+        if self.nutrientCache is not None:
+            self.nutrientCache.addProduct((productName, newProductCode, familyName,
+                                           source, dateSource, urlSource),
+                                          dictComponentsQualifierQuantity)
+
+    @staticmethod
+    def insertComposedProductValues(cursor, newProductCode, totalQuantity):
+        """ V0.56 : Compute and save values for 100g of a new composed product
+            with its parts in compositionProducts : same result as TotalLine
+            for all constituants with missing values counted for 0 with qualifier '-'
+            Return dict[constituantCode] = [qualifValue, value] saved """
+        cursor.execute("""
+            INSERT INTO main.constituantsValues(productCode, constituantCode, qualifValue, value)
+                SELECT ?, constituantCode,
+                       reduceQualifier(qualifiers, value100g * ? / 100.0), value100g
+                FROM (SELECT constituantsNames.code AS constituantCode,
+                             SUM(compositionProducts.quantityPercent *
+                                 COALESCE(constituantsValues.value, 0.0) / 100.0) AS value100g,
+                             GROUP_CONCAT(COALESCE(constituantsValues.qualifValue, '-'),
+                                          '') AS qualifiers
+                      FROM compositionProducts
+                        CROSS JOIN constituantsNames
+                        LEFT JOIN constituantsValues
+                          ON constituantsValues.productCode =
+                                 compositionProducts.productCodePart AND
+                             constituantsValues.constituantCode = constituantsNames.code
+                      WHERE compositionProducts.productCode = ?
+                      GROUP BY constituantsNames.code)
+            """, (newProductCode, totalQuantity, newProductCode))
+        cursor.execute("""SELECT constituantCode, qualifValue, value FROM constituantsValues
+                          WHERE productCode = ?""", (newProductCode,))
+        return {constituantCode: [qualifValue, value]
+                for constituantCode, qualifValue, value in cursor.fetchall()}
+
     def getPartsOfComposedProduct(self, productName, quantity):
         """ Get part of a composed products given a group of food
             return part names and their quantity according quantity of group
@@ -291,6 +935,33 @@ class Database():
         cursor.close()
         return listNamesQty
 
+    def getBaseProductsOfComposedProduct(self, productName, quantity):
+        """ V0.56 : Get base products of a composed products, even if it contains groups
+            return base products names and their quantity according quantity of group
+            given in parameter, read with only one request in compositionClosure table """
+        listNamesQty = []
+        cursor = self.connDB.cursor()
+        cursor.execute("""SELECT groupProducts.code, products.name,
+                                 compositionClosure.quantityPercent
+                          FROM products AS groupProducts
+                            LEFT JOIN compositionClosure
+                              ON compositionClosure.productCode = groupProducts.code
+                            LEFT JOIN products
+                              ON products.code = compositionClosure.baseProductCode
+                          WHERE groupProducts.name=?
+                          ORDER BY compositionClosure.quantityPercent DESC""",
+                       (productName,))
+        results = cursor.fetchall()
+        cursor.close()
+        if not results:
+            raise ValueError(_("Can't ungroup") + " " + productName + " : " + _("not a group"))
+        if results[0][0] >= int(self.configApp.get('Limits', 'startGroupProductCodes')):
+            raise ValueError(_("Can't ungroup") + " " + productName + " : " + _("not a group"))
+        for dummy, name, quantityPercent in results:
+            if name is not None:
+                listNamesQty.append([name, round(quantityPercent * quantity / 100.0, 1)])
+        return listNamesQty
+
     def getInfoDatabase(self):
         """ Return a dictionnary of counters for elements in this database
             V0.30 : 21-22/8/2016 """
@@ -299,6 +970,25 @@ class Database():
         dictCounters = dict()
         dictCounters["dbName"] = self.getDbname()
         cursor = self.connDB.cursor()
+        # V0.56 : counters kept up to date by triggers
+        if self.isCatalogTables:
+            cursor.execute("SELECT name, value FROM databaseCounters")
+            dictDatabaseCounters = dict(cursor.fetchall())
+            dictCounters["nbProducts"] = dictDatabaseCounters["nbProducts"]
+            cursor.execute("SELECT COUNT(*) FROM families")
+            dictCounters["nbFamily"] = cursor.fetchone()[0]
+            dictCounters["nbGroup"] = dictDatabaseCounters["nbGroups"]
+            # Groups counted with another start code until triggers are created again
+            cursor.execute("""SELECT value FROM databaseState
+                              WHERE name='startGroupProductCodes'""")
+            result = cursor.fetchone()
+            if result is None or int(result[0]) != startGroupProductCodes:
+                cursor.execute("SELECT COUNT(*) FROM products WHERE code < ?",
+                               (startGroupProductCodes,))
+                dictCounters["nbGroup"] = cursor.fetchone()[0]
+            dictCounters["nbConstituants"] = dictDatabaseCounters["nbConstituants"]
+            cursor.close()
+            return dictCounters
         cursor.execute("SELECT COUNT(*) FROM products")
         dictCounters["nbProducts"] = cursor.fetchone()[0]
         cursor.execute("SELECT COUNT(DISTINCT familyName) FROM products")
@@ -339,21 +1029,20 @@ class Database():
         dictInfoFood["nbConstituants"] = cursor.fetchone()[0]
 
         # Get info on members of this group
+        # V0.56 : members counted with the request that reads them
         if dictInfoFood["isGroup"]:
-            cursor.execute("SELECT COUNT(*) FROM compositionProducts WHERE productCode = ?",
+            cursor.execute("""SELECT name, quantityPercent
+                              FROM compositionProducts, products
+                              WHERE productCode=? and code=productCodePart""",
                            (dictInfoFood["code"],))
-            dictInfoFood["nbGroupsMembers"] = cursor.fetchone()[0]
+            listGroup = []
+            for namePercent in cursor.fetchall():
+                dictGroup = dict()
+                dictGroup["namePart"] = namePercent[0]
+                dictGroup["percentPart"] = namePercent[1]
+                listGroup.append(dictGroup)
+            dictInfoFood["nbGroupsMembers"] = len(listGroup)
             if dictInfoFood["nbGroupsMembers"] > 0:
-                listGroup = []
-                cursor.execute("""SELECT name, quantityPercent
-                                  FROM compositionProducts, products
-                                  WHERE productCode=? and code=productCodePart""",
-                               (dictInfoFood["code"],))
-                for namePercent in cursor.fetchall():
-                    dictGroup = dict()
-                    dictGroup["namePart"] = namePercent[0]
-                    dictGroup["percentPart"] = namePercent[1]
-                    listGroup.append(dictGroup)
                 dictInfoFood["groups"] = listGroup
 
         cursor.close()
@@ -373,6 +1062,10 @@ class Database():
         dictComponent["value"] = 0.0
         dictComponent["qualifValue"] = '-'
 
+        nutrientCache = self.getNutrientCache()
+        if nutrientCache is not None:
+            return nutrientCache.getInfoComponent(codeProduct, codeComponent)
+
         cursor = self.connDB.cursor()
         # Get info about component for a product
         cursor.execute("""SELECT name, shortcut
@@ -386,7 +1079,7 @@ class Database():
 
             # Get values
             cursor.execute("""SELECT value, qualifValue
-                          FROM constituantsValues, constituantsNames
+                          FROM constituantsValues
                           WHERE productCode=? AND constituantCode=?""",
                            (codeProduct, codeComponent))
             result = cursor.fetchone()
@@ -396,6 +1089,78 @@ class Database():
         cursor.close()
         return dictComponent
 
+    def getInfoFoodsComponents(self, listFoodNames, listComponentCodes):
+        """ Return info on products and their components values with only one query
+            V0.56 : replace getInfoFood() + one getInfoComponent() per component
+            listFoodNames : names of products to read
+            listComponentCodes : codes of components to read for each product
+            Return a dictionnary dict[foodName] = [dictInfoFood, dictInfoComponents]
+                dictInfoFood : keys name, code, familyName, source, dateSource,
+                               urlSource, isGroup
+                dictInfoComponents[componentCode] = [componentCode, name, shortcut,
+                                                     value, qualifValue]
+                Missing values are returned with value 0.0 and qualifier '-'
+                as getInfoComponent() does.
+            Unknown products names are not in the returned dictionnary """
+        listFoodNames = list(set(listFoodNames))
+        listComponentCodes = list(listComponentCodes)
+        self.logger.debug("Database : getInfoFoodsComponents for " + str(len(listFoodNames)) +
+                          " products and " + str(len(listComponentCodes)) + " components")
+        dictInfoFoodsComponents = dict()
+        if len(listFoodNames) == 0:
+            return dictInfoFoodsComponents
+
+        nutrientCache = self.getNutrientCache()
+        if nutrientCache is not None:
+            return nutrientCache.getInfoFoodsComponents(listFoodNames, listComponentCodes)
+
+        startGroupProductCodes = int(self.configApp.get('Limits', 'startGroupProductCodes'))
+        cursor = self.connDB.cursor()
+        cursor.execute("""SELECT products.name, products.code, products.familyName,
+                                 products.source, products.dateSource, products.urlSource,
+                                 constituantsNames.code, constituantsNames.name,
+                                 constituantsNames.shortcut,
+                                 constituantsValues.value, constituantsValues.qualifValue
+                          FROM products
+                          LEFT JOIN constituantsNames
+                              ON constituantsNames.code IN (""" +
+                       ",".join("?" * len(listComponentCodes)) + """)
+                          LEFT JOIN constituantsValues
+                              ON constituantsValues.productCode = products.code AND
+                                 constituantsValues.constituantCode = constituantsNames.code
+                          WHERE products.name IN (""" +
+                       ",".join("?" * len(listFoodNames)) + ")",
+                       listComponentCodes + listFoodNames)
+        for result in cursor.fetchall():
+            foodName = result[0]
+            if foodName not in dictInfoFoodsComponents:
+                dictInfoFood = dict()
+                dictInfoFood["name"] = foodName
+                dictInfoFood["code"] = result[1]
+                dictInfoFood["familyName"] = result[2]
+                dictInfoFood["source"] = result[3]
+                dictInfoFood["dateSource"] = result[4]
+                dictInfoFood["urlSource"] = result[5]
+                dictInfoFood["isGroup"] = result[1] < startGroupProductCodes
+                dictInfoFoodsComponents[foodName] = [dictInfoFood, dict()]
+            componentCode = result[6]
+            if componentCode is not None:
+                value = result[9]
+                qualifValue = result[10]
+                if value is None:
+                    value = 0.0
+                    qualifValue = '-'
+                dictInfoFoodsComponents[foodName][1][componentCode] = \
+                    [componentCode, result[7], result[8], value, qualifValue]
+        cursor.close()
+
+        # Components unknown in this database
+        for dummy, dictInfoComponents in dictInfoFoodsComponents.values():
+            for componentCode in listComponentCodes:
+                if componentCode not in dictInfoComponents:
+                    dictInfoComponents[componentCode] = [componentCode, "", "", 0.0, '-']
+        return dictInfoFoodsComponents
+
     def deleteUserProduct(self, foodName):
         """ Delete a given user foodname in this database
         V0.30 : 23/8/2016 """
@@ -426,84 +1191,139 @@ class Database():
                              _("used by") + " " + nameParentElement)
 
         # Delete elements values
-        cursor.execute("DELETE FROM constituantsValues WHERE productCode=?",
-                       (code,))
-        cursor.execute("DELETE FROM compositionProducts WHERE productCode=?",
-                       (code,))
-        cursor.execute("DELETE FROM products WHERE code=?",
-                       (code,))
-
-        # Commit to be seen by other database connexion
-        self.connDB.commit()
+        # V0.56 : compositionProducts lines are deleted with product by foreign key
+        with self.transaction():
+            cursor.execute("DELETE FROM main.constituantsValues WHERE productCode=?",
+                           (code,))
+            cursor.execute("DELETE FROM main.products WHERE code=?",
+                           (code,))
+            # V0.56 : product is no more counted in portions totals
+            self.updatePortionTotals4Products([code])
         cursor.close()
+        self.invalidateNutrientCache()
 
-    def joinDatabase(self, dbNameSecondary, isUpdate):
+    def joinDatabase(self, dbNameSecondary, isUpdate, progressCallback=None):
         """ Join this database to an other : dbNameSecondary
             intersection, current = main database has the priority
             dbNameSecondary : database used to modify main database
             isUpdate : True if products of main database must be updated
-            in v0.30 : groups created by user are not merged"""
+            in v0.30 : groups created by user are not merged
+            V0.56 : products to add are selected once in temporary tables
+                    joined on indexed codes instead of NOT IN subqueries
+                progressCallback(stepName, numStep, nbSteps) called before each step
+                Return a report dict with keys :
+                    nbProductsUpdated, nbProductsAdded, nbValuesAdded, nbConstituantsAdded
+                    skippedProducts : list of (name, code in dbNameSecondary)
+                        ignored because their name is used by an other product """
         self.logger.debug("Database/joinDatabase with " + dbNameSecondary +
                           " mode update=" + str(isUpdate))
-
+        listSteps = [_("Products"), _("Values"), _("Constituants"), _("Portions")]
+        if isUpdate:
+            listSteps.insert(0, _("Update"))
+        def reportProgress(numStep):
+            """ Call progressCallback for step numStep """
+            if progressCallback is not None:
+                progressCallback(listSteps[numStep], numStep + 1, len(listSteps))
+
+        dictReport = dict()
+        numStep = 0
         cursor = self.connDB.cursor()
         cursor.execute("ATTACH DATABASE ? AS secondDB", (dbNameSecondary,))
-
-        # V0.45 : When updating a database : delete all information present in 2nd database
-        #   theese information are added after
-        if isUpdate:
-            self.logger.debug("Database/joinDatabase delete all information to be updated")
-            cursor.execute("""DELETE FROM main.products
-                                WHERE main.products.code > 0 AND
-                                    main.products.code IN
-                                    (SELECT secondDB.products.code FROM secondDB.products)""")
-            cursor.execute("""DELETE FROM main.constituantsValues
-                                WHERE main.constituantsValues.productCode > 0 AND
-                                    main.constituantsValues.productCode IN
-                                    (SELECT secondDB.products.code FROM secondDB.products)""")
-
-        self.logger.debug("Database/joinDatabase add all information from " + dbNameSecondary)
-
-        # V0.45 : UNIQ contrainst on name in products table
-        #   Select for elimination products in double :
-        #   with same name and  different code
-        cursor.execute("""SELECT main.products.name, secondDB.products.code
-            FROM main.products, secondDB.products
-            WHERE main.products.code > 0 AND
-                  main.products.name = secondDB.products.name AND
-                  main.products.code != secondDB.products.code  """)
-        results = cursor.fetchall()
-        if results is not None:
-            namesDoubleProducts = [result[0] for result in results]
-            codesDoubleProducts = ",".join([str(result[1]) for result in results])
-            self.logger.warning("Database/joinDatabase() : " +
-                                _("Conflict for products with same name and diferent codes") +
-                                " : " + str(namesDoubleProducts) + "\n" +
-                                _("ignore products from second database") + " " +
-                                dbNameSecondary)
-
-        cursor.execute("""INSERT INTO main.products
-                          SELECT * FROM secondDB.products
-                            WHERE secondDB.products.code > 0 AND
-                                secondDB.products.code NOT IN (
-                                SELECT main.products.code FROM main.products) AND
-                                secondDB.products.code NOT IN
-                                    (""" + codesDoubleProducts +")")
-        cursor.execute("""INSERT INTO main.constituantsValues
-                          SELECT * FROM secondDB.constituantsValues
-                            WHERE secondDB.constituantsValues.productCode > 0 AND
-                                  secondDB.constituantsValues.productCode NOT IN (
-                                  SELECT main.constituantsValues.productCode
-                                        FROM main.constituantsValues) AND
-                                  secondDB.constituantsValues.productCode NOT IN
-                                        (""" + codesDoubleProducts +")")
-        cursor.execute("""INSERT INTO main.constituantsNames
-                            SELECT * FROM secondDB.constituantsNames
-                            WHERE secondDB.constituantsNames.code NOT IN (
-                                SELECT main.constituantsNames.code
-                                FROM main.constituantsNames)""")
-        self.connDB.commit()
-        cursor.close()
+        try:
+            # V0.45 : When updating a database : delete all information present in 2nd database
+            #   theese information are added after
+            dictReport["nbProductsUpdated"] = 0
+            if isUpdate:
+                reportProgress(numStep)
+                numStep += 1
+                self.logger.debug("Database/joinDatabase delete all information to be updated")
+                cursor.execute("""DELETE FROM main.constituantsValues
+                                    WHERE productCode > 0 AND
+                                        productCode IN (SELECT code FROM secondDB.products)""")
+                cursor.execute("""DELETE FROM main.products
+                                    WHERE code > 0 AND
+                                        code IN (SELECT code FROM secondDB.products)""")
+                dictReport["nbProductsUpdated"] = cursor.rowcount
+
+            self.logger.debug("Database/joinDatabase add all information from " +
+                              dbNameSecondary)
+
+            # V0.45 : UNIQ contrainst on name in products table
+            #   Products in double : with same name and different code are ignored
+            # V0.56 : products are searched by name and code in reference and user files
+            #   of a layered database : main schema holds only user file
+            reportProgress(numStep)
+            numStep += 1
+            cursor.execute("""CREATE TEMP TABLE joinAddedProducts(
+                                code INTEGER PRIMARY KEY)""")
+            cursor.execute("""
+                INSERT INTO temp.joinAddedProducts(code)
+                    SELECT secondProducts.code
+                    FROM secondDB.products AS secondProducts
+                      LEFT JOIN products AS sameCode
+                        ON sameCode.code = secondProducts.code
+                      LEFT JOIN products AS sameName
+                        ON sameName.name = secondProducts.name
+                    WHERE secondProducts.code > 0 AND
+                          sameCode.code IS NULL AND sameName.code IS NULL""")
+            cursor.execute("""
+                SELECT secondProducts.name, secondProducts.code
+                FROM secondDB.products AS secondProducts
+                  JOIN products AS sameName ON sameName.name = secondProducts.name
+                WHERE secondProducts.code > 0 AND sameName.code != secondProducts.code""")
+            dictReport["skippedProducts"] = cursor.fetchall()
+            if dictReport["skippedProducts"]:
+                self.logger.warning("Database/joinDatabase() : " +
+                                    _("Conflict for products with same name and diferent codes") +
+                                    " : " + str([name for name, dummy in
+                                                 dictReport["skippedProducts"]]) + "\n" +
+                                    _("ignore products from second database") + " " +
+                                    dbNameSecondary)
+            cursor.execute("""
+                INSERT INTO main.products
+                    SELECT secondProducts.*
+                    FROM temp.joinAddedProducts
+                      JOIN secondDB.products AS secondProducts
+                        ON secondProducts.code = joinAddedProducts.code""")
+            dictReport["nbProductsAdded"] = cursor.rowcount
+
+            reportProgress(numStep)
+            numStep += 1
+            cursor.execute("""
+                INSERT INTO main.constituantsValues
+                    SELECT secondValues.*
+                    FROM temp.joinAddedProducts
+                      JOIN secondDB.constituantsValues AS secondValues
+                        ON secondValues.productCode = joinAddedProducts.code""")
+            dictReport["nbValuesAdded"] = cursor.rowcount
+
+            reportProgress(numStep)
+            numStep += 1
+            cursor.execute("""
+                INSERT OR IGNORE INTO main.constituantsNames
+                    SELECT * FROM secondDB.constituantsNames
+                    WHERE code NOT IN (SELECT code FROM constituantsNames)""")
+            dictReport["nbConstituantsAdded"] = cursor.rowcount
+
+            # V0.56 : products values and constituants may have changed
+            reportProgress(numStep)
+            numStep += 1
+            self.updatePortionTotals()
+            cursor.execute("DROP TABLE temp.joinAddedProducts")
+            self.connDB.commit()
+        except sqlite3.Error:
+            self.connDB.rollback()
+            raise
+        finally:
+            cursor.execute("DETACH DATABASE secondDB")
+            cursor.close()
+        self.invalidateNutrientCache()
+        self.updateProductsNamesIndex()
+        self.updateConstituantsStats()
+        self.logger.info("Database/joinDatabase() : " + str(dictReport["nbProductsAdded"]) +
+                         " products added, " + str(len(dictReport["skippedProducts"])) +
+                         " skipped")
+        return dictReport
 
     def createUserTables(self):
         """ Function used to add table or update database structure
@@ -556,6 +1376,8 @@ class Database():
                 constituantCode INTEGER
                 )""")
 
+        # V0.56 : foreign keys are added to details tables by SchemaMigrator migration 8
+
         # V0.42 : 26/11/2016 : Patient tables
         # Check if patientInfo table exists
         cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='patientInfo'")
@@ -577,6 +1399,60 @@ class Database():
         self.connDB.commit()
         cursor.close()
 
+    def isCompactValuesLayout(self):
+        """ Return True if constituantsValues table uses compact layout
+            V0.56 : WITHOUT ROWID table clustered on (productCode, constituantCode) """
+        cursor = self.connDB.cursor()
+        isCompact = SchemaMigrator.SchemaMigrator.isCompactValuesLayout(cursor)
+        cursor.close()
+        return isCompact
+
+    def convertValuesToCompactLayout(self):
+        """ Convert constituantsValues table of an existing database to compact layout
+            Values duplicated for a product and a constituant are removed :
+            the first one is kept as getInfoComponent() did.
+            Return True if table has been converted, False if already compact """
+        if self.isCompactValuesLayout():
+            self.logger.info("Database : " + self.getDbname() + " already in compact layout")
+            return False
+
+        self.logger.debug("Database : convertValuesToCompactLayout for " + self.getDbname())
+        if self.connDB.in_transaction:
+            self.connDB.commit()
+        cursor = self.connDB.cursor()
+        try:
+            cursor.execute("BEGIN")
+            cursor.execute("""
+                CREATE TABLE constituantsValuesCompact(
+                    productCode INTEGER NOT NULL,
+                    constituantCode INTEGER NOT NULL,
+                    value REAL,
+                    qualifValue TEXT,
+                    PRIMARY KEY(productCode, constituantCode)
+                    ) WITHOUT ROWID""")
+            cursor.execute("""
+                INSERT OR IGNORE INTO constituantsValuesCompact(productCode, constituantCode,
+                                                                value, qualifValue)
+                    SELECT productCode, constituantCode, value, qualifValue
+                    FROM constituantsValues
+                    WHERE productCode IS NOT NULL AND constituantCode IS NOT NULL
+                    ORDER BY rowid""")
+            cursor.execute("DROP TABLE constituantsValues")
+            cursor.execute("ALTER TABLE constituantsValuesCompact RENAME TO constituantsValues")
+            # V0.56 : indexes are dropped with old table
+            SchemaMigrator.SchemaMigrator.migrationIndexConstituantsLevels(cursor)
+            self.connDB.commit()
+        except sqlite3.Error:
+            self.connDB.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        # Give back free pages of the old table to the file system
+        self.connDB.execute("VACUUM")
+        self.logger.info("Database : " + self.getDbname() + " converted to compact layout")
+        return True
+
     def getPortions(self, withCode=False):
         """ Return all portions registred in database """
         cursor = self.connDB.cursor()
@@ -590,90 +1466,120 @@ class Database():
         return portionIdAll
 
     def getPortionsFiltred(self, listUserFilters, withCode=False):
-        """ Return portions registred in database and filtered according userFilters fields"""
-        portionIdFiltered = []
-        for portionId in self.getPortions(withCode):
-            condTotal = True
-            for num, inputFilter in enumerate(listUserFilters):
-                numField = num
-                if withCode:
-                    numField = numField + 1
-                cond = (inputFilter == "" or inputFilter.upper() in portionId[numField].upper())
-                condTotal = condTotal and cond
-            if condTotal:
-                portionIdFiltered.append(portionId)
-        self.logger.debug(str(len(portionIdFiltered)) + " portions selected.")
+        """ Return portions registred in database and filtered according userFilters fields
+            V0.56 : filtering done by sqlite with getPortionsPage() """
+        portionIdFiltered, nbPortions = self.getPortionsPage(listUserFilters, withCode=withCode)
+        self.logger.debug(str(nbPortions) + " portions selected.")
         return portionIdFiltered
 
+    def getPortionsPage(self, listUserFilters, offset=0, nbMax=None, withCode=False):
+        """ V0.56 : Return a page of portions filtered according listUserFilters fields
+            and the total number of portions matching these filters
+            listUserFilters : [name, date, patient, type, period], "" or missing : no filter
+            name and date : portions containing filter ignoring case
+            patient, type and period, chosen in lists : portions with this value
+            offset : number of portions skipped, nbMax : size of page, None for all
+            Portions are sorted by name, date, patient using portionsIdsIdx index """
+        listConditions = []
+        listParams = []
+        for numField, field in enumerate(self.PORTIONS_FILTER_FIELDS):
+            inputFilter = listUserFilters[numField] if numField < len(listUserFilters) else ""
+            if inputFilter == "":
+                continue
+            if numField < 2:
+                listConditions.append(field + " LIKE ? ESCAPE '\\'")
+                listParams.append("%" + inputFilter.replace("\\", "\\\\").replace("%", "\\%")
+                                  .replace("_", "\\_") + "%")
+            elif field == "patient":
+                listConditions.append(field + "=?")
+                listParams.append(inputFilter)
+            else:
+                listConditions.append(field + "=? COLLATE NOCASE")
+                listParams.append(inputFilter)
+        whereClause = ""
+        if listConditions:
+            whereClause = " WHERE " + " AND ".join(listConditions)
+
+        cursor = self.connDB.cursor()
+        cursor.execute("SELECT COUNT(*) FROM portions" + whereClause, listParams)
+        nbPortions = cursor.fetchone()[0]
+        fields = ", ".join(self.PORTIONS_FILTER_FIELDS)
+        if withCode:
+            fields = "code, " + fields
+        request = "SELECT " + fields + " FROM portions" + whereClause + \
+                  " ORDER BY name COLLATE NOCASE, date COLLATE NOCASE, patient COLLATE NOCASE"
+        if nbMax is not None:
+            request += " LIMIT ? OFFSET ?"
+            listParams = listParams + [nbMax, offset]
+        cursor.execute(request, listParams)
+        listPortions = cursor.fetchall()
+        cursor.close()
+        return listPortions, nbPortions
+
     def getPortionCode(self, portionName, portionDate, portionPatient):
-        """ Return the code in database for the portion given its Ids and True if it exists """
+        """ Return the code in database for the portion given its Ids and True if it exists
+            V0.56 : Ids are compared ignoring case with portionsIdsIdx index,
+                    code is None for a new portion : it is allocated by insertPortion() """
         cursor = self.connDB.cursor()
         cursor.execute("""SELECT code from portions
-                          WHERE UPPER(name)=? and UPPER(date)=? and UPPER(patient)=?""",
-                       (portionName.upper(), portionDate.upper(), portionPatient.upper()))
+                          WHERE name=? COLLATE NOCASE AND date=? COLLATE NOCASE AND
+                                patient=? COLLATE NOCASE""",
+                       (portionName, portionDate, portionPatient))
         results = cursor.fetchone()
-        exist = results is not None and len(results) == 1
-        if exist:
-            code = results[0]
-        else:
-            # Generate a new code
-            # Find a free code number for this new portion
-            cursor.execute("SELECT code from portions ORDER BY code")
-            listeCodes = [codePortion[0] for codePortion in cursor.fetchall()]
-            if len(listeCodes) == 0:
-                code = 1
-            else:
-                listeCodesSet = set(listeCodes)
-                sequence = set(range(1, listeCodes[-1] + 2))
-                missing = sequence - listeCodesSet
-                code = list(missing)[0]
-
+        exist = results is not None
+        code = results[0] if exist else None
         cursor.close()
         self.logger.debug("getPortionCode : portionCode=" + str(code) + ", exist=" + str(exist))
         return code, exist
 
     def insertPortion(self, fields4ThisPortion, listNamesQties):
-        """ Insert or modify a portion in database """
+        """ Insert or modify a portion in database
+            V0.56 : Return code of the portion """
         portionCode, exist = self.getPortionCode(fields4ThisPortion[0], fields4ThisPortion[1],
                                                  fields4ThisPortion[2])
-        cursor = self.connDB.cursor()
-        if exist:
-            # Delete existing products for this portion
-            cursor.execute("DELETE FROM portionsDetails WHERE portionCode=?",
-                           (portionCode,))
-            fields4ThisPortion.append(portionCode)
-            # Even 3 Ids field must be modified because of char case
-            cursor.execute("""
-                UPDATE portions
-                    SET name=?, date=?, patient=?, type=?, period=?, nbDays=?
-                    WHERE code=?
-                """, fields4ThisPortion)
-            self.logger.debug("insertPortion : portionCode=" + str(portionCode) + " modified")
-        else:
-            fields4ThisPortion.insert(0, portionCode)
-            cursor.execute("""
-                INSERT INTO portions(code, name, date, patient, type, period, nbDays)
-                VALUES(?, ?, ?, ?, ?, ?, ?)
-                """, fields4ThisPortion)
-            self.logger.debug("insertPortion : portionCode=" + str(portionCode) + " created")
-
-        # Get products code that compose this portion and prepare inserting
-        fieldsPortionsDetails = []
-        for element in listNamesQties:
-            cursor.execute("SELECT code FROM products WHERE name=?", (element[0],))
-            results = cursor.fetchone()
-            fieldsPortionsDetails.append([portionCode, results[0], element[1]])
-        self.logger.debug("insertPortion : " + str(len(fieldsPortionsDetails)) +
-                          " products to insert for portion " + str(portionCode))
-
-        # Save in portionsDetails table products and quantities composing this portion
-        cursor.executemany("""INSERT INTO portionsDetails(portionCode, productCode, quantity)
-                                      VALUES(?, ?, ?)""",
-                           fieldsPortionsDetails)
-
-        self.connDB.commit()
-        cursor.close()
+        # V0.56 : one commit for portion, its details and totals
+        with self.transaction():
+            cursor = self.connDB.cursor()
+            if exist:
+                # Delete existing products for this portion
+                cursor.execute("DELETE FROM portionsDetails WHERE portionCode=?",
+                               (portionCode,))
+                fields4ThisPortion.append(portionCode)
+                # Even 3 Ids field must be modified because of char case
+                cursor.execute("""
+                    UPDATE portions
+                        SET name=?, date=?, patient=?, type=?, period=?, nbDays=?
+                        WHERE code=?
+                    """, fields4ThisPortion)
+                self.logger.debug("insertPortion : portionCode=" + str(portionCode) + " modified")
+            else:
+                # V0.56 : code allocated by sqlite for the INTEGER PRIMARY KEY
+                cursor.execute("""
+                    INSERT INTO portions(name, date, patient, type, period, nbDays)
+                    VALUES(?, ?, ?, ?, ?, ?)
+                    """, fields4ThisPortion)
+                portionCode = cursor.lastrowid
+                self.logger.debug("insertPortion : portionCode=" + str(portionCode) + " created")
+
+            # Get products code that compose this portion and prepare inserting
+            fieldsPortionsDetails = []
+            for element in listNamesQties:
+                cursor.execute("SELECT code FROM products WHERE name=?", (element[0],))
+                results = cursor.fetchone()
+                fieldsPortionsDetails.append([portionCode, results[0], element[1]])
+            self.logger.debug("insertPortion : " + str(len(fieldsPortionsDetails)) +
+                              " products to insert for portion " + str(portionCode))
+
+            # Save in portionsDetails table products and quantities composing this portion
+            cursor.executemany("""INSERT INTO portionsDetails(portionCode, productCode, quantity)
+                                          VALUES(?, ?, ?)""",
+                               fieldsPortionsDetails)
+            # V0.56 : totals saved in the same transaction as portion
+            self.updatePortionTotals([portionCode])
+
+            cursor.close()
         self.logger.debug("insertPortion : saved")
+        return portionCode
 
     def getAllInfo4Portion(self, portionCode, specialComponentsCodes):
         """ Return infos for the portion selected by portionCode
@@ -715,18 +1621,97 @@ class Database():
                           str(portionCode))
         return nbDays, listProductPortion
 
+    def updatePortionTotals(self, listPortionCodes=None):
+        """ V0.56 : Compute again portionTotals table lines for portions in listPortionCodes,
+            for all portions if None
+            Total of a constituant is the sum of its quantity in each product of portion,
+            a missing value counts for 0 with qualifier '-' as in calculator total line.
+            Caller must commit """
+        if not self.isPortionTotalsTable:
+            return
+        condition = ""
+        listParams = []
+        if listPortionCodes is not None:
+            listPortionCodes = list(listPortionCodes)
+            if not listPortionCodes:
+                return
+            condition = " WHERE portionCode IN (" + ",".join(["?"] * len(listPortionCodes)) + ")"
+            listParams = listPortionCodes
+        cursor = self.connDB.cursor()
+        cursor.execute("DELETE FROM portionTotals" + condition, listParams)
+        cursor.execute("""
+            INSERT INTO portionTotals(portionCode, constituantCode, value, qualifValue)
+                SELECT portionCode, constituantCode, total,
+                       reduceQualifier(qualifiers, total)
+                FROM (SELECT portionsDetails.portionCode AS portionCode,
+                             constituantsNames.code AS constituantCode,
+                             SUM(portionsDetails.quantity *
+                                 COALESCE(constituantsValues.value, 0.0) / 100.0) AS total,
+                             GROUP_CONCAT(COALESCE(constituantsValues.qualifValue, '-'),
+                                          '') AS qualifiers
+                      FROM portionsDetails
+                        JOIN products ON products.code = portionsDetails.productCode
+                        CROSS JOIN constituantsNames
+                        LEFT JOIN constituantsValues
+                          ON constituantsValues.productCode = portionsDetails.productCode AND
+                             constituantsValues.constituantCode = constituantsNames.code
+                      """ + condition.replace("portionCode", "portionsDetails.portionCode") +
+                       """
+                      GROUP BY portionsDetails.portionCode, constituantsNames.code)""",
+                       listParams)
+        cursor.close()
+        self.logger.debug("Database/updatePortionTotals() : " +
+                          ("all" if listPortionCodes is None else str(len(listPortionCodes))) +
+                          " portions")
+
+    def updatePortionTotals4Products(self, listProductCodes):
+        """ V0.56 : Compute again totals of portions containing a product of listProductCodes
+            Called when values of these products are modified. Caller must commit """
+        if not self.isPortionTotalsTable:
+            return
+        listProductCodes = list(listProductCodes)
+        cursor = self.connDB.cursor()
+        setPortionCodes = set()
+        # Limit number of sqlite parameters in a request
+        for numStart in range(0, len(listProductCodes), 500):
+            listProductCodesPart = listProductCodes[numStart:numStart + 500]
+            cursor.execute("SELECT DISTINCT portionCode FROM portionsDetails " +
+                           "WHERE productCode IN (" +
+                           ",".join(["?"] * len(listProductCodesPart)) + ")",
+                           listProductCodesPart)
+            setPortionCodes.update(row[0] for row in cursor.fetchall())
+        cursor.close()
+        self.updatePortionTotals(sorted(setPortionCodes))
+
+    def getPortionTotals(self, listPortionCodes, listConstituantCodes):
+        """ V0.56 : Return totals read in portionTotals table for portions and constituants
+            dict[portionCode][constituantCode] = [qualifValue, value] """
+        dictPortionTotals = {portionCode: dict() for portionCode in listPortionCodes}
+        listPortionCodes = list(listPortionCodes)
+        listConstituantCodes = list(listConstituantCodes)
+        if not self.isPortionTotalsTable or not listPortionCodes or not listConstituantCodes:
+            return dictPortionTotals
+        cursor = self.connDB.cursor()
+        cursor.execute("SELECT portionCode, constituantCode, qualifValue, value " +
+                       "FROM portionTotals WHERE portionCode IN (" +
+                       ",".join(["?"] * len(listPortionCodes)) + ") AND " +
+                       "constituantCode IN (" +
+                       ",".join(["?"] * len(listConstituantCodes)) + ")",
+                       listPortionCodes + listConstituantCodes)
+        for portionCode, constituantCode, qualifValue, value in cursor.fetchall():
+            dictPortionTotals[portionCode][constituantCode] = [qualifValue, value]
+        cursor.close()
+        return dictPortionTotals
+
     def deletePortion(self, portionCode):
         """ Delete a given portion in this database
         V0.32 : 28/9/2016 """
         self.logger.debug("Database : deletePortion for portion " + str(portionCode))
         cursor = self.connDB.cursor()
 
-        # Delete elements values
-        cursor.execute("DELETE FROM portionsDetails WHERE portionCode=?", (portionCode,))
-        cursor.execute("DELETE FROM portions WHERE code=?", (portionCode,))
-
-        # Commit to be seen by other database connexion
-        self.connDB.commit()
+        # V0.56 : portionsDetails lines are deleted with portion by foreign key
+        with self.transaction():
+            cursor.execute("DELETE FROM portions WHERE code=?", (portionCode,))
         cursor.close()
         self.logger.debug("deletePortion : portion " + str(portionCode) + " " + _("deleted"))
 
@@ -751,24 +1736,25 @@ class Database():
         cursor.close()
 
         # Replace existing pathology
-        self.deletePathology(name)
-        cursor = self.connDB.cursor()
-        cursor.execute("""INSERT INTO pathologies(name, description, reference)
-                            VALUES(?, ?, ?)
-                        """, (name, description, reference))
-
-        # V0.41 : insert all pathology constituants with only one SQL statement
-        # Save in pathologiesConstituants table (pathologyName, constituantCode) composing
-        # pathology componants
-        pathologiesConstituants = []
-        for code in listConstituantsCodes:
-            pathologiesConstituants.append([name, code])
-        cursor.executemany("""INSERT INTO pathologiesConstituants(pathologyName, constituantCode)
-                                VALUES(?, ?)""",
-                           pathologiesConstituants)
-
-        self.connDB.commit()
-        cursor.close()
+        # V0.56 : deletion and insertion committed once
+        with self.transaction():
+            self.deletePathology(name)
+            cursor = self.connDB.cursor()
+            cursor.execute("""INSERT INTO pathologies(name, description, reference)
+                                VALUES(?, ?, ?)
+                            """, (name, description, reference))
+
+            # V0.41 : insert all pathology constituants with only one SQL statement
+            # Save in pathologiesConstituants table (pathologyName, constituantCode) composing
+            # pathology componants
+            pathologiesConstituants = []
+            for code in listConstituantsCodes:
+                pathologiesConstituants.append([name, code])
+            cursor.executemany("""INSERT INTO pathologiesConstituants(pathologyName,
+                                                                      constituantCode)
+                                    VALUES(?, ?)""",
+                               pathologiesConstituants)
+            cursor.close()
 
     def getDefinedPathologiesNames(self):
         """ Return a list of all pathologies defined in database
@@ -788,14 +1774,11 @@ class Database():
         self.logger.debug("Database/deletePathology for name " + name)
         cursor = self.connDB.cursor()
 
-        # Delete elements values
-        cursor.execute("DELETE FROM pathologiesConstituants WHERE pathologyName=?", (name,))
-        cursor.execute("DELETE FROM pathologies WHERE name=?", (name,))
-        if forPatient:
-            cursor.execute("DELETE FROM patientPathologies WHERE pathologyName=?", (name,))
-
-        # Commit to be seen by other database connexion
-        self.connDB.commit()
+        # V0.56 : pathologiesConstituants lines are deleted with pathology by foreign key
+        with self.transaction():
+            cursor.execute("DELETE FROM pathologies WHERE name=?", (name,))
+            if forPatient:
+                cursor.execute("DELETE FROM patientPathologies WHERE pathologyName=?", (name,))
         cursor.close()
         self.logger.debug("deletePathology : name " + name + " " + _("deleted"))
 
@@ -880,46 +1863,45 @@ class Database():
     def insertPatientInDatabase(self, listInfoPatient):
         """Insert new patient in database """
         self.logger.debug("Database/insertPatientInDatabase")
-        cursor = self.connDB.cursor()
-        cursor.execute("""
-            INSERT INTO patientInfo(code, birthYear, gender, size, notes)
-                VALUES(?, ?, ?, ?, ?)
-            """, (listInfoPatient[0], int(listInfoPatient[1]),
-                  listInfoPatient[2], int(listInfoPatient[3]),
-                  listInfoPatient[4]))
-        self.connDB.commit()
-        cursor.close()
+        with self.transaction():
+            cursor = self.connDB.cursor()
+            cursor.execute("""
+                INSERT INTO patientInfo(code, birthYear, gender, size, notes)
+                    VALUES(?, ?, ?, ?, ?)
+                """, (listInfoPatient[0], int(listInfoPatient[1]),
+                      listInfoPatient[2], int(listInfoPatient[3]),
+                      listInfoPatient[4]))
+            cursor.close()
 
     def updatePatientInDatabase(self, listInfoPatient):
         """Update patient in database """
         self.logger.debug("Database/updatePatientInDatabase")
-        cursor = self.connDB.cursor()
-        cursor.execute("""
-            UPDATE patientInfo
-            SET birthYear=?, gender=?, size=?, notes=?
-            WHERE code=?
-            """, (int(listInfoPatient[1]),
-                  listInfoPatient[2], int(listInfoPatient[3]),
-                  listInfoPatient[4], listInfoPatient[0]))
-        self.connDB.commit()
-        cursor.close()
+        with self.transaction():
+            cursor = self.connDB.cursor()
+            cursor.execute("""
+                UPDATE patientInfo
+                SET birthYear=?, gender=?, size=?, notes=?
+                WHERE code=?
+                """, (int(listInfoPatient[1]),
+                      listInfoPatient[2], int(listInfoPatient[3]),
+                      listInfoPatient[4], listInfoPatient[0]))
+            cursor.close()
 
     def updatePatientPathologies(self, patientCode, listpathologies):
         """ Update pathologies for a patient """
         self.logger.debug("Database/updatePatientPathologies : patient " + patientCode +
                           "pathologies=" + str(listpathologies))
-        cursor = self.connDB.cursor()
-        cursor.execute("DELETE FROM patientPathologies WHERE patientCode=?", (patientCode,))
-
-        # Insert New pathologies in table
-        values2Insert = [(patientCode, pathology) for pathology in listpathologies]
-        cursor.executemany("""
-            INSERT INTO patientPathologies(patientCode, pathologyName)
-            VALUES(?, ?)
-            """, values2Insert)
-
-        self.connDB.commit()
-        cursor.close()
+        with self.transaction():
+            cursor = self.connDB.cursor()
+            cursor.execute("DELETE FROM patientPathologies WHERE patientCode=?", (patientCode,))
+
+            # Insert New pathologies in table
+            values2Insert = [(patientCode, pathology) for pathology in listpathologies]
+            cursor.executemany("""
+                INSERT INTO patientPathologies(patientCode, pathologyName)
+                VALUES(?, ?)
+                """, values2Insert)
+            cursor.close()
 
     def getPathologies4Patient(self, patientCode):
         """ Return list of pathologies registred for patient patientCode """
@@ -936,106 +1918,120 @@ class Database():
     def deletePatient(self, patientCode):
         """ Delete all information for given patient in database """
         self.logger.debug("Database/deletePatient : patient " + patientCode)
+        self.deletePatients([patientCode])
+
+    def deletePatients(self, listPatientCodes):
+        """ V0.56 : Delete all information for patients in listPatientCodes
+            in one transaction : their portions and pathologies details
+            are deleted by foreign keys """
+        self.logger.debug("Database/deletePatients : " + str(len(listPatientCodes)) +
+                          " patients")
+        inClause = ",".join("?" * len(listPatientCodes))
         cursor = self.connDB.cursor()
-        cursor.execute("DELETE FROM patientPathologies WHERE patientCode=?", (patientCode,))
-        cursor.execute("DELETE FROM patientInfo WHERE code=?", (patientCode,))
-        cursor.execute(""" DELETE FROM portionsDetails
-                           WHERE portionCode IN (SELECT code FROM portions WHERE patient=?)""",
-                       (patientCode,))
-        cursor.execute("DELETE FROM portions WHERE patient=?", (patientCode,))
-        self.connDB.commit()
+        with self.transaction():
+            cursor.execute("DELETE FROM portions WHERE patient IN (" + inClause + ")",
+                           listPatientCodes)
+            cursor.execute("DELETE FROM patientInfo WHERE code IN (" + inClause + ")",
+                           listPatientCodes)
         cursor.close()
 
     def correctEnergyKcal(self):
         """ V0.47 : correct problem in Ciqual 2016 table
-            Compute energy in kcal for products in database without energy provided """
+            Compute energy in kcal for products in database without energy provided
+            V0.56 : only products inserted since last call are checked :
+                energyCorrectionPending table is filled by a trigger on products,
+                and with reference products by queueReferenceEnergyCorrection(),
+                energies are computed by one SQL request grouped by product.
+                Energies are written in user file of a layered database.
+            Return the number of products corrected """
+
+        # V0.56 : Nothing to do if no product inserted since last correction
+        cursor = self.connDB.cursor()
+        cursor.execute("""SELECT 1 FROM sqlite_master
+                          WHERE type='table' AND name='energyCorrectionPending'""")
+        if cursor.fetchone() is None:
+            cursor.close()
+            self.logger.debug("Database/correctEnergyKcal() : no correction state in database")
+            return 0
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM energyCorrectionPending)")
+        if not cursor.fetchone()[0]:
+            cursor.close()
+            self.logger.debug("Database/correctEnergyKcal() : no new product to check")
+            return 0
 
         # Get energy codes useful to compute missing energies
-        energyTotalKcalCode = self.configApp.get('Energy', 'EnergyTotalKcalCode')
-        energyTotalKJCode = self.configApp.get('Energy', 'EnergyTotalKJCode')
+        energyTotalKcalCode = int(self.configApp.get('Energy', 'EnergyTotalKcalCode'))
+        energyTotalKJCode = int(self.configApp.get('Energy', 'EnergyTotalKJCode'))
         coefKcal2Kj = float(self.configApp.get('Energy', 'CoefKcal2Kj'))
         listComp = self.configApp.get('Energy', 'EnergeticComponentsCodes')
         energeticComponentsCodes = [int(code) for code in listComp.split(";")]
-        energyCodesStr = listComp.replace(";", ",")
-        # Suppress sugar components already included in glucide
-        sugarCode = self.configApp.get('Energy', 'SugarCode')
-        energyCodesStr = energyCodesStr.replace(sugarCode, '')
-        energyCodesStr = energyCodesStr.replace(',,', ',')
-        if energyCodesStr.endswith(','):
-            energyCodesStr = energyCodesStr[:-1]
         listEnergy = self.configApp.get('Energy', 'EnergySuppliedByComponents')
         energySuppliedByComponents = [float(value) for value in listEnergy.split(";")]
         assert len(energeticComponentsCodes) == len(energySuppliedByComponents), \
             "Pb .ini : Energy keys EnergeticComponentsCodes and EnergeticComponentsCodes " + \
             "have the same length !"
-        dictCoefEnergy = dict()
-        for numComp, code in enumerate(energeticComponentsCodes):
-            dictCoefEnergy[code] = energySuppliedByComponents[numComp]
-
-        # Select all products and their energetics components
-        # from database when their energy in kcal is not supplies
-        cursor = self.connDB.cursor()
+        # Suppress sugar components already included in glucide
+        sugarCode = int(self.configApp.get('Energy', 'SugarCode'))
+        listCoefEnergy = [(code, coef)
+                          for code, coef in zip(energeticComponentsCodes,
+                                                energySuppliedByComponents)
+                          if code != sugarCode]
+
+        # Compute energy of new products with energetics components
+        # when their energy in kcal is not supplied
+        valuesCoefs = ",".join(["(?, ?)"] * len(listCoefEnergy))
+        parameters = [field for coefEnergy in listCoefEnergy for field in coefEnergy]
+        parameters.append(energyTotalKcalCode)
         cursor.execute("""
-                SELECT productCode, constituantCode, value
-                  FROM constituantsValues
-                  WHERE productCode IN (
-                    SELECT code FROM products WHERE code NOT IN (
-                        SELECT code FROM products, constituantsValues
-                            WHERE code = productCode AND constituantCode=?))
-                    AND constituantCode IN (""" + energyCodesStr + ") ORDER BY productCode",
-                       (energyTotalKcalCode,))
+                WITH coefEnergy(constituantCode, coef) AS (VALUES """ + valuesCoefs + """)
+                SELECT constituantsValues.productCode,
+                       SUM(constituantsValues.value * coefEnergy.coef)
+                  FROM energyCorrectionPending
+                    JOIN constituantsValues
+                      ON constituantsValues.productCode = energyCorrectionPending.productCode
+                    JOIN coefEnergy
+                      ON coefEnergy.constituantCode = constituantsValues.constituantCode
+                  WHERE NOT EXISTS (SELECT 1 FROM constituantsValues AS energyValues
+                                    WHERE energyValues.productCode =
+                                              energyCorrectionPending.productCode
+                                      AND energyValues.constituantCode = ?)
+                  GROUP BY constituantsValues.productCode""", parameters)
         results = cursor.fetchall()
 
-        # Compute energy in kcal and kJ for each products found
-        listCorrectedEnergies = []
-        listCodesProducts = []
-        productCodePrev = 0
-        energy = 0.0
-        nbProducts = 0
-        for result in results:
-            productCode, constituantCode, value = result
-            if productCode != productCodePrev: # Change of products
-                nbProducts += 1
-                if productCodePrev != 0: # Register computed energy
-                    listCorrectedEnergies.append((productCodePrev,
-                                                      int(energyTotalKcalCode),
-                                                      energy, 'N'))
-                    listCorrectedEnergies.append((productCodePrev,
-                                                    int(energyTotalKJCode),
-                                                    energy * coefKcal2Kj, 'N'))
-                    listCodesProducts.append(str(productCodePrev))
-                productCodePrev = productCode
-                energy = 0.0
-            energy += value * dictCoefEnergy[constituantCode]
-        if productCodePrev != 0:
-            listCorrectedEnergies.append((productCodePrev,
-                                              int(energyTotalKcalCode),
-                                              energy, 'N'))
-            listCorrectedEnergies.append((productCodePrev,
-                                            int(energyTotalKJCode),
-                                            energy * coefKcal2Kj, 'N'))
-            listCodesProducts.append(str(productCodePrev))
-
         # Message to user
-        if len(listCorrectedEnergies) == 0:
+        nbProducts = len(results)
+        if nbProducts == 0:
             self.logger.debug("Database/correctEnergyKcal() : All energies are OK")
         else:
             self.logger.warning(_("Energies kcal modification for %d products !"), nbProducts)
 
         # Create all missing enegy in kcal components in constituantsValues table
+        # V0.56 : ignore energies already in table : primary key in compact layout
+        listCorrectedEnergies = []
+        for productCode, energy in results:
+            listCorrectedEnergies.append((productCode, energyTotalKcalCode, energy, 'N'))
+            listCorrectedEnergies.append((productCode, energyTotalKJCode,
+                                          energy * coefKcal2Kj, 'N'))
+        # V0.56 : values of a layered database are saved in user file
         cursor.executemany("""
-            INSERT INTO constituantsValues(productCode, constituantCode, value, qualifValue)
+            INSERT OR IGNORE INTO main.constituantsValues(productCode, constituantCode,
+                                                          value, qualifValue)
                 VALUES(?, ?, ?, ?)
             """, listCorrectedEnergies)
 
         # Update product table source code to indicate that Energy is corrected
-        listCodesProductsStr = ",".join(listCodesProducts)
-        cursor.execute("""SELECT code, source
-                            FROM products
-                            WHERE code IN (""" + listCodesProductsStr + ")")
-        results = cursor.fetchall()
-        listCodesProductsSourceM = [[source + " (" + _("Energies recalculated by CalcAl") + " !)",
-                                     code]
-                                    for code, source in results]
-        cursor.executemany("UPDATE products SET source=? WHERE code=?",
-                           listCodesProductsSourceM)
+        cursor.executemany("UPDATE main.products SET source=source || ? WHERE code=?",
+                           [(" (" + _("Energies recalculated by CalcAl") + " !)", productCode)
+                            for productCode, dummy in results])
+        self.updatePortionTotals4Products([productCode for productCode, dummy in results])
+
+        # V0.56 : record that all products are checked
+        cursor.execute("DELETE FROM energyCorrectionPending")
+        cursor.execute("""INSERT OR REPLACE INTO databaseState(name, value)
+                          VALUES('energyCorrectionDate', ?)""",
+                       (time.strftime("%Y-%m-%d %H:%M:%S"),))
+        self.connDB.commit()
+        cursor.close()
+        if nbProducts > 0:
+            self.invalidateNutrientCache()
+        return nbProducts
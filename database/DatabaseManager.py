@@ -26,11 +26,13 @@ You should have received a copy of the GNU General Public License
 along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
 ************************************************************************************
 """
+import collections
 import logging
+import os
 import os.path
-import shutil
 
 from . import Database
+from . import DatabaseSnapshot
 
 class DatabaseManager():
     """ Manage database operations for CalcAl software """
@@ -46,30 +48,120 @@ class DatabaseManager():
         self.logger = logging.getLogger(self.configApp.get('Log', 'LoggerName'))
         self.extDB = self.configApp.get('Resources', 'DatabaseExt')
         self.currentDatabase = None
+        # V0.56 : copies and backups with sqlite online backup API
+        self.databaseSnapshot = DatabaseSnapshot.DatabaseSnapshot(self.configApp)
+        self.backupDirPath = os.path.join(self.baseDirPath,
+                                          self.configApp.get('Resources', 'BackupDir'))
+        self.snapshotProgressCallback = None
+        self.lastMaintenanceReport = None
+        # V0.56 : databases closed by user but kept opened, least recently used first
+        #   {databasePath : (Database object, data version, file state)}
+        self.nbOpenDatabasesCached = int(self.configApp.get('Database',
+                                                            'NbOpenDatabasesCached'))
+        self.dictOpenDatabases = collections.OrderedDict()
 
     def getDatabase(self):
         """ return  current Database object or None if no database in use"""
         return self.currentDatabase
 
-    def closeDatabase(self):
-        """ Close database in use"""
+    def setSnapshotProgressCallback(self, snapshotProgressCallback):
+        """ V0.56 : snapshotProgressCallback(nbPagesCopied, nbPages) will be called
+            during automatic backups """
+        self.snapshotProgressCallback = snapshotProgressCallback
+
+    def closeDatabase(self, isKeptOpen=False):
+        """ Close database in use
+            V0.56 : a modified database is maintained and saved in backup directory
+                    before closing
+                    isKeptOpen : True if database is kept opened with its caches
+                    for next openDatabase(), until least recently used ones are closed :
+                    they are only lightly maintained, see closeDatabaseObject() """
         if self.currentDatabase:
-            self.currentDatabase.close()
+            database = self.currentDatabase
             self.currentDatabase = None
-            self.logger.info("DatabaseManager/closeDatabase() : database closed")
+            if isKeptOpen and self.nbOpenDatabasesCached > 0:
+                databasePath = database.getDatabasePath()
+                self.dictOpenDatabases[databasePath] = (database, database.getDataVersion(),
+                                                        self.getFileState(databasePath))
+                while len(self.dictOpenDatabases) > self.nbOpenDatabasesCached:
+                    dummy, (databaseEvicted, dummy, dummy) = \
+                        self.dictOpenDatabases.popitem(last=False)
+                    self.closeDatabaseObject(databaseEvicted)
+                self.logger.info("DatabaseManager/closeDatabase() : database kept opened")
+            else:
+                self.closeDatabaseObject(database, True)
+                self.logger.info("DatabaseManager/closeDatabase() : database closed")
         else:
             self.logger.debug("DatabaseManager/closeDatabase() : no database opened")
 
+    def closeDatabaseObject(self, database, isClosedByUser=False):
+        """ V0.56 : Close a Database object, maintained before if modified
+            isClosedByUser : True if user closes it : it can be vacuumed and is saved,
+                             else it leaves databases kept opened when switching
+                             or exiting : GUI is not frozen by VACUUM and backup """
+        if database.isModified() and os.path.exists(database.getDatabasePath()):
+            self.lastMaintenanceReport = database.runMaintenance(False, isClosedByUser)
+            if isClosedByUser:
+                self.backupDatabase(database.getDbname(), self.snapshotProgressCallback)
+        database.close()
+
+    def closeAllDatabases(self):
+        """ V0.56 : Close database in use and databases kept opened
+            Called at the end of application """
+        self.closeDatabase()
+        while self.dictOpenDatabases:
+            dummy, (database, dummy, dummy) = self.dictOpenDatabases.popitem(last=False)
+            self.closeDatabaseObject(database)
+
+    def forgetDatabase(self, dbName):
+        """ V0.56 : Close database dbName if it is kept opened
+            Called before its file is deleted or replaced """
+        databasePath = self.buildDbNamePath(dbName)
+        if databasePath in self.dictOpenDatabases:
+            database = self.dictOpenDatabases.pop(databasePath)[0]
+            self.closeDatabaseObject(database)
+
+    @staticmethod
+    def getFileState(databasePath):
+        """ V0.56 : Return identity, size and modification time of file databasePath
+            None if it doesn't exist """
+        try:
+            statResult = os.stat(databasePath)
+        except FileNotFoundError:
+            return None
+        return (statResult.st_dev, statResult.st_ino, statResult.st_size,
+                statResult.st_mtime_ns)
+
     def openDatabase(self, dbName):
-        """ open a database which name dbName is given in parameter """
+        """ open a database which name dbName is given in parameter
+            V0.56 : database kept opened is reused if its file was not modified since
+                    by another program """
         self.logger.debug("DatabaseManager/openDatabase() : try to open " + dbName + "...")
+        self.closeDatabase()
         databasePath = os.path.join(self.baseDirPath, dbName)
+        if databasePath in self.dictOpenDatabases:
+            database, dataVersion, fileState = self.dictOpenDatabases.pop(databasePath)
+            if dataVersion == database.getDataVersion() and \
+               fileState == self.getFileState(databasePath):
+                self.currentDatabase = database
+                self.logger.info("DatabaseManager/openDatabase() : database " + dbName +
+                                 " reused")
+                return
+            self.logger.info("DatabaseManager/openDatabase() : database " + dbName +
+                             " modified by another program, reopened")
+            self.closeDatabaseObject(database)
         database = Database.Database(self.configApp, self.dirProject)
         database.open(databasePath)
         database.correctEnergyKcal() # V0.47 : Energies correction
         self.currentDatabase = database
         self.logger.info("DatabaseManager/openDatabase() : database " + dbName + " opened")
 
+    def peekDatabase(self, dbName):
+        """ V0.56 : Return counters of database dbName, see Database.getInfoDatabase()
+            Database is read without being opened : it can be in use """
+        database = Database.Database(self.configApp, self.dirProject)
+        return database.peekInfoDatabase(self.buildDbNamePath(dbName))
+
     def existsDatabase(self, dbName):
         """ return True if database dbName given exists """
         databasePath = self.buildDbNamePath(dbName)
@@ -83,11 +175,38 @@ class DatabaseManager():
         return databasePath
 
     def initDBFromFile(self, dbName, databaseType, initFile):
-        """ Create a new database databasePath by reading a file initFile """
+        """ Create a new database databasePath by reading a file initFile
+            V0.56 : Return report of maintenance done after import """
+        self.forgetDatabase(dbName)
         database = Database.Database(self.configApp, self.dirProject)
         databasePath = self.buildDbNamePath(dbName)
-        database.initDBFromFile(databasePath, databaseType, initFile)
-        database.close()
+        try:
+            database.initDBFromFile(databasePath, databaseType, initFile)
+            self.lastMaintenanceReport = database.runMaintenance(True)
+        finally:
+            database.close()
+        return self.lastMaintenanceReport
+
+    def createLayeredDatabase(self, dbName, referencePath):
+        """ V0.56 : Create a new database dbName that only holds user data :
+            products and constituants are read in referencePath file, never modified
+            Databases of user's databases directory can't be reference files :
+            they are modified when opened by CalcAl """
+        if self.existsDatabase(dbName):
+            raise ValueError(_("this database already exists") + " : " + dbName)
+        if os.path.dirname(os.path.abspath(referencePath)) == os.path.abspath(self.baseDirPath):
+            raise ValueError(_("A database of databases directory can't be a reference") +
+                             " : " + referencePath)
+        database = Database.Database(self.configApp, self.dirProject)
+        try:
+            database.initLayeredDatabase(self.buildDbNamePath(dbName), referencePath)
+        finally:
+            database.close()
+
+    def getLastMaintenanceReport(self):
+        """ V0.56 : Return report of last maintenance : see Database.runMaintenance()
+            None if no maintenance done """
+        return self.lastMaintenanceReport
 
     def getListDatabaseInDir(self):
         """ return a list of database names that already exists """
@@ -100,6 +219,7 @@ class DatabaseManager():
         """ Delete a database giving its short name """
         if dbName != self.configApp.get('Resources', 'DemoDatabaseName2017'):
             if self.existsDatabase(dbName):
+                self.forgetDatabase(dbName)
                 databasePath = self.buildDbNamePath(dbName)
                 os.remove(databasePath)
                 self.logger.info("DatabaseManager/deleteDatabase() : database deleted : " + dbName)
@@ -110,20 +230,71 @@ class DatabaseManager():
             raise ValueError(_("The database") + " " + dbName + " " +
                              _("can't be deleted"))
 
-    def joinDatabase(self, dbNameMaster, dbNameSecondary, dbNameResult, isUpdate):
+    def joinDatabase(self, dbNameMaster, dbNameSecondary, dbNameResult, isUpdate,
+                     progressCallback=None):
         """ Join 2 databases
             dbNameMaster : main database name that will be copied in dbNameResultbefore modification
             dbNameSecondary : database used to modify main database
             dbNameResult : result database
-            isUpdate : True if products of main database must be updated """
+            isUpdate : True if products of main database must be updated
+            V0.56 : progressCallback(stepName, numStep, nbSteps) called for each step
+                    Return report of Database.joinDatabase()
+                    Can be called by a thread : result database is opened and closed by it,
+                    forgetDatabase(dbNameResult) must be called before by GUI thread """
         # Duplicate master Database to result database
+        # V0.56 : consistent copy even if master database is opened
         databaseMasterPath = self.buildDbNamePath(dbNameMaster)
         databaseResultPath = self.buildDbNamePath(dbNameResult)
-        shutil.copyfile(databaseMasterPath, databaseResultPath)
+        self.databaseSnapshot.copyFile(databaseMasterPath, databaseResultPath)
 
         # Merge table from dbNameSecondary in dbNameResult
         databaseResult = Database.Database(self.configApp, self.dirProject)
         databaseResult.open(databaseResultPath)
-        databaseSecondaryPath = self.buildDbNamePath(dbNameSecondary)
-        databaseResult.joinDatabase(databaseSecondaryPath, isUpdate)
-        databaseResult.close()
+        try:
+            databaseSecondaryPath = self.buildDbNamePath(dbNameSecondary)
+            dictReport = databaseResult.joinDatabase(databaseSecondaryPath, isUpdate,
+                                                     progressCallback)
+            dictReport["maintenance"] = databaseResult.runMaintenance(True)
+        finally:
+            databaseResult.close()
+        return dictReport
+
+    def copyDatabase(self, dbName, dbNameCopy, progressCallback=None):
+        """ V0.56 : Save a copy of database dbName in dbNameCopy, even if dbName is opened
+            progressCallback(nbPagesCopied, nbPages) is called after each step of copy """
+        if self.existsDatabase(dbNameCopy):
+            raise ValueError(_("this database already exists") + " : " + dbNameCopy)
+        self.databaseSnapshot.copyFile(self.buildDbNamePath(dbName),
+                                       self.buildDbNamePath(dbNameCopy), progressCallback)
+
+    def backupDatabase(self, dbName, progressCallback=None):
+        """ V0.56 : Save database dbName in backup directory, only last backups are kept
+            Return path of backup, None if backups are disabled in configuration """
+        backupPath = self.databaseSnapshot.backup(self.buildDbNamePath(dbName),
+                                                  self.backupDirPath, progressCallback)
+        if backupPath is not None:
+            self.logger.info("DatabaseManager/backupDatabase() : " + dbName + " saved in " +
+                             backupPath)
+        return backupPath
+
+    def getListBackups(self, dbName):
+        """ V0.56 : Return paths of backups of database dbName, oldest first """
+        return self.databaseSnapshot.getBackupPaths(self.buildDbNamePath(dbName),
+                                                    self.backupDirPath)
+
+    def convertDatabaseToCompactLayout(self, dbName):
+        """ Convert constituantsValues table of database dbName to compact layout
+            Return file size before and after conversion """
+        databasePath = self.buildDbNamePath(dbName)
+        self.forgetDatabase(dbName)
+        sizeBefore = os.path.getsize(databasePath)
+        database = Database.Database(self.configApp, self.dirProject)
+        database.open(databasePath)
+        try:
+            database.convertValuesToCompactLayout()
+        finally:
+            database.close()
+        sizeAfter = os.path.getsize(databasePath)
+        self.logger.info("DatabaseManager/convertDatabaseToCompactLayout() : " + dbName +
+                         " : " + str(sizeBefore) + " -> " + str(sizeAfter) + " bytes")
+        return sizeBefore, sizeAfter
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+************************************************************************************
+Class  : DatabaseSnapshot
+Author : Thierry Maillard (TMD)
+Date  : 18/10/2026
+
+Role : Copy a database file with sqlite online backup API.
+
+The copy is read through a read only connection : it is consistent even if
+the database is opened and modified by CalcAl during the copy.
+Pages are copied by steps so that a caller can display progress
+between steps. The copy is written in a temporary file renamed at the end.
+Rotating backups of a database are kept in a backup directory.
+
+Licence : GPLv3
+Copyright (c) 2016 - Thierry Maillard
+
+This file is part of CalcAl project.
+
+CalcAl project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CalcAl project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
+************************************************************************************
+"""
+import logging
+import os
+import os.path
+import pathlib
+import sqlite3
+import time
+
+class DatabaseSnapshot():
+    """ Copies and rotating backups of database files """
+
+    def __init__(self, configApp):
+        """ Initialize snapshot service with parameters read in configApp """
+        self.configApp = configApp
+        self.logger = logging.getLogger(self.configApp.get('Log', 'LoggerName'))
+        self.nbPagesPerStep = int(self.configApp.get('Database', 'SnapshotPagesPerStep'))
+        self.nbRotatingBackups = int(self.configApp.get('Database', 'NbRotatingBackups'))
+
+    def copyFile(self, databasePath, copyPath, progressCallback=None):
+        """ Copy database databasePath in copyPath, replaced if it exists
+            progressCallback(nbPagesCopied, nbPages) is called after each step
+            Return time used in seconds """
+        startTime = time.perf_counter()
+        uriDatabase = pathlib.Path(databasePath).absolute().as_uri() + "?mode=ro"
+        tmpPath = copyPath + ".tmp"
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+        def progress(dummy, nbPagesRemaining, nbPages):
+            """ Called by sqlite after each step """
+            if progressCallback is not None:
+                progressCallback(nbPages - nbPagesRemaining, nbPages)
+        connSource = sqlite3.connect(uriDatabase, uri=True)
+        try:
+            connCopy = sqlite3.connect(tmpPath)
+            try:
+                connSource.backup(connCopy, pages=self.nbPagesPerStep, progress=progress)
+            finally:
+                connCopy.close()
+        except sqlite3.Error:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+        finally:
+            connSource.close()
+        os.replace(tmpPath, copyPath)
+        duration = time.perf_counter() - startTime
+        self.logger.info("DatabaseSnapshot : " + databasePath + " copied in " + copyPath +
+                         " in " + "{:.2f}".format(duration) + " s")
+        return duration
+
+    def getBackupPaths(self, databasePath, backupDirPath):
+        """ Return paths of backups of databasePath in backupDirPath, oldest first """
+        prefix = os.path.splitext(os.path.basename(databasePath))[0] + "_"
+        extension = os.path.splitext(databasePath)[1]
+        if not os.path.isdir(backupDirPath):
+            return []
+        return sorted(os.path.join(backupDirPath, filename)
+                      for filename in os.listdir(backupDirPath)
+                      if filename.startswith(prefix) and filename.endswith(extension) and
+                      filename[len(prefix):-len(extension)].replace("_", "").isdigit())
+
+    def backup(self, databasePath, backupDirPath, progressCallback=None):
+        """ Copy databasePath in a new backup file named with current date in backupDirPath
+            Only the nbRotatingBackups last backups of this database are kept
+            Return path of backup, None if backups are disabled """
+        if self.nbRotatingBackups <= 0:
+            return None
+        if not os.path.isdir(backupDirPath):
+            os.makedirs(backupDirPath)
+        baseName, extension = os.path.splitext(os.path.basename(databasePath))
+        backupPath = os.path.join(backupDirPath,
+                                  baseName + "_" + time.strftime("%Y%m%d_%H%M%S") + extension)
+        self.copyFile(databasePath, backupPath, progressCallback)
+        for oldBackupPath in self.getBackupPaths(databasePath,
+                                                 backupDirPath)[:-self.nbRotatingBackups]:
+            os.remove(oldBackupPath)
+            self.logger.debug("DatabaseSnapshot : old backup " + oldBackupPath + " deleted")
+        return backupPath
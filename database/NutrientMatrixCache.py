@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+************************************************************************************
+Class  : NutrientMatrixCache
+Author : Thierry Maillard (TMD)
+Date  : 18/10/2026
+
+Role : Keep in memory products and their constituants values for an open Database.
+
+Values are stored in a dense matrix product x constituant (array of floats),
+qualifiers in a matrix of small integers and products are found by name
+or by code with dictionaries giving their row in matrix.
+The cache is loaded on first use and must be invalidated or patched
+by Database each time reference tables are modified.
+
+Licence : GPLv3
+Copyright (c) 2016 - Thierry Maillard
+
+This file is part of CalcAl project.
+
+CalcAl project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CalcAl project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
+************************************************************************************
+"""
+import array
+import fnmatch
+import logging
+
+from util import StringUtil
+
+class NutrientMatrixCache():
+    """ In memory matrix of constituants values for all products of a database """
+
+    # Qualifier codes stored in qualifiers matrix : 0 means no value in database
+    NO_VALUE = 0
+    QUALIFIERS = ('', 'N', '-', 'T', '<')
+
+    # Size in bytes of a cell in values and qualifiers matrix
+    SIZE_CELL = 8 + 1
+
+    def __init__(self, configApp):
+        """ Initialize an empty cache, memory budget is read in configApp """
+        self.configApp = configApp
+        self.logger = logging.getLogger(self.configApp.get('Log', 'LoggerName'))
+        self.maxMemoryBytes = float(self.configApp.get('Database',
+                                                       'NutrientCacheMaxMB')) * 1024 * 1024
+        self.startGroupProductCodes = int(self.configApp.get('Limits',
+                                                             'startGroupProductCodes'))
+        self.isOverBudget = False
+        self.clear()
+
+    def clear(self):
+        """ Free all data in this cache """
+        self.loaded = False
+        self.listProducts = []
+        self.listFoldedNames = []
+        self.dictRowByName = dict()
+        self.dictRowByCode = dict()
+        self.dictColumnByCode = dict()
+        self.listConstituants = []
+        self.values = array.array('d')
+        self.qualifiers = bytearray()
+        self.dictQualifierCodes = {qualifier: code
+                                   for code, qualifier in enumerate(self.QUALIFIERS)}
+        self.listQualifiers = list(self.QUALIFIERS)
+
+    def invalidate(self):
+        """ Called when reference tables are modified : cache will be reloaded on next use """
+        if self.loaded or self.isOverBudget:
+            self.logger.debug("NutrientMatrixCache : invalidated")
+        self.clear()
+        self.isOverBudget = False
+
+    def isLoaded(self):
+        """ Return True if this cache contains data """
+        return self.loaded
+
+    def getMemorySize(self, nbProducts, nbConstituants):
+        """ Return memory needed in bytes by matrix for this number of products """
+        return nbProducts * nbConstituants * self.SIZE_CELL
+
+    def load(self, connDB):
+        """ Read all products and their values in database opened with connDB
+            Return True if loaded, False if over memory budget """
+        self.clear()
+        cursor = connDB.cursor()
+        cursor.execute("SELECT COUNT(*) FROM products")
+        nbProducts = cursor.fetchone()[0]
+        cursor.execute("SELECT code, name, shortcut FROM constituantsNames ORDER BY code")
+        listConstituants = cursor.fetchall()
+        memorySize = self.getMemorySize(nbProducts, len(listConstituants))
+        if memorySize > self.maxMemoryBytes:
+            cursor.close()
+            self.isOverBudget = True
+            self.logger.warning("NutrientMatrixCache : " + str(memorySize) +
+                                " bytes needed, over budget : cache not used")
+            return False
+
+        self.listConstituants = listConstituants
+        for column, constituant in enumerate(self.listConstituants):
+            self.dictColumnByCode[constituant[0]] = column
+
+        cursor.execute("""SELECT name, code, familyName, source, dateSource, urlSource
+                          FROM products ORDER BY name""")
+        for infoProduct in cursor.fetchall():
+            self.appendProductRow(infoProduct)
+
+        cursor.execute("""SELECT productCode, constituantCode, value, qualifValue
+                          FROM constituantsValues""")
+        for productCode, constituantCode, value, qualifValue in cursor:
+            row = self.dictRowByCode.get(productCode)
+            column = self.dictColumnByCode.get(constituantCode)
+            if row is not None and column is not None:
+                self.setCell(row, column, value, qualifValue, replace=False)
+        cursor.close()
+        self.loaded = True
+        self.logger.info("NutrientMatrixCache : " + str(len(self.listProducts)) +
+                         " products and " + str(len(self.listConstituants)) +
+                         " constituants loaded, " + str(memorySize) + " bytes")
+        return True
+
+    def appendProductRow(self, infoProduct):
+        """ Append an empty row in matrix for product
+            infoProduct : (name, code, familyName, source, dateSource, urlSource) """
+        row = len(self.listProducts)
+        self.listProducts.append(tuple(infoProduct))
+        self.listFoldedNames.append(StringUtil.foldName(infoProduct[0]))
+        self.dictRowByName[infoProduct[0]] = row
+        self.dictRowByCode[infoProduct[1]] = row
+        nbConstituants = len(self.listConstituants)
+        self.values.extend([0.0] * nbConstituants)
+        self.qualifiers.extend(bytes(nbConstituants))
+        return row
+
+    def setCell(self, row, column, value, qualifValue, replace=True):
+        """ Set value and qualifier for a product row and a constituant column
+            if replace is False, keep the first value read """
+        index = row * len(self.listConstituants) + column
+        if replace or self.qualifiers[index] == self.NO_VALUE:
+            if qualifValue not in self.dictQualifierCodes:
+                self.dictQualifierCodes[qualifValue] = len(self.listQualifiers)
+                self.listQualifiers.append(qualifValue)
+            self.values[index] = value
+            self.qualifiers[index] = self.dictQualifierCodes[qualifValue]
+
+    def addProduct(self, infoProduct, dictComponentsQualifierQuantity):
+        """ Patch cache with a new product created by user
+            infoProduct : (name, code, familyName, source, dateSource, urlSource)
+            dictComponentsQualifierQuantity[constituantCode] = [qualifValue, value] """
+        if not self.loaded:
+            return
+        memorySize = self.getMemorySize(len(self.listProducts) + 1, len(self.listConstituants))
+        if memorySize > self.maxMemoryBytes:
+            self.invalidate()
+            return
+        row = self.appendProductRow(infoProduct)
+        for constituantCode, qualifierValue in dictComponentsQualifierQuantity.items():
+            column = self.dictColumnByCode.get(constituantCode)
+            if column is not None:
+                self.setCell(row, column, qualifierValue[1], qualifierValue[0])
+        self.logger.debug("NutrientMatrixCache : product " + str(infoProduct[0]) + " added")
+
+    def getInfoComponent(self, codeProduct, codeComponent):
+        """ Same result as Database.getInfoComponent() """
+        dictComponent = dict()
+        dictComponent["productCode"] = codeProduct
+        dictComponent["constituantCode"] = codeComponent
+        dictComponent["name"] = ""
+        dictComponent["shortcut"] = ""
+        dictComponent["value"] = 0.0
+        dictComponent["qualifValue"] = '-'
+        column = self.dictColumnByCode.get(codeComponent)
+        if column is not None:
+            dictComponent["name"] = self.listConstituants[column][1]
+            dictComponent["shortcut"] = self.listConstituants[column][2]
+            row = self.dictRowByCode.get(codeProduct)
+            if row is not None:
+                index = row * len(self.listConstituants) + column
+                if self.qualifiers[index] != self.NO_VALUE:
+                    dictComponent["value"] = self.values[index]
+                    dictComponent["qualifValue"] = self.listQualifiers[self.qualifiers[index]]
+        return dictComponent
+
+    def getInfoFoodsComponents(self, listFoodNames, listComponentCodes):
+        """ Same result as Database.getInfoFoodsComponents() """
+        listComponentCodes = list(listComponentCodes)
+        nbConstituants = len(self.listConstituants)
+        dictInfoFoodsComponents = dict()
+        for foodName in listFoodNames:
+            row = self.dictRowByName.get(foodName)
+            if row is None:
+                continue
+            infoProduct = self.listProducts[row]
+            dictInfoFood = dict()
+            for numField, field in enumerate(("name", "code", "familyName",
+                                              "source", "dateSource", "urlSource")):
+                dictInfoFood[field] = infoProduct[numField]
+            dictInfoFood["isGroup"] = infoProduct[1] < self.startGroupProductCodes
+            dictInfoComponents = dict()
+            for componentCode in listComponentCodes:
+                column = self.dictColumnByCode.get(componentCode)
+                if column is None:
+                    dictInfoComponents[componentCode] = [componentCode, "", "", 0.0, '-']
+                    continue
+                index = row * nbConstituants + column
+                value = 0.0
+                qualifValue = '-'
+                if self.qualifiers[index] != self.NO_VALUE:
+                    value = self.values[index]
+                    qualifValue = self.listQualifiers[self.qualifiers[index]]
+                dictInfoComponents[componentCode] = [componentCode,
+                                                     self.listConstituants[column][1],
+                                                     self.listConstituants[column][2],
+                                                     value, qualifValue]
+            dictInfoFoodsComponents[foodName] = [dictInfoFood, dictInfoComponents]
+        return dictInfoFoodsComponents
+
+    def getListFamilyFoodstuff(self):
+        """ Return sorted list of family names """
+        return sorted(set(infoProduct[2] for infoProduct in self.listProducts))
+
+    def getListFoodstuffName(self, familyname):
+        """ Return sorted list of products names belonging to familyname """
+        return sorted(infoProduct[0] for infoProduct in self.listProducts
+                      if infoProduct[2] == familyname)
+
+    def existFoodstuffName(self, foodname):
+        """ Return True if foodname is a product name """
+        return foodname in self.dictRowByName
+
+    def getFamily4FoodName(self, foodName):
+        """ Return family of a product given its name """
+        return self.listProducts[self.dictRowByName[foodName]][2]
+
+    def getProductsNamesContainingPart(self, partWildcard):
+        """ Same result as Database.getProductsNamesContainingPart() :
+            sqlite GLOB and fnmatchcase() share the same wildcards """
+        partWildcardFolded = "*" + StringUtil.foldName(partWildcard) + "*"
+        return sorted(infoProduct[0]
+                      for infoProduct, foldedName in zip(self.listProducts, self.listFoldedNames)
+                      if fnmatch.fnmatchcase(foldedName, partWildcardFolded))
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+************************************************************************************
+Class  : QueryStats, InstrumentedConnection, InstrumentedCursor
+Author : Thierry Maillard (TMD)
+Date  : 18/10/2026
+
+Role : Measure SQL requests executed by CalcAl.
+
+Connections opened by ConnectionPool are InstrumentedConnection : their cursors
+time each execute and each fetch and count rows read or modified.
+Counters are kept by name of the method that executes the request
+(ex : getInfoFoodsComponents) and requests slower than a threshold are logged.
+
+Licence : GPLv3
+Copyright (c) 2016 - Thierry Maillard
+
+This file is part of CalcAl project.
+
+CalcAl project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CalcAl project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
+************************************************************************************
+"""
+import logging
+import sqlite3
+import sys
+import threading
+import time
+
+class QueryStats():
+    """ Counters of SQL requests by calling method """
+
+    def __init__(self, configApp):
+        """ Initialize empty counters, slow request threshold is read in configApp """
+        self.configApp = configApp
+        self.logger = logging.getLogger(self.configApp.get('Log', 'LoggerName'))
+        self.slowQuerySeconds = float(self.configApp.get('Database', 'SlowQueryMs')) / 1000.0
+        self.lock = threading.Lock()
+        self.dictStats = dict()
+
+    def record(self, methodName, sql, nbRows, duration, isNewCall):
+        """ Add a request execution or a fetch to counters of methodName
+            isNewCall : True for execute, False for rows fetched after execute """
+        with self.lock:
+            stats = self.dictStats.setdefault(methodName, [0, 0, 0.0, 0.0])
+            if isNewCall:
+                stats[0] += 1
+            stats[1] += nbRows
+            stats[2] += duration
+            stats[3] = max(stats[3], duration)
+        if duration > self.slowQuerySeconds:
+            self.logger.warning("Slow SQL request in " + methodName + " : " +
+                                "{:.1f}".format(duration * 1000.0) + " ms : " +
+                                " ".join(sql.split())[:200])
+
+    def getStats(self):
+        """ Return dict[methodName] = dict with keys calls, rows, totalTime, maxTime
+            times in seconds """
+        with self.lock:
+            return {methodName: {"calls": stats[0], "rows": stats[1],
+                                 "totalTime": stats[2], "maxTime": stats[3]}
+                    for methodName, stats in self.dictStats.items()}
+
+    def reset(self):
+        """ Set all counters to 0 """
+        with self.lock:
+            self.dictStats.clear()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """ Cursor that records its requests in connection queryStats """
+
+    def __init__(self, *args, **kwargs):
+        """ Initialize cursor : no request executed """
+        super(InstrumentedCursor, self).__init__(*args, **kwargs)
+        self.methodName = None
+        self.sql = ""
+
+    def recordExecute(self, sql, startTime):
+        """ Record a request executed by the method calling execute() """
+        # Skip frames of this module : request may be executed by connection.execute()
+        frame = sys._getframe(2)
+        while frame.f_back is not None and frame.f_code.co_filename == __file__:
+            frame = frame.f_back
+        self.methodName = frame.f_code.co_name
+        self.sql = sql
+        nbRows = max(self.rowcount, 0)
+        self.connection.queryStats.record(self.methodName, sql, nbRows,
+                                          time.perf_counter() - startTime, True)
+
+    def recordFetch(self, nbRows, startTime):
+        """ Record rows fetched for last request """
+        if self.methodName is not None:
+            self.connection.queryStats.record(self.methodName, self.sql, nbRows,
+                                              time.perf_counter() - startTime, False)
+
+    def execute(self, sql, parameters=()):
+        startTime = time.perf_counter()
+        super(InstrumentedCursor, self).execute(sql, parameters)
+        self.recordExecute(sql, startTime)
+        return self
+
+    def executemany(self, sql, seqParameters):
+        startTime = time.perf_counter()
+        super(InstrumentedCursor, self).executemany(sql, seqParameters)
+        self.recordExecute(sql, startTime)
+        return self
+
+    def fetchone(self):
+        startTime = time.perf_counter()
+        row = super(InstrumentedCursor, self).fetchone()
+        self.recordFetch(0 if row is None else 1, startTime)
+        return row
+
+    def fetchmany(self, size=None):
+        startTime = time.perf_counter()
+        if size is None:
+            size = self.arraysize
+        rows = super(InstrumentedCursor, self).fetchmany(size)
+        self.recordFetch(len(rows), startTime)
+        return rows
+
+    def fetchall(self):
+        startTime = time.perf_counter()
+        rows = super(InstrumentedCursor, self).fetchall()
+        self.recordFetch(len(rows), startTime)
+        return rows
+
+    def __next__(self):
+        startTime = time.perf_counter()
+        row = super(InstrumentedCursor, self).__next__()
+        self.recordFetch(1, startTime)
+        return row
+
+class InstrumentedConnection(sqlite3.Connection):
+    """ Connection whose cursors are InstrumentedCursor """
+
+    def __init__(self, *args, **kwargs):
+        """ Initialize connection, queryStats must be set by caller """
+        super(InstrumentedConnection, self).__init__(*args, **kwargs)
+        self.queryStats = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super(InstrumentedConnection, self).cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seqParameters):
+        return self.cursor().executemany(sql, seqParameters)
@@ -0,0 +1,577 @@
+# -*- coding: utf-8 -*-
+"""
+************************************************************************************
+Class  : SchemaMigrator
+Author : Thierry Maillard (TMD)
+Date  : 18/10/2026
+
+Role : Upgrade the structure of a CalcAl database with an ordered list of migrations.
+
+Each migration is identified by a version number and is applied only once :
+applied versions are recorded in schemaVersion table.
+Existing databases are upgraded in place when they are opened.
+
+Licence : GPLv3
+Copyright (c) 2016 - Thierry Maillard
+
+This file is part of CalcAl project.
+
+CalcAl project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CalcAl project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
+************************************************************************************
+"""
+import logging
+import sqlite3
+import time
+
+from util import CalcalExceptions
+
+class SchemaMigrator():
+    """ Apply missing migrations to a database structure """
+
+    # Ordered list of migrations : (version, description, method name)
+    # Never modify or renumber an existing migration : add a new one at the end
+    MIGRATIONS = (
+        (1, "Index composition and portion tables", "migrationIndexCompositionPortions"),
+        (2, "Index pathology and patient tables", "migrationIndexPathologiesPatients"),
+        (3, "Index constituants values heap table", "migrationIndexConstituantsValues"),
+        (4, "Full text index of products names", "migrationProductsNamesIndex"),
+        (5, "Database state and energy correction queue", "migrationEnergyCorrectionState"),
+        (6, "Index constituants values by level", "migrationIndexConstituantsLevels"),
+        (7, "Constituants statistics", "migrationConstituantsStats"),
+        (8, "Foreign keys with cascading deletes on user tables", "migrationForeignKeys"),
+        (9, "Index portions identifiers ignoring case", "migrationIndexPortionsIds"),
+        (10, "Portions nutrients totals", "migrationPortionTotals"),
+        (11, "Groups composition in base products", "migrationCompositionClosure"),
+        (12, "Changes counters of tables", "migrationTablesChanges"),
+        (13, "Families catalog and database counters", "migrationFamiliesCounters"),
+        (14, "Products names index updated without SQL function",
+         "migrationProductsNamesIndexPending"),
+        )
+
+    def __init__(self, configApp, connDB):
+        """ Initialize a migrator for the database opened with connection connDB """
+        self.configApp = configApp
+        self.connDB = connDB
+        self.logger = logging.getLogger(self.configApp.get('Log', 'LoggerName'))
+
+    def getVersion(self):
+        """ Return the last migration version applied to this database, 0 if none """
+        cursor = self.connDB.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='schemaVersion'")
+        version = 0
+        if cursor.fetchone() is not None:
+            cursor.execute("SELECT MAX(version) FROM schemaVersion")
+            version = cursor.fetchone()[0] or 0
+        cursor.close()
+        return version
+
+    def getLastVersion(self):
+        """ Return the version of the last migration known by this software """
+        return self.MIGRATIONS[-1][0]
+
+    def upgrade(self):
+        """ Apply all migrations not yet applied to this database
+            Each migration is applied in its own transaction
+            Return the number of migrations applied """
+        if self.connDB.in_transaction:
+            self.connDB.commit()
+        cursor = self.connDB.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schemaVersion(
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                dateApplied TEXT
+                )""")
+        cursor.close()
+
+        currentVersion = self.getVersion()
+        nbMigrations = 0
+        # Tables are rebuilt by migrations : foreign keys actions must not be triggered
+        cursor = self.connDB.cursor()
+        cursor.execute("PRAGMA foreign_keys")
+        isForeignKeysOn = cursor.fetchone()[0]
+        cursor.execute("PRAGMA foreign_keys = OFF")
+        try:
+            for version, description, methodName in self.MIGRATIONS:
+                if version > currentVersion:
+                    self.applyMigration(version, description, getattr(self, methodName))
+                    nbMigrations += 1
+        finally:
+            if isForeignKeysOn:
+                cursor.execute("PRAGMA foreign_keys = ON")
+            cursor.close()
+        if nbMigrations > 0:
+            self.logger.info("SchemaMigrator : " + str(nbMigrations) +
+                             " migrations applied, schema version " + str(self.getVersion()))
+        # Groups counter follows configuration changes
+        if self.getVersion() >= 13:
+            self.updateGroupsRule()
+        return nbMigrations
+
+    def applyMigration(self, version, description, migrationFunction):
+        """ Apply one migration and record its version in the same transaction """
+        self.logger.debug("SchemaMigrator : apply migration " + str(version) + " : " +
+                          description)
+        cursor = self.connDB.cursor()
+        try:
+            cursor.execute("BEGIN")
+            migrationFunction(cursor)
+            cursor.execute("""INSERT INTO schemaVersion(version, description, dateApplied)
+                              VALUES(?, ?, ?)""",
+                           (version, description, time.strftime("%Y-%m-%d %H:%M:%S")))
+            self.connDB.commit()
+        except sqlite3.Error as exc:
+            self.connDB.rollback()
+            raise CalcalExceptions.DatabaseException(self.configApp,
+                                                     "SchemaMigrator : migration " +
+                                                     str(version) + " (" + description +
+                                                     ") failed : " + str(exc))
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def migrationIndexCompositionPortions(cursor):
+        """ Migration 1 : covering indexes for groups and portions details
+            used by getPartsOfComposedProduct, getInfoFood, deleteUserProduct,
+            getAllInfo4Portion, deletePortion and deletePatient """
+        cursor.execute("""CREATE INDEX IF NOT EXISTS compositionProductsIdx
+                          ON compositionProducts(productCode, productCodePart, quantityPercent)""")
+        cursor.execute("""CREATE INDEX IF NOT EXISTS compositionProductsPartIdx
+                          ON compositionProducts(productCodePart)""")
+        cursor.execute("""CREATE INDEX IF NOT EXISTS portionsDetailsIdx
+                          ON portionsDetails(portionCode, productCode, quantity)""")
+        cursor.execute("CREATE INDEX IF NOT EXISTS portionsPatientIdx ON portions(patient)")
+
+    @staticmethod
+    def migrationIndexPathologiesPatients(cursor):
+        """ Migration 2 : indexes for pathologies components and patient pathologies
+            used by getComponentsCodes4Pathologies, deletePathology and deletePatient """
+        cursor.execute("""CREATE INDEX IF NOT EXISTS pathologiesConstituantsIdx
+                          ON pathologiesConstituants(pathologyName, constituantCode)""")
+        cursor.execute("""CREATE INDEX IF NOT EXISTS patientPathologiesIdx
+                          ON patientPathologies(patientCode, pathologyName)""")
+        cursor.execute("""CREATE INDEX IF NOT EXISTS patientPathologiesNameIdx
+                          ON patientPathologies(pathologyName)""")
+
+    @staticmethod
+    def isCompactValuesLayout(cursor):
+        """ Return True if constituantsValues table is a WITHOUT ROWID table
+            clustered on its primary key (productCode, constituantCode) """
+        cursor.execute("""SELECT sql FROM sqlite_master
+                          WHERE type='table' AND name='constituantsValues'""")
+        result = cursor.fetchone()
+        return result is not None and "WITHOUT ROWID" in result[0].upper()
+
+    @staticmethod
+    def migrationIndexConstituantsValues(cursor):
+        """ Migration 3 : point lookups by product and constituant in heap layout
+            Compact layout is already clustered on these columns """
+        if not SchemaMigrator.isCompactValuesLayout(cursor):
+            cursor.execute("""CREATE INDEX IF NOT EXISTS constituantsValuesIdx
+                              ON constituantsValues(productCode, constituantCode)""")
+
+    @staticmethod
+    def migrationProductsNamesIndex(cursor):
+        """ Migration 4 : trigram index of products names without accents and case
+            used by getProductsNamesContainingPart
+            Index is kept up to date by triggers calling SQL function foldName()
+            registered by Database.open() : replaced by migration 14
+            Skipped if this sqlite library has no FTS5 trigram tokenizer """
+        try:
+            cursor.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS productsNamesIndex
+                              USING fts5(foldedName, tokenize='trigram case_sensitive 1')""")
+        except sqlite3.OperationalError:
+            return
+        cursor.execute("DELETE FROM productsNamesIndex")
+        cursor.execute("""INSERT INTO productsNamesIndex(rowid, foldedName)
+                          SELECT code, foldName(name) FROM products""")
+        cursor.execute("""CREATE TRIGGER IF NOT EXISTS productsNamesIndexInsert
+                          AFTER INSERT ON products
+                          BEGIN
+                            INSERT INTO productsNamesIndex(rowid, foldedName)
+                            VALUES(new.code, foldName(new.name));
+                          END""")
+        cursor.execute("""CREATE TRIGGER IF NOT EXISTS productsNamesIndexDelete
+                          AFTER DELETE ON products
+                          BEGIN
+                            DELETE FROM productsNamesIndex WHERE rowid=old.code;
+                          END""")
+        cursor.execute("""CREATE TRIGGER IF NOT EXISTS productsNamesIndexUpdate
+                          AFTER UPDATE OF code, name ON products
+                          BEGIN
+                            DELETE FROM productsNamesIndex WHERE rowid=old.code;
+                            INSERT INTO productsNamesIndex(rowid, foldedName)
+                            VALUES(new.code, foldName(new.name));
+                          END""")
+
+    @staticmethod
+    def migrationProductsNamesIndexPending(cursor):
+        """ Migration 14 : triggers of products names index no longer call foldName(),
+            unknown by other programs modifying products (sqlite3 shell, older CalcAl)
+            Triggers delete index lines of products deleted or renamed and list in
+            productsNamesIndexPending products to index, indexed by
+            Database.updateProductsNamesIndex() and searched without index until then
+            Skipped if products names index doesn't exist """
+        cursor.execute("""SELECT 1 FROM sqlite_master
+                          WHERE type='table' AND name='productsNamesIndex'""")
+        if cursor.fetchone() is None:
+            return
+        for triggerName in ("productsNamesIndexInsert", "productsNamesIndexDelete",
+                            "productsNamesIndexUpdate"):
+            cursor.execute("DROP TRIGGER IF EXISTS " + triggerName)
+        cursor.execute("""CREATE TABLE IF NOT EXISTS productsNamesIndexPending(
+                            productCode INTEGER PRIMARY KEY
+                            )""")
+        cursor.execute("""CREATE TRIGGER IF NOT EXISTS productsNamesPendingInsert
+                          AFTER INSERT ON products
+                          BEGIN
+                            INSERT OR IGNORE INTO productsNamesIndexPending(productCode)
+                            VALUES(new.code);
+                          END""")
+        cursor.execute("""CREATE TRIGGER IF NOT EXISTS productsNamesPendingDelete
+                          AFTER DELETE ON products
+                          BEGIN
+                            DELETE FROM productsNamesIndex WHERE rowid=old.code;
+                            DELETE FROM productsNamesIndexPending WHERE productCode=old.code;
+                          END""")
+        cursor.execute("""CREATE TRIGGER IF NOT EXISTS productsNamesPendingUpdate
+                          AFTER UPDATE OF code, name ON products
+                          BEGIN
+                            DELETE FROM productsNamesIndex WHERE rowid=old.code;
+                            DELETE FROM productsNamesIndexPending WHERE productCode=old.code;
+                            INSERT OR IGNORE INTO productsNamesIndexPending(productCode)
+                            VALUES(new.code);
+                          END""")
+
+    @staticmethod
+    def migrationEnergyCorrectionState(cursor):
+        """ Migration 5 : databaseState table records named values about this database
+            energyCorrectionPending table lists products not yet checked
+            by Database.correctEnergyKcal() : all existing products, then products
+            inserted later thanks to a trigger """
+        cursor.execute("""CREATE TABLE IF NOT EXISTS databaseState(
+                            name TEXT PRIMARY KEY,
+                            value TEXT
+                            ) WITHOUT ROWID""")
+        cursor.execute("""CREATE TABLE IF NOT EXISTS energyCorrectionPending(
+                            productCode INTEGER PRIMARY KEY
+                            )""")
+        cursor.execute("""INSERT OR IGNORE INTO energyCorrectionPending(productCode)
+                          SELECT code FROM products""")
+        cursor.execute("""CREATE TRIGGER IF NOT EXISTS energyCorrectionPendingInsert
+                          AFTER INSERT ON products
+                          BEGIN
+                            INSERT OR IGNORE INTO energyCorrectionPending(productCode)
+                            VALUES(new.code);
+                          END""")
+
+    @staticmethod
+    def migrationIndexConstituantsLevels(cursor):
+        """ Migration 6 : products having a constituant level in a range
+            used by each filter join of getProductComponents4Filters
+            and by getMinMaxForConstituants """
+        cursor.execute("""CREATE INDEX IF NOT EXISTS constituantsValuesLevelIdx
+                          ON constituantsValues(constituantCode, value)""")
+
+    @staticmethod
+    def migrationConstituantsStats(cursor):
+        """ Migration 7 : statistics on values of each constituant
+            filled by Database.updateConstituantsStats()
+            buckets : bounds of values groups with the same number of values
+                      separated by ; """
+        cursor.execute("""CREATE TABLE IF NOT EXISTS constituantsStats(
+                            constituantCode INTEGER PRIMARY KEY,
+                            minValue REAL,
+                            maxValue REAL,
+                            nbValues INTEGER,
+                            nbNulls INTEGER,
+                            buckets TEXT
+                            )""")
+
+    # Tables rebuilt by migration 8 : (table, columns definition, condition on rows kept)
+    # Rows whose parent is missing can't be kept with a foreign key :
+    # they are moved in a table named as their table followed by Orphans
+    USER_TABLES_FOREIGN_KEYS = (
+        ("portionsDetails",
+         """portionCode INTEGER REFERENCES portions(code)
+                ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+            productCode INTEGER,
+            quantity REAL""",
+         "portionCode IN (SELECT code FROM portions)"),
+        ("compositionProducts",
+         """productCode INTEGER REFERENCES products(code)
+                ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+            productCodePart INTEGER,
+            quantityPercent REAL""",
+         "productCode IN (SELECT code FROM products)"),
+        ("pathologiesConstituants",
+         """pathologyName TEXT REFERENCES pathologies(name)
+                ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+            constituantCode INTEGER""",
+         "pathologyName IN (SELECT name FROM pathologies)"),
+        ("patientPathologies",
+         """patientCode TEXT REFERENCES patientInfo(code)
+                ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+            pathologyName TEXT""",
+         "patientCode IN (SELECT code FROM patientInfo)"),
+        )
+
+    def migrationForeignKeys(self, cursor):
+        """ Migration 8 : user tables details reference their parent row
+            and are deleted with it : portions, group products, pathologies and patients
+            Tables are rebuilt because sqlite can't add a foreign key to a table
+            Their indexes are created again
+            Foreign keys are enforced by PRAGMA foreign_keys set on each connection
+            Rows whose parent is missing are moved in tableNameOrphans table
+            without foreign key, that user can inspect : their number is logged """
+        for tableName, columnsDefinition, condition in \
+                SchemaMigrator.USER_TABLES_FOREIGN_KEYS:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                           (tableName,))
+            if cursor.fetchone() is None:
+                continue
+            cursor.execute("PRAGMA foreign_key_list(" + tableName + ")")
+            if cursor.fetchone() is not None:
+                continue
+            cursor.execute("SELECT COUNT(*) FROM " + tableName + " WHERE NOT (" + condition + ")")
+            nbOrphans = cursor.fetchone()[0]
+            if nbOrphans > 0:
+                cursor.execute("CREATE TABLE IF NOT EXISTS " + tableName + "Orphans AS " +
+                               "SELECT * FROM " + tableName + " WHERE 0")
+                cursor.execute("INSERT INTO " + tableName + "Orphans SELECT * FROM " +
+                               tableName + " WHERE NOT (" + condition + ")")
+                self.logger.warning("SchemaMigrator : migration 8 : " + str(nbOrphans) +
+                                    " rows of " + tableName + " without parent row moved in " +
+                                    tableName + "Orphans")
+            cursor.execute("CREATE TABLE " + tableName + "New(" + columnsDefinition + ")")
+            cursor.execute("INSERT INTO " + tableName + "New SELECT * FROM " + tableName +
+                           " WHERE " + condition)
+            cursor.execute("DROP TABLE " + tableName)
+            cursor.execute("ALTER TABLE " + tableName + "New RENAME TO " + tableName)
+        SchemaMigrator.migrationIndexCompositionPortions(cursor)
+        SchemaMigrator.migrationIndexPathologiesPatients(cursor)
+
+    @staticmethod
+    def migrationIndexPortionsIds(cursor):
+        """ Migration 9 : find a portion by its name, date and patient ignoring case
+            used by getPortionCode
+            Index is unique unless existing portions already break this rule """
+        cursor.execute("""SELECT 1 FROM portions
+                          GROUP BY name COLLATE NOCASE, date COLLATE NOCASE,
+                                   patient COLLATE NOCASE
+                          HAVING COUNT(*) > 1""")
+        isUnique = cursor.fetchone() is None
+        cursor.execute("CREATE " + ("UNIQUE " if isUnique else "") +
+                       """INDEX IF NOT EXISTS portionsIdsIdx
+                          ON portions(name COLLATE NOCASE, date COLLATE NOCASE,
+                                      patient COLLATE NOCASE)""")
+
+    @staticmethod
+    def migrationPortionTotals(cursor):
+        """ Migration 10 : total of each constituant for each portion
+            with its reduced qualifier, filled by Database.updatePortionTotals()
+            Totals are deleted with their portion
+            Index used to sort portions by a constituant total """
+        cursor.execute("""CREATE TABLE IF NOT EXISTS portionTotals(
+                            portionCode INTEGER NOT NULL REFERENCES portions(code)
+                                ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+                            constituantCode INTEGER NOT NULL,
+                            value REAL,
+                            qualifValue TEXT,
+                            PRIMARY KEY(portionCode, constituantCode)
+                            ) WITHOUT ROWID""")
+        cursor.execute("""CREATE INDEX IF NOT EXISTS portionTotalsLevelIdx
+                          ON portionTotals(constituantCode, value)""")
+
+    @staticmethod
+    def migrationCompositionClosure(cursor):
+        """ Migration 11 : each group with all base products it contains,
+            even through groups of groups, and their cumulative percentage in group
+            Base products are not groups themselves
+            Filled for existing groups by a recursive request,
+            then by Database.insertNewComposedProduct() for each new group
+            Lines are deleted with their group """
+        cursor.execute("""CREATE TABLE IF NOT EXISTS compositionClosure(
+                            productCode INTEGER NOT NULL REFERENCES products(code)
+                                ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+                            baseProductCode INTEGER NOT NULL,
+                            quantityPercent REAL,
+                            PRIMARY KEY(productCode, baseProductCode)
+                            ) WITHOUT ROWID""")
+        cursor.execute("""CREATE INDEX IF NOT EXISTS compositionClosureBaseIdx
+                          ON compositionClosure(baseProductCode)""")
+        cursor.execute("""
+            WITH RECURSIVE expansion(productCode, productCodePart, quantityPercent) AS (
+                SELECT productCode, productCodePart, quantityPercent
+                FROM compositionProducts
+                WHERE productCode IN (SELECT code FROM products)
+                UNION ALL
+                SELECT expansion.productCode, compositionProducts.productCodePart,
+                       expansion.quantityPercent * compositionProducts.quantityPercent / 100.0
+                FROM expansion
+                  JOIN compositionProducts
+                    ON compositionProducts.productCode = expansion.productCodePart)
+            INSERT OR REPLACE INTO compositionClosure(productCode, baseProductCode,
+                                                      quantityPercent)
+                SELECT productCode, productCodePart, SUM(quantityPercent)
+                FROM expansion
+                WHERE productCodePart NOT IN (SELECT productCode FROM compositionProducts)
+                GROUP BY productCode, productCodePart""")
+
+    # Tables whose changes are counted by migration 12
+    # A migration rebuilding one of them must create its triggers again
+    TABLES_CHANGES_WATCHED = ("products", "compositionProducts", "databaseState",
+                              "portions", "portionsDetails",
+                              "pathologies", "pathologiesConstituants",
+                              "patientInfo", "patientPathologies")
+
+    @staticmethod
+    def migrationTablesChanges(cursor):
+        """ Migration 12 : number of rows changes of each watched table,
+            incremented by triggers on each insert, update or delete
+            Used by ChangeTracker to know which tables were modified by other programs """
+        cursor.execute("""CREATE TABLE IF NOT EXISTS tablesChanges(
+                            tableName TEXT PRIMARY KEY,
+                            counter INTEGER NOT NULL DEFAULT 0
+                            ) WITHOUT ROWID""")
+        for tableName in SchemaMigrator.TABLES_CHANGES_WATCHED:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                           (tableName,))
+            if cursor.fetchone() is None:
+                continue
+            cursor.execute("INSERT OR IGNORE INTO tablesChanges(tableName) VALUES(?)",
+                           (tableName,))
+            for operation in ("INSERT", "UPDATE", "DELETE"):
+                cursor.execute("CREATE TRIGGER IF NOT EXISTS " + tableName + "Changes" +
+                               operation.capitalize() + " AFTER " + operation + " ON " +
+                               tableName + """
+                               BEGIN
+                                 UPDATE tablesChanges SET counter = counter + 1
+                                 WHERE tableName = '""" + tableName + """';
+                               END""")
+
+    def createFamiliesTriggers(self, cursor):
+        """ Create triggers of migration 13 updating families and products counters
+            and count groups : products with a code lower than
+            [Limits]startGroupProductCodes, written in triggers that can't use parameters
+            Its value is saved in databaseState : see updateGroupsRule() """
+        startGroupProductCodes = int(self.configApp.get('Limits', 'startGroupProductCodes'))
+        for triggerName in ("familiesInsert", "familiesDelete", "familiesUpdate"):
+            cursor.execute("DROP TRIGGER IF EXISTS " + triggerName)
+        cursor.execute("""CREATE TRIGGER familiesInsert
+                          AFTER INSERT ON products
+                          BEGIN
+                            INSERT INTO families(familyName, nbProducts)
+                            VALUES(IFNULL(new.familyName, ''), 1)
+                            ON CONFLICT(familyName) DO UPDATE SET nbProducts = nbProducts + 1;
+                            UPDATE databaseCounters SET value = value + 1
+                            WHERE name = 'nbProducts' OR (name = 'nbGroups' AND new.code < """ +
+                       str(startGroupProductCodes) + """);
+                          END""")
+        cursor.execute("""CREATE TRIGGER familiesDelete
+                          AFTER DELETE ON products
+                          BEGIN
+                            UPDATE families SET nbProducts = nbProducts - 1
+                            WHERE familyName = IFNULL(old.familyName, '');
+                            DELETE FROM families
+                            WHERE familyName = IFNULL(old.familyName, '') AND nbProducts <= 0;
+                            UPDATE databaseCounters SET value = value - 1
+                            WHERE name = 'nbProducts' OR (name = 'nbGroups' AND old.code < """ +
+                       str(startGroupProductCodes) + """);
+                          END""")
+        cursor.execute("""CREATE TRIGGER familiesUpdate
+                          AFTER UPDATE OF familyName, code ON products
+                          BEGIN
+                            UPDATE families SET nbProducts = nbProducts - 1
+                            WHERE familyName = IFNULL(old.familyName, '');
+                            DELETE FROM families
+                            WHERE familyName = IFNULL(old.familyName, '') AND nbProducts <= 0;
+                            INSERT INTO families(familyName, nbProducts)
+                            VALUES(IFNULL(new.familyName, ''), 1)
+                            ON CONFLICT(familyName) DO UPDATE SET nbProducts = nbProducts + 1;
+                            UPDATE databaseCounters
+                            SET value = value + (new.code < """ +
+                       str(startGroupProductCodes) + """) - (old.code < """ +
+                       str(startGroupProductCodes) + """)
+                            WHERE name = 'nbGroups';
+                          END""")
+        cursor.execute("""UPDATE databaseCounters
+                          SET value = (SELECT COUNT(*) FROM products WHERE code < ?)
+                          WHERE name = 'nbGroups'""", (startGroupProductCodes,))
+        cursor.execute("""INSERT OR REPLACE INTO databaseState(name, value)
+                          VALUES('startGroupProductCodes', ?)""", (str(startGroupProductCodes),))
+
+    def updateGroupsRule(self):
+        """ Create again triggers counting groups if [Limits]startGroupProductCodes
+            is not the value used when they were created
+            Return True if triggers are created again """
+        cursor = self.connDB.cursor()
+        cursor.execute("""SELECT value FROM databaseState
+                          WHERE name='startGroupProductCodes'""")
+        result = cursor.fetchone()
+        cursor.close()
+        if result is not None and \
+           int(result[0]) == int(self.configApp.get('Limits', 'startGroupProductCodes')):
+            return False
+        cursor = self.connDB.cursor()
+        try:
+            cursor.execute("BEGIN")
+            self.createFamiliesTriggers(cursor)
+            self.connDB.commit()
+        except sqlite3.Error:
+            self.connDB.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.logger.info("SchemaMigrator : groups counter triggers created again")
+        return True
+
+    def migrationFamiliesCounters(self, cursor):
+        """ Migration 13 : families of products with their number of products
+            and counters of products, groups and constituants, kept up to date by triggers
+            Used by Database.getInfoDatabase() and getListFamilyFoodstuff()
+            Groups are products with a code lower than [Limits]startGroupProductCodes :
+            see createFamiliesTriggers()
+            Index used to list products of a family ordered by name """
+        cursor.execute("""CREATE TABLE IF NOT EXISTS families(
+                            familyName TEXT NOT NULL PRIMARY KEY,
+                            nbProducts INTEGER NOT NULL
+                            ) WITHOUT ROWID""")
+        cursor.execute("DELETE FROM families")
+        cursor.execute("""INSERT INTO families(familyName, nbProducts)
+                          SELECT IFNULL(familyName, ''), COUNT(*) FROM products
+                          GROUP BY IFNULL(familyName, '')""")
+        cursor.execute("""CREATE TABLE IF NOT EXISTS databaseCounters(
+                            name TEXT PRIMARY KEY,
+                            value INTEGER NOT NULL
+                            ) WITHOUT ROWID""")
+        cursor.execute("""INSERT OR REPLACE INTO databaseCounters(name, value)
+                          VALUES('nbProducts', (SELECT COUNT(*) FROM products)),
+                                ('nbGroups', 0),
+                                ('nbConstituants', (SELECT COUNT(*) FROM constituantsNames))""")
+        self.createFamiliesTriggers(cursor)
+        cursor.execute("""CREATE TRIGGER IF NOT EXISTS constituantsCounterInsert
+                          AFTER INSERT ON constituantsNames
+                          BEGIN
+                            UPDATE databaseCounters SET value = value + 1
+                            WHERE name = 'nbConstituants';
+                          END""")
+        cursor.execute("""CREATE TRIGGER IF NOT EXISTS constituantsCounterDelete
+                          AFTER DELETE ON constituantsNames
+                          BEGIN
+                            UPDATE databaseCounters SET value = value - 1
+                            WHERE name = 'nbConstituants';
+                          END""")
+        cursor.execute("""CREATE INDEX IF NOT EXISTS productsFamilyIdx
+                          ON products(familyName, name)""")
@@ -71,13 +71,24 @@ class USDA_28_Reader():
                 urlSource TEXT
                 )""")
         # Create constitiants values table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS constituantsValues(
-                productCode INTEGER,
-                constituantCode INTEGER,
-                value REAL,
-                qualifValue TEXT
-                )""")
+        # V0.56 : compact layout : values clustered on their primary key
+        if self.configApp.getboolean('Database', 'CompactValuesLayout'):
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS constituantsValues(
+                    productCode INTEGER NOT NULL,
+                    constituantCode INTEGER NOT NULL,
+                    value REAL,
+                    qualifValue TEXT,
+                    PRIMARY KEY(productCode, constituantCode)
+                    ) WITHOUT ROWID""")
+        else:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS constituantsValues(
+                    productCode INTEGER,
+                    constituantCode INTEGER,
+                    value REAL,
+                    qualifValue TEXT
+                    )""")
 
         if pathZipFileInit.endswith(".zip"):
             with zipfile.ZipFile(pathZipFileInit, "r") as zfile:
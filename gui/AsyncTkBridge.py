@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+*********************************************************
+Class : AsyncTkBridge
+Auteur : Thierry Maillard (TMD)
+Date : 18/10/2026
+
+Role : Run an asyncio event loop from Tk main loop.
+
+Tk main loop owns GUI thread : asyncio loop is run periodically by after()
+until its ready callbacks are done. Coroutines run in GUI thread :
+after awaiting a database request (see database/AsyncDatabase), they can update widgets.
+
+Licence : GPLv3
+Copyright (c) 2016 - Thierry Maillard
+
+This file is part of CalcAl project.
+
+CalcAl project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CalcAl project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
+*********************************************************
+"""
+import asyncio
+import logging
+
+class AsyncTkBridge():
+    """ asyncio event loop driven by Tk after() """
+
+    def __init__(self, tkWidget, configApp):
+        """ Start running asyncio loop from Tk main loop of tkWidget """
+        self.tkWidget = tkWidget
+        self.configApp = configApp
+        self.logger = logging.getLogger(self.configApp.get('Log', 'LoggerName'))
+        self.loopPeriodMs = int(self.configApp.get('Database', 'AsyncLoopPeriodMs'))
+        self.loop = asyncio.new_event_loop()
+        self.dictLatestTasks = dict()
+        self.afterId = self.tkWidget.after(self.loopPeriodMs, self.runLoop)
+
+    def runLoop(self):
+        """ Run callbacks ready in asyncio loop, then give hand back to Tk """
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+        self.afterId = self.tkWidget.after(self.loopPeriodMs, self.runLoop)
+
+    def runTask(self, coroutine, errorCallback=None, taskKind=None):
+        """ Execute coroutine in asyncio loop and return its task
+            errorCallback(exception) is called if coroutine raises an exception,
+            cancelled tasks are ignored
+            taskKind : if not None, previous task of this kind not finished is cancelled :
+                       a superseded request never updates widgets """
+        if taskKind is not None:
+            previousTask = self.dictLatestTasks.get(taskKind)
+            if previousTask is not None:
+                previousTask.cancel()
+        task = self.loop.create_task(coroutine)
+        if taskKind is not None:
+            self.dictLatestTasks[taskKind] = task
+        task.add_done_callback(lambda doneTask: self.endTask(doneTask, errorCallback, taskKind))
+        return task
+
+    def endTask(self, task, errorCallback, taskKind):
+        """ Report exception raised by a task """
+        if taskKind is not None and self.dictLatestTasks.get(taskKind) is task:
+            del self.dictLatestTasks[taskKind]
+        if task.cancelled():
+            return
+        exception = task.exception()
+        if exception is not None:
+            self.logger.error("AsyncTkBridge : " + type(exception).__name__ + " : " +
+                              str(exception))
+            if errorCallback is not None:
+                errorCallback(exception)
+
+    def close(self):
+        """ Stop running asyncio loop : pending tasks are cancelled """
+        if self.afterId is not None:
+            self.tkWidget.after_cancel(self.afterId)
+            self.afterId = None
+        listTasks = asyncio.all_tasks(self.loop)
+        for task in listTasks:
+            task.cancel()
+        if listTasks:
+            self.loop.run_until_complete(asyncio.gather(*listTasks, return_exceptions=True))
+        self.loop.close()
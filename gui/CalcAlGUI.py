@@ -30,6 +30,7 @@ along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
 import logging
 import os.path
 import platform
+import sqlite3
 
 import tkinter
 from tkinter import ttk
@@ -38,6 +39,7 @@ from tkinter import font
 from model import CalculatorFrameModel
 from model import PatientFrameModel
 
+from . import AsyncTkBridge
 from . import CalcAlGUIMenu
 from . import StartFrame
 from . import CalculatorFrame
@@ -63,8 +65,14 @@ class CalcAlGUI(tkinter.Tk):
         self.delaySeconds2ClearMessage = int(self.configApp.get('Limits',
                                                                 'delaySeconds2ClearMessage')) * 1000
         self.cancelMessageId = None
+        self.changesPollingPeriodMs = int(self.configApp.get('Database',
+                                                             'ChangesPollingPeriodMs'))
         self.logger = logging.getLogger(self.configApp.get('Log', 'LoggerName'))
         self.logger.info(_("Starting GUI") + "...")
+        # V0.56 : progress of automatic backups displayed in status bar
+        self.databaseManager.setSnapshotProgressCallback(self.displayCopyProgress)
+        # V0.56 : frames await database requests executed in background
+        self.asyncTkBridge = AsyncTkBridge.AsyncTkBridge(self, self.configApp)
 
         # Adapt to screen size
         heightBigScreenInPixel = int(self.configApp.get('Limits', 'heightBigScreenInPixel'))
@@ -131,6 +139,10 @@ class CalcAlGUI(tkinter.Tk):
         self.statusLabel.pack(side=tkinter.TOP)
         statusFrame.pack(side=tkinter.TOP)
 
+        # V0.56 : refresh data modified in database by another program
+        if self.changesPollingPeriodMs > 0:
+            self.after(self.changesPollingPeriodMs, self.pollExternalChanges)
+
     def getStartFrame(self):
         """Return start frame"""
         return self.startFrame
@@ -156,13 +168,40 @@ class CalcAlGUI(tkinter.Tk):
             self.cancelMessageId = self.statusLabel.after(self.delaySeconds2ClearMessage,
                                                           self.clearStatusText)
 
+    def displayCopyProgress(self, nbPagesCopied, nbPages):
+        """ V0.56 : Display progress of a database copy and refresh window
+            between 2 steps of copy """
+        percent = 100 if nbPages == 0 else (100 * nbPagesCopied) // nbPages
+        self.statusLabel['text'] = _("Copy") + " : " + str(percent) + " %"
+        self.update_idletasks()
+
+    def pollExternalChanges(self):
+        """ V0.56 : Give models tables of opened database modified by another program
+            Called periodically by Tk main loop """
+        try:
+            database = self.databaseManager.getDatabase()
+            if database is not None:
+                setChangedTables = database.getExternalChanges()
+                if setChangedTables:
+                    self.calculatorFrameModel.updateExternalChanges(database, setChangedTables)
+                    self.patientFrameModel.updateExternalChanges(database, setChangedTables)
+                    self.setStatusText(_("Database modified by another program") + " : " +
+                                       ", ".join(sorted(setChangedTables)))
+        except sqlite3.Error as exc:
+            self.logger.error("CalcAlGUI/pollExternalChanges() : " + str(exc))
+        finally:
+            # Polling must go on after an error
+            self.after(self.changesPollingPeriodMs, self.pollExternalChanges)
+
     def clearStatusText(self):
         """ Clear status message by writting Ready """
         self.statusLabel['text'] = _('Ready')
 
     def onClosing(self):
         """ Handler called at the end of main window """
+        self.asyncTkBridge.close() # V0.56
         self.closeDatabase()
+        self.databaseManager.closeAllDatabases() # V0.56
         self.destroy()
 
     def setTitle(self, dbName=None):
@@ -186,6 +225,14 @@ class CalcAlGUI(tkinter.Tk):
         """ Return database manager of the project """
         return self.databaseManager
 
+    def getAsyncTkBridge(self):
+        """ V0.56 : Return bridge running coroutines in Tk main loop """
+        return self.asyncTkBridge
+
+    def displayAsyncError(self, exception):
+        """ V0.56 : Display in status bar an error raised by a coroutine """
+        self.setStatusText(_("Error") + " : " + str(exception) + " !", True)
+
     def tabChangedEvent(self, event):
         """ Callback called when user changes tab """
         # 21/7/2018 : TMD : Bug correction _tkinter.TclError: expected integer but got ""
@@ -198,9 +245,10 @@ class CalcAlGUI(tkinter.Tk):
                 self.menuCalcAl.enableDatabaseMenu(event.widget.index("current") == 0)
                 self.menuCalcAl.enableSelectionMenu(event.widget.index("current") == 1)
 
-    def closeDatabase(self):
-        """ Close database """
-        self.databaseManager.closeDatabase()
+    def closeDatabase(self, isKeptOpen=False):
+        """ Close database
+            V0.56 : isKeptOpen : True to keep database opened for a quick return to it """
+        self.databaseManager.closeDatabase(isKeptOpen)
         self.enableTabCalculator(False)
         self.enableTabSearch(False)
         self.enableTabPortion(False)
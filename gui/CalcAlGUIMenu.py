@@ -63,6 +63,8 @@ class CalcAlGUIMenu(tkinter.Menu):
                                       command=self.master.getStartFrame().deleteDB)
         self.databaseMenu.add_command(label=_("Join") + "...",
                                       command=self.master.getStartFrame().joinDB)
+        self.databaseMenu.add_command(label=_("Save a copy") + "...",
+                                      command=self.master.getStartFrame().copyDB)
         self.add_cascade(label=_("Database"), menu=self.databaseMenu)
 
 
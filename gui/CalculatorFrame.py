@@ -299,6 +299,8 @@ class CalculatorFrame(FrameBaseCalcAl.FrameBaseCalcAl):
                     self.changeNbDaysByModel()
                 elif event == "CHANGE_SELECTED_COMPONENTS":
                     self.changeSelectedComponent()
+                elif event == "EXTERNAL_FOODS_CHANGED":
+                    self.changeExternalFoods()
 
             except CalcalExceptions.CalcalValueError as exc:
                 message = _("Error") + " : " + str(exc) + " !"
@@ -343,6 +345,16 @@ class CalculatorFrame(FrameBaseCalcAl.FrameBaseCalcAl):
         self.familyFoodstuffCombobox['values'] = listFamilyFoodstuff
         self.familyFoodstuffCombobox.current(0)
 
+    def changeExternalFoods(self):
+        """ V0.56 : Update family and foodstuff comboboxes modified by another program
+            Choices of user are kept if they still exist """
+        familyName = self.familyFoodstuffCombobox.get()
+        foodName = self.foodstuffNameCombobox.get()
+        self.updateFamilyFoodstuffCombobox()
+        if familyName in self.familyFoodstuffCombobox['values']:
+            self.familyFoodstuffCombobox.set(familyName)
+        self.updatefoodstuffName(foodName=foodName)
+
     def changeFood(self):
         """ Change a line in foodtable """
         self.logger.debug("CalculatorFrame : changeFood()")
@@ -613,17 +625,33 @@ class CalculatorFrame(FrameBaseCalcAl.FrameBaseCalcAl):
 
         self.nbDaysCombobox.set(nbDays)
 
-    def updatefoodstuffName(self, *dummy):
-        """ Update foodstuff list name """
+    def updatefoodstuffName(self, *dummy, foodName=None):
+        """ Update foodstuff list name
+            V0.56 : names read in background : request superseded by a new family choice
+                    is cancelled, foodName is selected if it belongs to family
+                    Foods of previous family can't be chosen until names are read """
         database = self.databaseManager.getDatabase()
         assert (database is not None), "CalculatorFrame/updatefoodstuffName() : no open database !"
         familyname = self.familyFoodstuffCombobox.get()
-
-        listFoodstuffName = database.getListFoodstuffName(familyname)
+        self.foodstuffNameCombobox['values'] = []
+        self.foodstuffNameCombobox.set("")
+        self.foodstuffNameCombobox.configure(state=tkinter.DISABLED)
+        self.mainWindow.getAsyncTkBridge().runTask(
+            self.updatefoodstuffNameAsync(database, familyname, foodName),
+            self.mainWindow.displayAsyncError, taskKind="foodstuffName")
+
+    async def updatefoodstuffNameAsync(self, database, familyname, foodName):
+        """ V0.56 : Coroutine updating foodstuff list name when names are read """
+        listFoodstuffName = await database.getAsyncDatabase().call("getListFoodstuffName",
+                                                                   familyname)
         assert (listFoodstuffName is not None), \
             "CalculatorFrame/init() : no food name for family " + familyname + " in database  !"
+        self.foodstuffNameCombobox.configure(state="readonly")
         self.foodstuffNameCombobox['values'] = listFoodstuffName
-        self.foodstuffNameCombobox.current(0)
+        if foodName in listFoodstuffName:
+            self.foodstuffNameCombobox.current(listFoodstuffName.index(foodName))
+        else:
+            self.foodstuffNameCombobox.current(0)
 
     def clicNamesListbox(self, dummy=None):
         """ Update food definition with new components chosen """
@@ -649,6 +677,10 @@ class CalculatorFrame(FrameBaseCalcAl.FrameBaseCalcAl):
         foodName = self.foodstuffNameCombobox.get()
         quantity = self.foodstuffQuantity.get()
         try:
+            # V0.56 : no food while names of chosen family are read
+            if foodName == "":
+                raise CalcalExceptions.CalcalValueError(self.configApp,
+                                                        _("Please choose a foodstuff"))
             self.calculatorFrameModel.addFoodInTable([[foodName, quantity]])
         except CalcalExceptions.CalcalValueError as exc:
             message = _("Error") + " : " + str(exc) + " !"
@@ -828,9 +860,7 @@ class CalculatorFrame(FrameBaseCalcAl.FrameBaseCalcAl):
         # Update comboboxes and values
         indexFamily = self.familyFoodstuffCombobox['values'].index(familyName)
         self.familyFoodstuffCombobox.current(indexFamily)
-        self.updatefoodstuffName()
-        indexName = self.foodstuffNameCombobox['values'].index(foodName)
-        self.foodstuffNameCombobox.current(indexName)
+        self.updatefoodstuffName(foodName=foodName)
 
         # User messages
         message = _("Foodstuff") + " " + foodName + " " + _("selected and copied")
@@ -161,6 +161,8 @@ class PathologyFrame(FrameBaseCalcAl.FrameBaseCalcAl):
             elif observable == self.patientFrameModel:
                 if event == "UPDATE_PATHOLOGIES_PATIENT":
                     self.selectPathologies()
+                elif event == "UPDATE_ALL_PATHOLOGIES":
+                    self.initListPathologies()
 
         except CalcalExceptions.CalcalValueError as exc:
             message = _("Error") + " : " + str(exc) + " !"
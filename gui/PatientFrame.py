@@ -191,6 +191,9 @@ class PatientFrame(FrameBaseCalcAl.FrameBaseCalcAl):
                     self.initListPathologies()
                 elif event == "PATIENT_DELETED":
                     self.patientDeleted()
+                elif event == "EXTERNAL_PATIENTS_CHANGED":
+                    self.patientCodeCombobox['values'] = \
+                        self.patientFrameModel.getAllPatientCodes()
 
             except ValueError as exc:
                 message = _("Error") + " : " + str(exc) + " !"
@@ -209,7 +212,10 @@ class PatientFrame(FrameBaseCalcAl.FrameBaseCalcAl):
             listInfoPatient = [self.patientCodeVar.get(), self.birthYearCombobox.get(),
                                self.genderVar.get(), self.sizeCombobox.get(),
                                self.patientNotesTextEditor.get('1.0', 'end-1c')]
-            self.patientFrameModel.createOrModifyPatient(listInfoPatient)
+            # V0.56 : pathologies selected are saved with a new patient
+            listpathologies = set([self.pathologiesListbox.get(index)
+                                   for index in self.pathologiesListbox.curselection()])
+            self.patientFrameModel.createOrModifyPatient(listInfoPatient, listpathologies)
         except ValueError as exc:
             self.mainWindow.setStatusText(_("Error") + " : " + str(exc) + " !", True)
 
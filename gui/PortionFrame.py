@@ -32,6 +32,7 @@ from tkinter.ttk import Combobox
 from tkinter import messagebox
 
 from util import CalcalExceptions
+from model import Component
 from . import CallTypWindow
 from . import FrameBaseCalcAl
 from . import TableTreeView
@@ -98,8 +99,12 @@ class PortionFrame(FrameBaseCalcAl.FrameBaseCalcAl):
         resultsFrame = tkinter.LabelFrame(resultsActionFrame, text=_("Portions matching filters"))
         resultsFrame.pack(side=tkinter.LEFT)
         # Code field is necessary because first column of TableTreeView must contain uniq values
+        # V0.56 : energy and water totals read in portionTotals table
         firstColumns = [_("Code"), _("Portion name"), _("Date"), _("Patient code"),
-                        _("Portion type"), _("Period Of day")]
+                        _("Portion type"), _("Period Of day"),
+                        _("Energy") + " (kcal)", _("Water") + " (g)"]
+        self.totalsConstituantsCodes = [int(self.configApp.get('Energy', 'EnergyTotalKcalCode')),
+                                        int(self.configApp.get('Water', 'WaterCode'))]
         self.portionResultTable = TableTreeView.TableTreeView(resultsFrame, firstColumns,
                      int(self.configApp.get('Size', 'portionResultTableNumberVisibleRows')),
                      int(self.configApp.get('Size', 'portionResultTableFirstColWidth')),
@@ -112,6 +117,13 @@ class PortionFrame(FrameBaseCalcAl.FrameBaseCalcAl):
         self.portionResultTable.setBinding('<Double-Button-1>', self.putInCalculator)
         self.portionResultTable.setBinding('<Command-c>', self.copyInClipboard)
         self.portionResultTable.setBinding('<Control-c>', self.copyInClipboard)
+        # V0.56 : portions are read page by page when scrolling down
+        self.portionsPageSize = int(self.configApp.get('Limits', 'portionsPageSize'))
+        self.listUserFilters = []
+        self.nbPortionsDisplayed = 0
+        self.nbPortionsFiltered = 0
+        self.portionsPageTask = None
+        self.portionResultTable.setScrollEndCallback(self.loadNextPortionsPage)
         CallTypWindow.createToolTip(self.portionResultTable,
                         _("Click on first column header to select all") +
                         "\n" +
@@ -138,7 +150,7 @@ class PortionFrame(FrameBaseCalcAl.FrameBaseCalcAl):
                 self.logger.debug("PortionFrame received from calculator model : " + event)
                 if event == "INIT_DB":
                     self.clear()
-                elif event == "SAVE_PORTION":
+                elif event == "SAVE_PORTION" or event == "EXTERNAL_PORTIONS_CHANGED":
                     self.updateSearchResultTable(None)
             if observable == self.patientFrameModel:
                 self.logger.debug("PortionFrame received from patient model : " + event)
@@ -150,6 +162,9 @@ class PortionFrame(FrameBaseCalcAl.FrameBaseCalcAl):
                     listCodes = [""] + self.patientFrameModel.getAllPatientCodes()
                     self.patientCodeCombobox['values'] = listCodes
                     self.displayOtherPatient()
+                elif event == "EXTERNAL_PATIENTS_CHANGED":
+                    listCodes = [""] + self.patientFrameModel.getAllPatientCodes()
+                    self.patientCodeCombobox['values'] = listCodes
         except CalcalExceptions.CalcalValueError as exc:
             message = _("Error") + " : " + str(exc) + " !"
             self.mainWindow.setStatusText(message, True)
@@ -180,17 +195,60 @@ class PortionFrame(FrameBaseCalcAl.FrameBaseCalcAl):
             self.mainWindow.setStatusText(message, True)
 
     def updateSearchResultTable(self, *dummy):
-        """ Update portionResultTable filtering with id frame fields content """
+        """ Update portionResultTable filtering with id frame fields content
+            V0.56 : only first page of portions is displayed """
         self.logger.debug("PortionFrame/updateSearchResultTable()")
         self.portionResultTable.deleteAllRows()
-        listUserFilters = [self.nameVar.get(), self.dateVar.get(), self.patientCodeCombobox.get(),
-                           self.portionTypeVar.get(), self.periodCombobox.get()]
+        self.listUserFilters = [self.nameVar.get(), self.dateVar.get(),
+                                self.patientCodeCombobox.get(),
+                                self.portionTypeVar.get(), self.periodCombobox.get()]
+        self.nbPortionsDisplayed = 0
+        self.nbPortionsFiltered = 0
+        self.loadNextPortionsPage(isFirstPage=True)
+
+    def loadNextPortionsPage(self, isFirstPage=False):
+        """ V0.56 : Append next page of filtered portions to portionResultTable
+            Called each time end of table is visible : nothing is done while
+            a page is being read, it is cancelled only if filters are changed """
+        isPageTaskPending = self.portionsPageTask is not None and \
+                            not self.portionsPageTask.done()
+        if isFirstPage:
+            if isPageTaskPending:
+                self.portionsPageTask.cancel()
+        elif isPageTaskPending or self.nbPortionsDisplayed >= self.nbPortionsFiltered:
+            return
         database = self.databaseManager.getDatabase()
-        assert (database is not None), "PortionFrame/addFoodInTable() : no open database !"
+        assert (database is not None), \
+            "PortionFrame/loadNextPortionsPage() : no open database !"
+        self.portionsPageTask = self.mainWindow.getAsyncTkBridge().runTask(
+            self.loadPortionsPageAsync(database), self.mainWindow.displayAsyncError)
+
+    async def loadPortionsPageAsync(self, database):
+        """ V0.56 : Coroutine appending a page of portions read in background
+            Cancelled if filters are changed before the end """
+        asyncDatabase = database.getAsyncDatabase()
         # Code field is necessary because first column of TableTreeView must contain uniq values
-        listPortions = database.getPortionsFiltred(listUserFilters, withCode=True)
+        listPortions, nbPortionsFiltered = \
+            await asyncDatabase.call("getPortionsPage", list(self.listUserFilters),
+                                     self.nbPortionsDisplayed, self.portionsPageSize, True)
+        dictPortionTotals = await asyncDatabase.call("getPortionTotals",
+                                                     [portion[0] for portion in listPortions],
+                                                     self.totalsConstituantsCodes)
+        self.nbPortionsFiltered = nbPortionsFiltered
+        listRows = []
         for portion in listPortions:
-            self.portionResultTable.insertOrCreateRow(str(portion[0]), portion[1:])
+            listTotals = []
+            for constituantCode in self.totalsConstituantsCodes:
+                qualifierValue = dictPortionTotals[portion[0]].get(constituantCode)
+                listTotals.append("" if qualifierValue is None else
+                                  Component.Component.getValueFormatedStatic(self.configApp,
+                                                                             *qualifierValue))
+            listRows.append((str(portion[0]), list(portion[1:]) + listTotals))
+        self.portionResultTable.insertGroupRow(listRows)
+        self.nbPortionsDisplayed += len(listPortions)
+        self.logger.debug("PortionFrame/loadNextPortionsPage() : " +
+                          str(self.nbPortionsDisplayed) + " / " +
+                          str(self.nbPortionsFiltered) + " portions displayed")
 
     def clear(self):
         """ Initialyse filters combobox
@@ -38,7 +38,6 @@ class PortionInfoChooser(TkSimpleDialog.TkSimpleDialog):
     def __init__(self, parent, database, configApp, title=None):
         self.database = database
         self.configApp = configApp
-        self.portionIdAll = list(self.database.getPortions())
         super(PortionInfoChooser, self).__init__(parent, title)
 
     def body(self, master):
@@ -87,6 +86,11 @@ class PortionInfoChooser(TkSimpleDialog.TkSimpleDialog):
         idListFrame = tkinter.Frame(master)
         idListFrame.pack(side=tkinter.TOP)
         tkinter.Label(idListFrame, text=_("Filtered existing portions")).grid(row=0, columnspan=2)
+        # V0.56 : portions are read page by page when scrolling down
+        self.portionsPageSize = int(self.configApp.get('Limits', 'portionsPageSize'))
+        self.userIdFilters = []
+        self.nbPortionsDisplayed = 0
+        self.nbPortionsFiltered = 0
         self.portionListBox = tkinter.Listbox(idListFrame,
                                       background=self.configApp.get('Colors', 'colorFamilyList'),
                                       height=10, width=35)
@@ -94,8 +98,15 @@ class PortionInfoChooser(TkSimpleDialog.TkSimpleDialog):
         scrollbarRight = tkinter.Scrollbar(idListFrame, orient=tkinter.VERTICAL,
                                    command=self.portionListBox.yview)
         scrollbarRight.grid(row=1, column=2, sticky=tkinter.W+tkinter.N+tkinter.S)
-        self.portionListBox.config(yscrollcommand=scrollbarRight.set)
+        def yscrollcommand(first, last):
+            """ Update vertical scrollbar and load next page when end of list is visible """
+            scrollbarRight.set(first, last)
+            if float(last) >= 1.0 and self.portionListBox.size() > 0:
+                self.loadNextPortionsPage()
+        self.portionListBox.config(yscrollcommand=yscrollcommand)
         self.portionListBox.bind('<ButtonRelease-1>', self.clicExistingPortion)
+        self.nbPortionsLabel = tkinter.Label(idListFrame)
+        self.nbPortionsLabel.grid(row=2, columnspan=2)
         self.updatePortionListBox()
 
         # Otherfield frame
@@ -155,14 +166,30 @@ class PortionInfoChooser(TkSimpleDialog.TkSimpleDialog):
             self.periodCombobox.set(nameDate[4])
 
     def updatePortionListBox(self, *dummy):
-        """ Update portionListBox filtering with id frame fields content """
+        """ Update portionListBox filtering with id frame fields content
+            V0.56 : only first page of portions is displayed """
         self.portionListBox.delete(0, tkinter.END)
-        userIdFilters = [self.nameVar.get(), self.dateVar.get(), self.patientCodeCombobox.get()]
-        portionIdFiltered = self.database.getPortionsFiltred(userIdFilters)
+        self.userIdFilters = [self.nameVar.get(), self.dateVar.get(),
+                              self.patientCodeCombobox.get()]
+        self.nbPortionsDisplayed = 0
+        self.nbPortionsFiltered = 0
+        self.loadNextPortionsPage(isFirstPage=True)
+
+    def loadNextPortionsPage(self, isFirstPage=False):
+        """ V0.56 : Append next page of filtered portions to portionListBox
+            Called when end of list is visible """
+        if not isFirstPage and self.nbPortionsDisplayed >= self.nbPortionsFiltered:
+            return
+        portionIdFiltered, self.nbPortionsFiltered = \
+            self.database.getPortionsPage(self.userIdFilters, self.nbPortionsDisplayed,
+                                          self.portionsPageSize)
+        self.nbPortionsDisplayed += len(portionIdFiltered)
         portionListSeparatorSeparator = ' ' + \
             self.configApp.get('Other', 'portionListSeparatorSeparator') + ' '
         for portionId in portionIdFiltered:
             self.portionListBox.insert(tkinter.END, portionListSeparatorSeparator.join(portionId))
+        self.nbPortionsLabel.config(text=str(self.nbPortionsDisplayed) + " / " +
+                                    str(self.nbPortionsFiltered) + " " + _("portions"))
 
     def validate(self):
         """ Check Data entered by user
@@ -28,14 +28,19 @@ along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
 """
 import tkinter
 from tkinter import messagebox
+from tkinter import simpledialog
 
 import os
 import os.path
+import queue
+import sqlite3
 
 from . import CallTypWindow
 from . import DatabaseInitialiser
 from . import DatabaseJoinDialog
 from . import FrameBaseCalcAl
+from model import JoinThreadedTask
+from util import CalcalExceptions
 
 class StartFrame(FrameBaseCalcAl.FrameBaseCalcAl):
     """ Welcome frame used to choose database to use """
@@ -46,6 +51,10 @@ class StartFrame(FrameBaseCalcAl.FrameBaseCalcAl):
         super(StartFrame, self).__init__(master, mainWindow, logoFrame)
         self.calculatorFrameModel = calculatorFrameModel
         self.patientFrameModel = patientFrameModel
+        # V0.56 : join thread and queue used to receive its messages
+        self.endMarker = _("OK") # Marker at the beginning of last message
+        self.joinQueue = None
+        self.joinTask = None
         ressourcePath = os.path.join(self.dirProject,
                                      self.configApp.get('Resources', 'ResourcesDir'))
         self.databaseDirPath = os.path.join(ressourcePath,
@@ -97,23 +106,47 @@ class StartFrame(FrameBaseCalcAl.FrameBaseCalcAl):
     def clicListBoxItem(self, dummy):
         """ Activate New and Delete button when a database is chosen """
         index = self.databaseListbox.curselection()
-        if index:
+        if index and not self.isJoinRunning():
             dbName = self.databaseListbox.get(index)
             self.logger.info(dbName + " " +  _('chosen'))
-            self.startButton.configure(state=tkinter.NORMAL)
-            self.deleteButton.configure(state=tkinter.NORMAL)
-            self.infoButton.configure(state=tkinter.NORMAL)
-            self.joinButton.configure(state=tkinter.NORMAL)
-            self.mainWindow.closeDatabase()
+            self.enableDatabaseActions(True)
+            self.mainWindow.closeDatabase(True)
             self.mainWindow.enableTabCalculator(False)
+            # V0.56 : describe chosen database without opening it
+            try:
+                dictCounters = self.databaseManager.peekDatabase(dbName)
+                self.mainWindow.setStatusText(dbName + " : " +
+                                              str(dictCounters["nbProducts"]) + " " +
+                                              _("foodstuffs") + ", " +
+                                              _("Number of food families") + " : " +
+                                              str(dictCounters["nbFamily"]))
+            except (sqlite3.Error, ValueError, CalcalExceptions.DatabaseException) as exc:
+                self.mainWindow.setStatusText(_("Error") + " : " + dbName + " : " +
+                                              str(exc) + " !", True)
+
+    def isJoinRunning(self):
+        """ V0.56 : Return True while join thread is writing result database :
+            databases can't be opened, deleted or joined, a message is displayed """
+        isRunning = self.joinTask is not None and self.joinTask.is_alive()
+        if isRunning:
+            self.mainWindow.setStatusText(_("Please wait until the end of join") + " !", True)
+        return isRunning
+
+    def enableDatabaseActions(self, isEnabled):
+        """ V0.56 : Enable or disable buttons acting on chosen database """
+        state = tkinter.NORMAL if isEnabled else tkinter.DISABLED
+        for button in (self.startButton, self.deleteButton, self.infoButton, self.joinButton):
+            button.configure(state=state)
 
     def start(self, dummy=None):
         """ start calculator frame with chosen database """
+        if self.isJoinRunning():
+            return
         index = self.databaseListbox.curselection()
         if index:
-            self.mainWindow.closeDatabase()
             dbName = self.databaseListbox.get(index)
-            self.mainWindow.closeDatabase()
+            # V0.56 : databases left are kept opened : switching back is immediate
+            self.mainWindow.closeDatabase(True)
             self.databaseManager.openDatabase(dbName)
             self.calculatorFrameModel.setDatabase(self.databaseManager.getDatabase())
             self.patientFrameModel.setDatabase(self.databaseManager.getDatabase())
@@ -140,8 +173,10 @@ class StartFrame(FrameBaseCalcAl.FrameBaseCalcAl):
 
             self.mainWindow.closeDatabase()
             dbname = results[0]
-            self.databaseManager.initDBFromFile(results[0], results[1], results[2])
-            self.mainWindow.setStatusText(_("Database initialised") + " : " + dbname)
+            dictMaintenance = self.databaseManager.initDBFromFile(results[0], results[1],
+                                                                  results[2])
+            self.mainWindow.setStatusText(_("Database initialised") + " : " + dbname + " - " +
+                                          self.formatMaintenanceReport(dictMaintenance))
             self.updateDatabaseListbox()
         except ValueError as exc:
             if results is not None:
@@ -159,10 +194,13 @@ class StartFrame(FrameBaseCalcAl.FrameBaseCalcAl):
         if index:
             # Get Info on this database
             dbName = self.databaseListbox.get(index)
-            self.mainWindow.closeDatabase()
-            self.databaseManager.openDatabase(dbName)
-            database = self.databaseManager.getDatabase()
-            dictCounters = database.getInfoDatabase()
+            # V0.56 : counters read without opening database
+            try:
+                dictCounters = self.databaseManager.peekDatabase(dbName)
+            except (sqlite3.Error, ValueError, CalcalExceptions.DatabaseException) as exc:
+                self.mainWindow.setStatusText(_("Error") + " : " + dbName + " : " +
+                                              str(exc) + " !", True)
+                return
 
             # Format information
             title = _("Info") + " " + _("about database") + " " + dictCounters["dbName"]
@@ -175,13 +213,13 @@ class StartFrame(FrameBaseCalcAl.FrameBaseCalcAl):
             # Display information's counters in a standard dialog
             messagebox.showinfo(title=title, message=message)
             self.mainWindow.copyInClipboard(message)
-
-            self.mainWindow.closeDatabase()
         else:
             self.mainWindow.setStatusText(_("Please select a database") + " !", True)
 
     def deleteDB(self):
         """ Delete a database """
+        if self.isJoinRunning():
+            return
         index = self.databaseListbox.curselection()
         if index:
             dbName = self.databaseListbox.get(index)
@@ -207,6 +245,8 @@ class StartFrame(FrameBaseCalcAl.FrameBaseCalcAl):
     def joinDB(self):
         """ Join two database
         V0.30 : 24-26/8/2016 """
+        if self.isJoinRunning():
+            return
         try:
             if self.databaseListbox.size() < 2:
                 raise ValueError(_("At lest 2 database are needed to join them"))
@@ -223,13 +263,92 @@ class StartFrame(FrameBaseCalcAl.FrameBaseCalcAl):
             if results is None:
                 raise ValueError(_("New database canceled"))
             self.mainWindow.closeDatabase()
-            self.databaseManager.joinDatabase(dbNameMaster, results[0], results[1], results[2])
-            self.updateDatabaseListbox()
-            self.mainWindow.setStatusText(_("Database joined in") + " " + results[1])
+            self.databaseManager.forgetDatabase(results[1])
+            # V0.56 : join done by a thread, progress displayed in status bar
+            self.joinQueue = queue.Queue()
+            self.joinTask = JoinThreadedTask.JoinThreadedTask(self.databaseManager,
+                                                              self.joinQueue, self.endMarker,
+                                                              dbNameMaster, results[0],
+                                                              results[1], results[2])
+            self.joinTask.start()
+            self.enableDatabaseActions(False)
+            self.master.after(100, self.processJoinQueue)
         except ValueError as exc:
             message = _("Error") + " : " + str(exc) + " !"
             self.mainWindow.setStatusText(message, True)
 
+    def processJoinQueue(self):
+        """ V0.56 : Display messages that join thread have put in the queue
+            and its report when join is over """
+        try:
+            msg = self.joinQueue.get(0)
+            error = msg.endswith("!")
+            self.mainWindow.setStatusText(msg, error)
+            if not msg.startswith(self.endMarker) and not error:
+                # Listen again to thread
+                self.master.after(100, self.processJoinQueue)
+            else:
+                # Final message is the last action of join thread
+                self.joinTask.join()
+                self.updateDatabaseListbox()
+                self.enableDatabaseActions(bool(self.databaseListbox.curselection()))
+                dictReport = self.joinTask.getReport()
+                if dictReport is not None:
+                    self.displayJoinReport(dictReport)
+        except queue.Empty:
+            self.master.after(100, self.processJoinQueue)
+
+    def displayJoinReport(self, dictReport):
+        """ V0.56 : Display counters and products ignored by last join """
+        message = _("Products updated") + " : " + str(dictReport["nbProductsUpdated"]) + \
+            "\n" + _("Products added") + " : " + str(dictReport["nbProductsAdded"]) + "\n" + \
+            _("Values added") + " : " + str(dictReport["nbValuesAdded"]) + "\n" + \
+            _("Constituants added") + " : " + str(dictReport["nbConstituantsAdded"])
+        if dictReport.get("maintenance"):
+            message += "\n" + self.formatMaintenanceReport(dictReport["maintenance"])
+        if dictReport["skippedProducts"]:
+            message += "\n\n" + \
+                _("Conflict for products with same name and diferent codes") + " : " + \
+                _("ignore products from second database") + "\n" + \
+                "\n".join(name + " (" + str(code) + ")"
+                          for name, code in dictReport["skippedProducts"])
+        messagebox.showinfo(title=_("Join a database to"), message=message)
+        self.mainWindow.copyInClipboard(message)
+
+    def formatMaintenanceReport(self, dictMaintenance):
+        """ V0.56 : Return sizes and durations of a maintenance as a text line """
+        return _("Size") + " : " + \
+            "{:.1f}".format(dictMaintenance["sizeBefore"] / 1024. / 1024.) + " -> " + \
+            "{:.1f}".format(dictMaintenance["sizeAfter"] / 1024. / 1024.) + " " + _("MB") + \
+            ", " + _("maintenance in") + " " + \
+            "{:.2f}".format(dictMaintenance["analyzeTime"] + dictMaintenance["optimizeTime"] +
+                            dictMaintenance["vacuumTime"]) + " s"
+
+    def copyDB(self):
+        """ V0.56 : Save a copy of selected database, even if it is opened """
+        index = self.databaseListbox.curselection()
+        if index:
+            dbName = self.databaseListbox.get(index)
+            dbNameCopy = simpledialog.askstring(_("Database"),
+                                                _("Enter a new database name") + " :",
+                                                parent=self)
+            try:
+                if dbNameCopy is None:
+                    raise ValueError(_("Copy canceled"))
+                dbNameCopy = dbNameCopy.lower().strip()
+                if not dbNameCopy.isalnum():
+                    raise ValueError(_("Invalid database name"))
+                self.databaseManager.copyDatabase(dbName, dbNameCopy,
+                                                  self.mainWindow.displayCopyProgress)
+                self.updateDatabaseListbox()
+                self.mainWindow.setStatusText(_("Database") + " : " + dbName + " " +
+                                              _("copied in") + " " + dbNameCopy)
+            except (ValueError, OSError) as exc:
+                message = _("Error") + " : " + str(exc) + " !"
+                self.mainWindow.setStatusText(message, True)
+        else:
+            self.mainWindow.setStatusText(_("Please select a database") + " !", True)
+
     def updateDatabaseListbox(self):
         """ update databaseListbox with names in ressouces dir """
         self.databaseListbox.delete(0, tkinter.END)
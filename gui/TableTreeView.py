@@ -52,11 +52,11 @@ class TableTreeView(tkinter.Frame):
 
         # Create treeview, scrollbars
         self.treeview = tkinter.ttk.Treeview(self, height=nbMinLines, selectmode=selectmode)
-        vsb = tkinter.Scrollbar(self, orient=tkinter.VERTICAL, command=self.treeview.yview)
-        vsb.grid(row=0, column=1, sticky=(tkinter.N, tkinter.S))
+        self.vsb = tkinter.Scrollbar(self, orient=tkinter.VERTICAL, command=self.treeview.yview)
+        self.vsb.grid(row=0, column=1, sticky=(tkinter.N, tkinter.S))
         hsb = tkinter.Scrollbar(self, orient=tkinter.HORIZONTAL, command=self.treeview.xview)
         hsb.grid(row=1, column=0, sticky=(tkinter.E, tkinter.W))
-        self.treeview.config(yscrollcommand=vsb.set)
+        self.treeview.config(yscrollcommand=self.vsb.set)
         self.treeview.config(xscrollcommand=hsb.set)
         self.treeview.grid(row=0, sticky=(tkinter.N, tkinter.S, tkinter.W, tkinter.E))
         self.grid_rowconfigure(0, weight=1)
@@ -289,6 +289,16 @@ class TableTreeView(tkinter.Frame):
         """ Bind an event to an action for the treeview object """
         self.treeview.bind(event, command)
 
+    def setScrollEndCallback(self, callback):
+        """ V0.56 : callback() is called each time last row of table becomes visible
+            Used to load next rows of a table filled page by page """
+        def yscrollcommand(first, last):
+            """ Update vertical scrollbar and detect end of table """
+            self.vsb.set(first, last)
+            if float(last) >= 1.0 and self.treeview.get_children():
+                callback()
+        self.treeview.config(yscrollcommand=yscrollcommand)
+
 def change2Numeric(data):
     """ Try to convert each first field of data in numeric value
         if all values can't be converted, return data parameter
@@ -94,6 +94,19 @@ class CalculatorFrameModel(Observable.Observable):
         self.setChanged()
         self.notifyObservers("INIT_DB")
 
+    def updateExternalChanges(self, database, setChangedTables):
+        """ V0.56 : Notify observers of foodstuffs or portions modified by another program
+            setChangedTables : names of tables modified in database
+            Ignored if database is not the one used by this model """
+        if database is not self.database:
+            return
+        if setChangedTables & {"products", "compositionProducts", "databaseState"}:
+            self.setChanged()
+            self.notifyObservers("EXTERNAL_FOODS_CHANGED")
+        if setChangedTables & {"portions", "portionsDetails"}:
+            self.setChanged()
+            self.notifyObservers("EXTERNAL_PORTIONS_CHANGED")
+
     def getListComponents(self):
         """ Return list of all available components in database """
         return self.listComponents
@@ -104,6 +117,14 @@ class CalculatorFrameModel(Observable.Observable):
             while inserting a lot of food
             addQuantity (Default False) if a food already exists add quantities instead replacing"""
 
+        # V0.56 : read all new foodstuffs and their components with only one query
+        listNewFoodnames = [foodname for foodname, dummy in listFoodnameQuantity
+                            if foodname not in self.dictFoodStuff]
+        dictInfoFoodsComponents = dict()
+        if self.database is not None and len(listNewFoodnames) > 0:
+            dictInfoFoodsComponents = self.database.getInfoFoodsComponents(
+                listNewFoodnames, self.currentComponentCodes)
+
         for foodname, quantityStr in listFoodnameQuantity:
             if foodname == "":
                 raise CalcalExceptions.CalcalValueError(self.configApp,
@@ -122,7 +143,9 @@ class CalculatorFrameModel(Observable.Observable):
             except KeyError:
                 newFood = Foodstuff.Foodstuff(self.configApp, self.database,
                                               foodname, quantity,
-                                              listFollowedComponents=self.currentComponentCodes)
+                                              listFollowedComponents=self.currentComponentCodes,
+                                              infoFoodComponents=\
+                                                  dictInfoFoodsComponents.get(foodname))
                 self.dictFoodStuff[foodname] = newFood
                 self.logger.debug("addFoodInTable : new food " + foodname + " appended in model")
                 self.setChanged()
@@ -140,8 +163,15 @@ class CalculatorFrameModel(Observable.Observable):
         componentCodes2delete = self.currentComponentCodes - askedByUserCodesAndOther
         componentCodes2Add = askedByUserCodesAndOther - self.currentComponentCodes
 
-        for foodStuff in self.dictFoodStuff.values():
-            foodStuff.updateFollowedComponents(componentCodes2delete, componentCodes2Add)
+        # V0.56 : read new components for all foodstuffs with only one query
+        dictInfoFoodsComponents = dict()
+        if len(self.dictFoodStuff) > 0 and len(componentCodes2Add) > 0:
+            dictInfoFoodsComponents = self.database.getInfoFoodsComponents(
+                self.dictFoodStuff.keys(), componentCodes2Add)
+        for foodname, foodStuff in self.dictFoodStuff.items():
+            infoFoodComponents = dictInfoFoodsComponents.get(foodname, [None, dict()])
+            foodStuff.updateFollowedComponents(componentCodes2delete, componentCodes2Add,
+                                               infoFoodComponents[1])
         self.currentComponentCodes = askedByUserCodesAndOther
         self.totalLine.update(self.dictFoodStuff)
 
@@ -278,24 +308,13 @@ class CalculatorFrameModel(Observable.Observable):
         listFoodNameAndQty2Group = [[foodname, self.dictFoodStuff[foodname].getData("quantity")]
                                     for foodname in listFoodName2Group]
 
-        # Create dictFood2group with all food to group and every components
-        dictFood2Group = dict()
-        for foodname, quantity in listFoodNameAndQty2Group:
-            newFood = Foodstuff.Foodstuff(self.configApp, self.database,
-                                   foodname, quantity,
-                                   listFollowedComponents=self.dictAllExistingComponents.keys())
-            dictFood2Group[foodname] = newFood
-
-        # Create a total line to group theese foodstuffs
-        totalLineGroup = TotalLine.TotalLine(self.configApp)
-        totalLineGroup.update(dictFood2Group)
-        totalQuantity = totalLineGroup.getData("quantity")
-        totalLineGroup.normalise4for100g()
+        # V0.56 : components values of new group computed by database
+        #   with its parts values, no foodstuff to build
+        totalQuantity = sum(quantity for dummy, quantity in listFoodNameAndQty2Group)
 
         # Insert new group in database
         self.database.insertNewComposedProduct(productName, familyName,
-                                        totalQuantity,
-                                        totalLineGroup.getData("dictComponentsQualifierQuantity"),
+                                        totalQuantity, None,
                                         listFoodNameAndQty2Group)
 
         # Insert new group foodstuff in this model
@@ -329,7 +348,8 @@ class CalculatorFrameModel(Observable.Observable):
         self.notifyObservers("UNGROUP_FOOD")
 
     def savePortion(self, listIdPortion):
-        """ Save all food in model as portion in database """
+        """ Save all food in model as portion in database
+            V0.56 : Return code of the portion """
         # Get names and quantities for all foodstuffs in model
         listNamesQties = [[foodname, self.dictFoodStuff[foodname].getData("quantity")]
                           for foodname in self.dictFoodStuff.keys()]
@@ -338,11 +358,12 @@ class CalculatorFrameModel(Observable.Observable):
         listIdPortion.append(self.nbDays)
 
         # Insert portion in database
-        self.database.insertPortion(listIdPortion, listNamesQties)
+        portionCode = self.database.insertPortion(listIdPortion, listNamesQties)
 
         # Notify observers
         self.setChanged()
         self.notifyObservers("SAVE_PORTION")
+        return portionCode
 
     def displayPortion(self, portionCode):
         """ Reset the model and add foodstuffs from chosen portion """
@@ -35,22 +35,30 @@ class Foodstuff(ModelBaseData.ModelBaseData):
     """ Model for foodstuff
         2 way for building :
             from database if listFollowedComponents is not None
+                V0.56 : infoFoodComponents can give values already read in database
+                by Database.getInfoFoodsComponents() for this food
             from a list of values if listInfoProduct is not None
         """
     def __init__(self, configApp, database, name, quantity,
                  listFollowedComponents=None,
-                 listInfoProduct=None):
+                 listInfoProduct=None,
+                 infoFoodComponents=None):
         """ Minimal constructor """
         super(Foodstuff, self).__init__(configApp, database, _("Foodstuff"))
         self.dictComponents = dict()
         self.setData("name", name)
         self.setData("quantity", quantity)
         if listFollowedComponents is not None:
-            self.update(self.database.getInfoFood(name))
+            if infoFoodComponents is None:
+                infoFoodComponents = self.database.getInfoFoodsComponents(
+                    [name], listFollowedComponents).get(name)
+            if infoFoodComponents is None:
+                raise CalcalExceptions.CalcalValueError(self.configApp,
+                                                        _("Unknown food") + " : " + name)
+            dictInfoFood, dictInfoComponents = infoFoodComponents
+            self.update(dictInfoFood)
             for codeComponent in listFollowedComponents:
-                component = Component.Component(self.configApp, self.database, self.getData("code"),
-                                                codeComponent, quantity)
-                self.dictComponents[codeComponent] = component
+                self.addComponentFromList(dictInfoComponents[codeComponent])
             self.logger.debug(_("Created in model from database") + str(self))
         elif listInfoProduct is not None:
             self.setData("code", listInfoProduct[2])
@@ -80,21 +88,34 @@ class Foodstuff(ModelBaseData.ModelBaseData):
             self.logger.debug("Quantity updated" + str(self))
         return updated
 
-    def updateFollowedComponents(self, componentCodes2delete, componentCodes2Add):
-        """ Update this model according components asked by user """
+    def updateFollowedComponents(self, componentCodes2delete, componentCodes2Add,
+                                 dictInfoComponents=None):
+        """ Update this model according components asked by user
+            V0.56 : dictInfoComponents can give components values already read in database
+            by Database.getInfoFoodsComponents() """
 
         # Delete components removed by user
         for k in componentCodes2delete:
             self.dictComponents.pop(k, None)
 
         # Add new components asked by user
+        if dictInfoComponents is None:
+            dictInfoComponents = self.getInfoComponentsFromDatabase(componentCodes2Add)
         for codeComponent in componentCodes2Add:
-            self.dictComponents[codeComponent] = Component.Component(self.configApp, self.database,
-                                                                     self.getData("code"),
-                                                                     codeComponent,
-                                                                     self.getData("quantity"))
+            self.addComponentFromList(dictInfoComponents[codeComponent])
         self.logger.debug("Add components : " + str(list(componentCodes2Add)))
 
+    def getInfoComponentsFromDatabase(self, listComponentCodes):
+        """ Read values of components listComponentCodes for this foodstuff
+            with only one database query """
+        listComponentCodes = list(listComponentCodes)
+        dictInfoComponents = dict()
+        if len(listComponentCodes) > 0:
+            name = self.getData("name")
+            dictInfoComponents = self.database.getInfoFoodsComponents([name],
+                                                                      listComponentCodes)[name][1]
+        return dictInfoComponents
+
     def getFormattedValue(self):
         """ Return food name, quantity and dict(codeComponents, qty formated) for all components """
         name = self.getData("name")
@@ -116,10 +137,9 @@ class Foodstuff(ModelBaseData.ModelBaseData):
     def addMissingComponents(self, listFollowedComponents):
         """ Add missing components according listFollowedComponents in this foodstuff """
         missingCompCodes = set(listFollowedComponents) - self.dictComponents.keys()
+        dictInfoComponents = self.getInfoComponentsFromDatabase(missingCompCodes)
         for codeComp in missingCompCodes:
-            component = Component.Component(self.configApp, self.database, self.getData("code"),
-                                            codeComp, self.getData("quantity"))
-            self.dictComponents[codeComp] = component
+            self.addComponentFromList(dictInfoComponents[codeComp])
             self.logger.debug("addMissingComponents : add component " + str(codeComp) + " in " +
                               self.getData("name"))
 
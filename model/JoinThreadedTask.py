@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+************************************************************************************
+Class : JoinThreadedTask
+Author : Thierry Maillard (TMD)
+Date : 18/10/2026
+
+Role : Define a Thread that joins 2 databases without blocking GUI.
+    in association with StartFrame
+
+Licence : GPLv3
+Copyright (c) 2016 - Thierry Maillard
+
+
+This file is part of CalcAl project.
+
+CalcAl project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CalcAl project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
+************************************************************************************
+"""
+import sqlite3
+import threading
+
+from util import CalcalExceptions
+
+class JoinThreadedTask(threading.Thread):
+    """ V0.56 : Thread used to join databases without blocking GUI
+        Result database is opened, modified and closed in this thread """
+    def __init__(self, databaseManager, queue, endMarker,
+                 dbNameMaster, dbNameSecondary, dbNameResult, isUpdate):
+        """ Initialize this Join Thread :
+            databaseManager : manager used to join databases
+            queue : queue to send progress messages to parent GUI
+            endMarker : string to put in last message
+            """
+        threading.Thread.__init__(self)
+        self.databaseManager = databaseManager
+        self.queue = queue
+        self.endMarker = endMarker
+        self.dbNameMaster = dbNameMaster
+        self.dbNameSecondary = dbNameSecondary
+        self.dbNameResult = dbNameResult
+        self.isUpdate = isUpdate
+        self.dictReport = None
+
+    def run(self):
+        """ Join databases and send final message """
+        try:
+            self.dictReport = self.databaseManager.joinDatabase(self.dbNameMaster,
+                                                                self.dbNameSecondary,
+                                                                self.dbNameResult,
+                                                                self.isUpdate,
+                                                                self.progress)
+            self.queue.put(self.endMarker + " : " + _("Database joined in") + " " +
+                           self.dbNameResult)
+        except (sqlite3.Error, OSError, ValueError, CalcalExceptions.DatabaseException) as exc:
+            self.queue.put(_("Error") + " : " + str(exc) + " !")
+        except Exception as exc:
+            # Parent GUI listens to queue until a final message : always send one
+            self.databaseManager.logger.exception("JoinThreadedTask : unexpected error")
+            self.queue.put(_("Error") + " : " + type(exc).__name__ + " : " + str(exc) + " !")
+
+    def progress(self, stepName, numStep, nbSteps):
+        """ Send a message for each step of join """
+        self.queue.put(_("Join") + " " + str(numStep) + "/" + str(nbSteps) + " : " + stepName)
+
+    def getReport(self):
+        """ Return report of join : see Database.joinDatabase(), None if join failed """
+        return self.dictReport
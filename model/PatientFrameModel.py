@@ -61,6 +61,22 @@ class PatientFrameModel(Observable.Observable):
         self.setChanged()
         self.notifyObservers("INIT_DB")
 
+    def updateExternalChanges(self, database, setChangedTables):
+        """ V0.56 : Update patients and pathologies lists modified by another program
+            setChangedTables : names of tables modified in database
+            Ignored if database is not the one used by this model """
+        if database is not self.database:
+            return
+        if setChangedTables & {"patientInfo", "patientPathologies"}:
+            self.listAllPatientCodes = self.database.getAllPatientCodes()
+            if self.currentPatient is not None and \
+                self.currentPatient.getData("code") not in self.listAllPatientCodes:
+                self.currentPatient = None
+            self.setChanged()
+            self.notifyObservers("EXTERNAL_PATIENTS_CHANGED")
+        if setChangedTables & {"pathologies", "pathologiesConstituants"}:
+            self.initListPathologies()
+
     def changePatient(self, patientCode):
         """ Change patient of this model """
         if patientCode != "" and \
@@ -70,12 +86,17 @@ class PatientFrameModel(Observable.Observable):
             self.setChanged()
             self.notifyObservers("PATIENT_CHANGED")
 
-    def createOrModifyPatient(self, listInfoPatient):
-        """ Create or modify a patient """
+    def createOrModifyPatient(self, listInfoPatient, listpathologies=None):
+        """ Create or modify a patient
+            V0.56 : listpathologies : pathologies of a new patient """
         isNewPatient = listInfoPatient[0] not in self.listAllPatientCodes
         if isNewPatient:
-            self.currentPatient = Patient.Patient(self.configApp, self.database, listInfoPatient[0],
-                                                  listInfoPatient)
+            # V0.56 : patient and its pathologies committed once
+            with self.database.transaction():
+                self.currentPatient = Patient.Patient(self.configApp, self.database,
+                                                      listInfoPatient[0], listInfoPatient)
+                if listpathologies:
+                    self.currentPatient.updatePathologies(listpathologies)
             self.listAllPatientCodes = self.database.getAllPatientCodes()
             # Notify observers
             self.setChanged()
@@ -31,7 +31,6 @@ along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
 import threading
 
 from model import Component
-from database import Database
 
 class SearchThreadedTask(threading.Thread):
     """ V0.31 : Thread used to search food in database without blocking GUI """
@@ -56,68 +55,41 @@ class SearchThreadedTask(threading.Thread):
             Maybe problem because it update search result table in parentsthread """
         nbMaxResultSearch = int(self.parent.configApp.get('Limits', 'nbMaxResultSearch'))
 
-        # Database must be reopen in this thread
-        databasePath = self.parent.databaseManager.getDatabase().getDatabasePath()
-        database = Database.Database(self.parent.configApp, self.parent.dirProject)
-        database.open(databasePath)
+        # V0.56 : Use a pooled read only connection in this thread
+        mainDatabase = self.parent.databaseManager.getDatabase()
+        database = mainDatabase.getReaderDatabase()
 
         try:
-            self.queue.put(_("Searching in database") + "...")
+            # V0.56 : Estimation given by constituants statistics before search
+            self.queue.put(_("Searching in database") + "... " + _("Estimated results") +
+                           " : " + str(database.estimateNbProducts4Filters(self.listFilters)))
 
-            # Get all product selected by filters
-            listDictProductValues = database.getProductComponents4Filters(self.listFilters,
-                                                                           self.queue)
-
-            # Intersection all dictionaries keys to get only common keys
-            intersectKeys = set()
-            index = 0
-            for dictProductValues in listDictProductValues:
-                if index == 0:
-                    intersectKeys = dictProductValues.keys()
-                else:
-                    intersectKeys &= dictProductValues.keys()
-                index += 1
-
-            messageproductsCondition = _("intersection") + " : " +  str(len(intersectKeys))
-            self.queue.put(messageproductsCondition)
+            # V0.56 : Get products selected by all filters with only one request
+            listProductsValues = database.getProductComponents4Filters(self.listFilters,
+                                                                       nbMaxResultSearch)
 
             # Build a list One line  per products : list [products,[listCompvalue formated]]
             # Components are ordered according fistFilter
-            listComp = [filter[0] for filter in self.listFilters]
             listProductsFormatedComponents = []
-            nbFoundProducts = 0
-            for product in intersectKeys:
-                listCompValues = []
-                for codeComp in listComp:
-                    for dictProductValues in listDictProductValues:
-                        if dictProductValues[product][0] == codeComp:
-                            qualifier = dictProductValues[product][1]
-                            value = dictProductValues[product][2]
-                            formatValue = Component.Component.\
-                                            getValueFormatedStatic(self.parent.configApp,
-                                                                   qualifier, value)
-                            listCompValues.append(formatValue)
-                            # Component can be in 2 dict if asked twice by user :
-                            # take only the first
-                            break
+            for product, listQualifierValues in listProductsValues[:nbMaxResultSearch]:
+                listCompValues = [Component.Component.getValueFormatedStatic(
+                                      self.parent.configApp, qualifier, value)
+                                  for qualifier, value in listQualifierValues]
                 listProductsFormatedComponents.append([product, listCompValues])
-                if nbFoundProducts > nbMaxResultSearch:
-                    break
-                nbFoundProducts += 1
+            nbFoundProducts = len(listProductsFormatedComponents)
 
             # Update table content with results
             self.parent.searchResultTable.insertGroupRow(listProductsFormatedComponents)
 
             # Check number of results and send final message
             message = self.endMarker + " : "
-            if nbFoundProducts > nbMaxResultSearch:
-                message += _("Too many results") +" : " + str(nbMaxResultSearch) + \
-                          " " + _("on") + " " + str(len(intersectKeys)) + " " + _("displayed") + \
-                          ". " + _("Please improve filters") + " !"
+            if len(listProductsValues) > nbMaxResultSearch:
+                message += _("Too many results") + " : " + str(nbMaxResultSearch) + \
+                          " " + _("displayed") + ". " + _("Please improve filters") + " !"
             else:
                 message += str(nbFoundProducts) + " " + _("results matching filters")
             self.queue.put(message)
         except ValueError as exc:
             self.queue.put(_("Error") + " : " + str(exc) + " !")
         finally:
-            database.close()
+            mainDatabase.releaseReaderDatabase(database)
@@ -33,7 +33,7 @@ Modif. :
 """
 from model import ModelBaseData
 from model import Component
-from util import CalcalExceptions
+from util import QualifierReducer
 
 class TotalLine(ModelBaseData.ModelBaseData):
     """ Model for a TotalLine """
@@ -45,9 +45,7 @@ class TotalLine(ModelBaseData.ModelBaseData):
         self.setData("dictComponentsQualifierQuantity", dict())
 
         # table for qualification reduction rules
-        self.qRulesS = self.configApp.get('QualifValue', 'QRulesS').split(";")
-        self.qRules0 = self.configApp.get('QualifValue', 'QRules0').split(";")
-        self.qRulesO = self.configApp.get('QualifValue', 'QRulesO').split(";")
+        self.qualifierReducer = QualifierReducer.QualifierReducer(self.configApp)
 
         self.logger.debug("Created in model" + str(self))
 
@@ -84,30 +82,9 @@ class TotalLine(ModelBaseData.ModelBaseData):
                                                          qualifierQuantity[1]]
 
     def reducQualifier(self, qualif2Reduce, value):
-        """ Reduce qualif2Reduce expression by applying rules read in config file """
-        qualifResult = "".join(set(qualif2Reduce))
-        nbReduction = 0
-        while nbReduction < 5 and len(qualifResult) > 1:
-            # Apply rules
-            if value >= float(self.configApp.get("Limits", "near0")):
-                qRule2apply = self.qRulesS
-            else: # For value near 0
-                qRule2apply = self.qRules0
-            qRule2apply = qRule2apply + self.qRulesO
-            for rule in qRule2apply:
-                if rule[0] in qualifResult and rule[1] in qualifResult:
-                    qualifResult = qualifResult.replace(rule[0], rule[2])
-                    qualifResult = qualifResult.replace(rule[1], rule[2])
-                qualifResult = "".join(set(qualifResult))
-            nbReduction = nbReduction + 1
-        if nbReduction >= 5:
-            raise CalcalExceptions.CalcalInternalError(self.configApp,
-                                                       "reducQualifier don't converge : " +
-                                                       qualif2Reduce +
-                                                       " can't be reduce : " + qualifResult +
-                                                       ". Check config/[QualifValue]/QRules")
-        return qualifResult
-
+        """ Reduce qualif2Reduce expression by applying rules read in config file
+            V0.56 : rules shared with SQL function reduceQualifier() """
+        return self.qualifierReducer.reduce(qualif2Reduce, value)
 
     def getFormattedValue(self, nbDays=1):
         """ Return name, quantity and dict(codeComponents) = qty formated
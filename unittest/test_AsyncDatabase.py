@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_AsyncDatabase.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        class AsyncDatabase : requests awaited by asyncio coroutines
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import asyncio
+import configparser
+import os
+import os.path
+import shutil
+import sqlite3
+
+import pytest
+
+import CalcAl
+from database import Database
+from database import DatabaseManager
+from gui import AsyncTkBridge
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Open a copy of demo database """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+    databaseManager.openDatabase(demoDatabaseName)
+
+    # Values returned to each test calling function
+    return databaseManager
+
+def test_asyncCall():
+    """ Test results of requests executed by database thread """
+    # Call init fixture
+    databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    asyncDatabase = database.getAsyncDatabase()
+
+    async def readNames():
+        """ Read names of a family in background """
+        familyName = database.getListFamilyFoodstuff()[0]
+        return familyName, await asyncDatabase.call("getListFoodstuffName", familyName)
+
+    familyName, listNames = asyncio.run(readNames())
+    assert listNames == database.getListFoodstuffName(familyName)
+
+    databaseManager.closeDatabase()
+    assert database.asyncDatabase is None
+
+class FakeTkWidget():
+    """ Tk widget used by AsyncTkBridge : after() callbacks are called by the test """
+    def __init__(self):
+        self.dictAfterCallbacks = dict()
+        self.nbAfter = 0
+
+    def after(self, dummy, callback):
+        """ Record callback and return its id """
+        self.nbAfter += 1
+        afterId = "after#" + str(self.nbAfter)
+        self.dictAfterCallbacks[afterId] = callback
+        return afterId
+
+    def after_cancel(self, afterId):
+        """ Forget callback afterId """
+        del self.dictAfterCallbacks[afterId]
+
+    def runAfterCallbacks(self):
+        """ Call recorded callbacks as Tk main loop """
+        dictAfterCallbacks = self.dictAfterCallbacks
+        self.dictAfterCallbacks = dict()
+        for callback in dictAfterCallbacks.values():
+            callback()
+
+def test_supersededRequests():
+    """ Test a request superseded by a newer one of the same kind is cancelled """
+    # Call init fixture
+    databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    asyncDatabase = database.getAsyncDatabase()
+    tkWidget = FakeTkWidget()
+    asyncTkBridge = AsyncTkBridge.AsyncTkBridge(tkWidget, databaseManager.configApp)
+    listErrors = []
+
+    # Search names as if user typed cidre then jus
+    task1 = asyncTkBridge.runTask(asyncDatabase.call("getProductsNamesContainingPart", "cidre"),
+                                  listErrors.append, taskKind="search")
+    tkWidget.runAfterCallbacks()
+    task2 = asyncTkBridge.runTask(asyncDatabase.call("getProductsNamesContainingPart", "jus"),
+                                  listErrors.append, taskKind="search")
+    while not task2.done():
+        tkWidget.runAfterCallbacks()
+    tkWidget.runAfterCallbacks()
+    assert task1.cancelled()
+    assert task2.result() == database.getProductsNamesContainingPart("jus")
+    assert not listErrors
+    assert not asyncTkBridge.dictLatestTasks
+
+    # Cancelled request not started is never executed
+    async def cancelPending():
+        """ Cancel second request while first one is running """
+        task1 = asyncio.ensure_future(asyncDatabase.call("getListFamilyFoodstuff"))
+        task2 = asyncio.ensure_future(asyncDatabase.call("getListFamilyFoodstuff"))
+        await asyncio.sleep(0)
+        task2.cancel()
+        return await task1, await asyncio.gather(task2, return_exceptions=True)
+
+    listFamilies, listResults2 = asyncio.run(cancelPending())
+    assert listFamilies == database.getListFamilyFoodstuff()
+    assert isinstance(listResults2[0], asyncio.CancelledError)
+    assert not asyncDatabase.dictRunningConnections
+
+    asyncTkBridge.close()
+    assert not tkWidget.dictAfterCallbacks
+    databaseManager.closeDatabase()
+
+def test_interruptRunningRequest(monkeypatch):
+    """ Test cancelling a running request interrupts its SQL statement """
+    # Call init fixture
+    databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    asyncDatabase = database.getAsyncDatabase()
+    listErrors = []
+
+    def countForever(readerDatabase):
+        """ Request running until it is interrupted """
+        cursor = readerDatabase.connDB.cursor()
+        try:
+            cursor.execute("""WITH RECURSIVE counter(value) AS
+                                (SELECT 1 UNION ALL SELECT value + 1 FROM counter)
+                              SELECT COUNT(*) FROM counter""")
+        except sqlite3.OperationalError as exc:
+            listErrors.append(str(exc))
+            raise
+        finally:
+            cursor.close()
+    monkeypatch.setattr(Database.Database, "countForever", countForever, raising=False)
+
+    async def cancelRunning():
+        """ Cancel request once it is running, then wait for database thread """
+        task = asyncio.ensure_future(asyncDatabase.call("countForever"))
+        while not asyncDatabase.dictRunningConnections:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        listResults = await asyncio.gather(task, return_exceptions=True)
+        # Database thread executes requests one by one
+        await asyncDatabase.call("getListFamilyFoodstuff")
+        return listResults
+
+    listResults = asyncio.run(cancelRunning())
+    assert isinstance(listResults[0], asyncio.CancelledError)
+    assert len(listErrors) == 1
+    assert "interrupted" in listErrors[0]
+    assert not asyncDatabase.dictRunningConnections
+    databaseManager.closeDatabase()
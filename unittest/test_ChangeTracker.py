@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_ChangeTracker.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        module ChangeTracker : tables modified by another program
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+
+import pytest
+
+import CalcAl
+from database import Database
+from database import DatabaseManager
+from model import PatientFrameModel
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Open a copy of demo database """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+    databaseManager.openDatabase(demoDatabaseName)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager
+
+class PatientObserver():
+    """ Record events received from a model """
+    def __init__(self):
+        self.listEvents = []
+
+    def updateObserver(self, dummy, event):
+        """ Called by observed model """
+        self.listEvents.append(event)
+
+def test_externalChanges():
+    """ Test tables modified by another CalcAl instance are reported once """
+    # Call init fixture
+    configApp, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    assert database.getExternalChanges() == set()
+
+    # Own changes are not reported
+    database.insertPatientInDatabase(["CHG001", "1970", "F", "165", ""])
+    assert database.getExternalChanges() == set()
+
+    # Changes of another instance
+    otherDatabase = Database.Database(configApp, '.')
+    otherDatabase.open(database.getDatabasePath())
+    otherDatabase.insertPatientInDatabase(["CHG002", "1980", "M", "180", ""])
+    otherDatabase.savePathology("Change tracker test", "", "",
+                                [otherDatabase.getListComponents()[0][0]])
+    assert database.getExternalChanges() == {"patientInfo", "pathologies",
+                                             "pathologiesConstituants"}
+    assert database.getExternalChanges() == set()
+
+    # Models refresh their lists
+    patientFrameModel = PatientFrameModel.PatientFrameModel(configApp)
+    patientFrameModel.setDatabase(database)
+    patientObserver = PatientObserver()
+    patientFrameModel.addObserver(patientObserver)
+    otherDatabase.deletePatient("CHG002")
+    otherDatabase.close()
+    setChangedTables = database.getExternalChanges()
+    assert "patientInfo" in setChangedTables
+    patientFrameModel.updateExternalChanges(database, setChangedTables)
+    assert patientObserver.listEvents == ["EXTERNAL_PATIENTS_CHANGED"]
+    assert "CHG002" not in patientFrameModel.getAllPatientCodes()
+    assert "CHG001" in patientFrameModel.getAllPatientCodes()
+    databaseManager.closeDatabase()
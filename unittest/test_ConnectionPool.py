@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_ConnectionPool.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        module ConnectionPool : writer and pooled read only connections
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+import sqlite3
+import threading
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Open a copy of demo database """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+    databaseManager.openDatabase(demoDatabaseName)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager
+
+def test_walMode():
+    """ Test that database is opened in WAL mode """
+    # Call init fixture
+    dummy, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    cursor = database.connDB.cursor()
+    cursor.execute("PRAGMA journal_mode")
+    assert cursor.fetchone()[0] == "wal"
+    cursor.close()
+    databaseManager.closeDatabase()
+
+def test_readerReused():
+    """ Test that read only connections are reused by successive threads """
+    # Call init fixture
+    dummy, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    listConnections = []
+
+    def search():
+        """ Search executed by a background thread """
+        readerDatabase = database.getReaderDatabase()
+        try:
+            listConnections.append(readerDatabase.connDB)
+            assert readerDatabase.existFoodstuffName("Jus de fruits (aliment moyen)")
+        finally:
+            database.releaseReaderDatabase(readerDatabase)
+
+    for dummy in range(3):
+        searchThread = threading.Thread(target=search)
+        searchThread.start()
+        searchThread.join()
+    assert len(listConnections) == 3
+    assert listConnections[0] is listConnections[1] is listConnections[2]
+    assert database.connectionPool.getNbReaders() == 1
+    databaseManager.closeDatabase()
+
+def test_readerNotBlockedByWriter():
+    """ Test that a reader sees last committed data while writer transaction is opened
+        and that it can't write """
+    # Call init fixture
+    dummy, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    nbPortions = len(database.getPortions())
+
+    cursor = database.connDB.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("""INSERT INTO portions(name, date, patient, type, period, nbDays)
+                      VALUES('Pool test', '2026/10/18', 'PoolPatient', 'Lunch', 'Day', 1)""")
+    readerDatabase = database.getReaderDatabase()
+    try:
+        assert len(readerDatabase.getPortions()) == nbPortions
+        with pytest.raises(sqlite3.OperationalError):
+            readerDatabase.connDB.execute("DELETE FROM portions")
+    finally:
+        database.releaseReaderDatabase(readerDatabase)
+    database.connDB.rollback()
+    cursor.close()
+    databaseManager.closeDatabase()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_DatabaseCounters.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        Database counters : families and counters kept up to date by triggers
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+import sqlite3
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+from database import SchemaMigrator
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Copy demo database in a test directory without opening it """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager, demoDatabaseName
+
+def getCountersByScan(configApp, database):
+    """ Return counters of getInfoDatabase() computed on products and constituants """
+    cursor = database.connDB.cursor()
+    dictCounters = dict()
+    dictCounters["dbName"] = database.getDbname()
+    cursor.execute("SELECT COUNT(*) FROM products")
+    dictCounters["nbProducts"] = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(DISTINCT familyName) FROM products")
+    dictCounters["nbFamily"] = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM products WHERE code < ?",
+                   (int(configApp.get('Limits', 'startGroupProductCodes')),))
+    dictCounters["nbGroup"] = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM constituantsNames")
+    dictCounters["nbConstituants"] = cursor.fetchone()[0]
+    cursor.close()
+    return dictCounters
+
+def test_familiesCounters():
+    """ Test counters and families kept up to date by triggers and peek of a database """
+    # Call init fixture
+    configApp, databaseManager, demoDatabaseName = initEnv()
+
+    # Peek doesn't modify database
+    databasePath = databaseManager.buildDbNamePath(demoDatabaseName)
+    with open(databasePath, "rb") as databaseFile:
+        contentBefore = databaseFile.read()
+    dictPeekCounters = databaseManager.peekDatabase(demoDatabaseName)
+    with open(databasePath, "rb") as databaseFile:
+        assert databaseFile.read() == contentBefore
+
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    assert database.isCatalogTables
+    dictCounters = database.getInfoDatabase()
+    assert dictCounters == getCountersByScan(configApp, database)
+    assert dictPeekCounters == dictCounters
+
+    database.insertNewComposedProduct("Group counters", "Counters Family", 300.0, dict(),
+                                      [["Jus de fruits (aliment moyen)", 200.0],
+                                       ["Cidre (aliment moyen)", 100.0]])
+    dictCountersGroup = database.getInfoDatabase()
+    assert dictCountersGroup == getCountersByScan(configApp, database)
+    assert dictCountersGroup["nbGroup"] == dictCounters["nbGroup"] + 1
+    assert dictCountersGroup["nbFamily"] == dictCounters["nbFamily"] + 1
+    cursor = database.connDB.cursor()
+    cursor.execute("SELECT DISTINCT familyName FROM products ORDER BY familyName")
+    assert database.getListFamilyFoodstuff() == [result[0] for result in cursor.fetchall()]
+    cursor.close()
+    assert databaseManager.peekDatabase(demoDatabaseName) == dictCountersGroup
+
+    database.deleteUserProduct("Group counters")
+    assert database.getInfoDatabase() == dictCounters
+    assert "Counters Family" not in database.getListFamilyFoodstuff()
+    databaseManager.closeDatabase()
+
+def test_groupsCounterStartCode():
+    """ Test groups counter uses [Limits]startGroupProductCodes of configuration """
+    # Call init fixture
+    configApp, dummy, dummy = initEnv()
+    configGroups = configparser.RawConfigParser()
+    configGroups.read_dict(configApp)
+    configGroups.set('Limits', 'startGroupProductCodes', "100")
+    connDB = sqlite3.connect(":memory:")
+    cursor = connDB.cursor()
+    cursor.execute("CREATE TABLE products(familyName TEXT, code INTEGER, name TEXT)")
+    cursor.execute("CREATE TABLE constituantsNames(code INTEGER, name TEXT)")
+    cursor.execute("CREATE TABLE databaseState(name TEXT PRIMARY KEY, value TEXT)")
+    cursor.executemany("INSERT INTO products VALUES('Family', ?, ?)",
+                       [(50, "Group 50"), (150, "Product 150")])
+    SchemaMigrator.SchemaMigrator(configGroups, connDB).migrationFamiliesCounters(cursor)
+
+    def getNbGroups():
+        """ Return groups counter """
+        cursor.execute("SELECT value FROM databaseCounters WHERE name='nbGroups'")
+        return cursor.fetchone()[0]
+    assert getNbGroups() == 1
+    cursor.execute("INSERT INTO products VALUES('Family', 60, 'Group 60')")
+    assert getNbGroups() == 2
+    cursor.execute("UPDATE products SET code = 160 WHERE code = 50")
+    assert getNbGroups() == 1
+    cursor.execute("DELETE FROM products WHERE code = 60")
+    assert getNbGroups() == 0
+    cursor.close()
+    connDB.close()
+
+def test_groupsCounterStartCodeChanged():
+    """ Test groups counter follows a change of [Limits]startGroupProductCodes
+        for an existing database, read with peek or opened """
+    # Call init fixture
+    configApp, databaseManager, demoDatabaseName = initEnv()
+    startGroupProductCodes = configApp.get('Limits', 'startGroupProductCodes')
+    databaseManager.openDatabase(demoDatabaseName)
+    databaseManager.closeDatabase()
+    try:
+        configApp.set('Limits', 'startGroupProductCodes', "100")
+        dictPeekCounters = databaseManager.peekDatabase(demoDatabaseName)
+        databaseManager.openDatabase(demoDatabaseName)
+        database = databaseManager.getDatabase()
+        dictCounters = database.getInfoDatabase()
+        assert dictCounters == getCountersByScan(configApp, database)
+        assert dictPeekCounters == dictCounters
+        databaseManager.closeDatabase()
+    finally:
+        configApp.set('Limits', 'startGroupProductCodes', startGroupProductCodes)
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    assert database.getInfoDatabase() == getCountersByScan(configApp, database)
+    databaseManager.closeDatabase()
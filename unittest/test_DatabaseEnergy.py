@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_DatabaseEnergy.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        Database energy correction of products
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Copy demo database in a test directory without opening it """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager, demoDatabaseName
+
+def test_correctEnergyKcalState():
+    """ Test that energies are only computed for products inserted since last correction """
+    # Call init fixture
+    configApp, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    assert database.correctEnergyKcal() == 0
+    cursor = database.connDB.cursor()
+    cursor.execute("SELECT COUNT(*) FROM energyCorrectionPending")
+    assert cursor.fetchone()[0] == 0
+    cursor.execute("SELECT value FROM databaseState WHERE name='energyCorrectionDate'")
+    assert cursor.fetchone() is not None
+
+    # New product without energy is corrected at next call
+    energyTotalKcalCode = int(configApp.get('Energy', 'EnergyTotalKcalCode'))
+    productName = "Energy Test Group"
+    database.insertNewComposedProduct(productName, "New Family", 300.0,
+                                      {25000: ['-', 10.0], 40000: ['-', 2.0]},
+                                      [["Jus de fruits (aliment moyen)", 200.0],
+                                       ["Légumes, pur jus (aliment moyen)", 100.0]])
+    cursor.execute("SELECT COUNT(*) FROM energyCorrectionPending")
+    assert cursor.fetchone()[0] == 1
+    assert database.correctEnergyKcal() == 1
+    assert database.correctEnergyKcal() == 0
+    cursor.execute("""SELECT value FROM constituantsValues, products
+                      WHERE productCode=code AND name=? AND constituantCode=?""",
+                   (productName, energyTotalKcalCode))
+    assert cursor.fetchone()[0] == pytest.approx(10.0 * 4 + 2.0 * 9)
+    cursor.close()
+
+    database.deleteUserProduct(productName)
+    databaseManager.closeDatabase()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_DatabaseGroups.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        Database groups : composition closure of group products
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Copy demo database in a test directory without opening it """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager, demoDatabaseName
+
+def test_compositionClosure():
+    """ Test base products of groups containing groups """
+    # Call init fixture
+    dummy, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+
+    database.insertNewComposedProduct("Group test A", "New Family", 300.0, dict(),
+                                      [["Jus de fruits (aliment moyen)", 200.0],
+                                       ["Cidre (aliment moyen)", 100.0]])
+    database.insertNewComposedProduct("Group test B", "New Family", 200.0, dict(),
+                                      [["Group test A", 150.0],
+                                       ["Cidre (aliment moyen)", 50.0]])
+    assert database.getPartsOfComposedProduct("Group test B", 200.0) == \
+        [["Group test A", 150.0], ["Cidre (aliment moyen)", 50.0]]
+    listNamesQty = database.getBaseProductsOfComposedProduct("Group test B", 200.0)
+    assert listNamesQty == [["Jus de fruits (aliment moyen)", 100.0],
+                            ["Cidre (aliment moyen)", 100.0]] or \
+           listNamesQty == [["Cidre (aliment moyen)", 100.0],
+                            ["Jus de fruits (aliment moyen)", 100.0]]
+    with pytest.raises(ValueError):
+        database.getBaseProductsOfComposedProduct("Cidre (aliment moyen)", 100.0)
+
+    # Closure lines deleted with their group
+    database.deleteUserProduct("Group test B")
+    database.deleteUserProduct("Group test A")
+    cursor = database.connDB.cursor()
+    cursor.execute("SELECT COUNT(*) FROM compositionClosure")
+    assert cursor.fetchone()[0] == 0
+    cursor.close()
+    databaseManager.closeDatabase()
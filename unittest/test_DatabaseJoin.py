@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_DatabaseJoin.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        Database join : join of 2 databases in background
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import queue
+import shutil
+import sqlite3
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+from model import JoinThreadedTask
+from util import CalcalExceptions
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Copy demo database in a test directory without opening it """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager, demoDatabaseName
+
+def test_joinDatabase():
+    """ Test join of 2 databases : counters, conflicts report and progress """
+    # Call init fixture
+    configApp, databaseManager, demoDatabaseName = initEnv()
+    baseTestDirPath = os.path.dirname(databaseManager.buildDbNamePath(demoDatabaseName))
+    secondaryName = "joinsecondary.db"
+    secondaryPath = os.path.join(baseTestDirPath, secondaryName)
+    shutil.copyfile(os.path.join(baseTestDirPath, "..", "demo.db"), secondaryPath)
+
+    # A product of secondary database with a name already used in master
+    connDB = sqlite3.connect(secondaryPath)
+    connDB.execute("""INSERT INTO products(familyName, code, name, source, dateSource, urlSource)
+                      VALUES('Family', 999999, 'Cidre (aliment moyen)', '', '', '')""")
+    connDB.commit()
+    nbSecondaryProducts = connDB.execute("SELECT COUNT(*) FROM products WHERE code > 0"
+                                        ).fetchone()[0]
+    connDB.close()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    nbMasterProducts = database.getInfoDatabase()["nbProducts"]
+    databaseManager.closeDatabase()
+
+    listProgress = []
+    dictReport = databaseManager.joinDatabase(demoDatabaseName, secondaryName,
+                                              "joinresult.db", False,
+                                              lambda *progress: listProgress.append(progress))
+    assert [numStep for dummy, numStep, dummy in listProgress] == [1, 2, 3, 4]
+    assert dictReport["skippedProducts"] == [("Cidre (aliment moyen)", 999999)]
+    assert dictReport["nbProductsUpdated"] == 0
+    assert dictReport["nbProductsAdded"] > 0
+    assert dictReport["nbValuesAdded"] > 0
+
+    databaseManager.openDatabase("joinresult.db")
+    database = databaseManager.getDatabase()
+    assert database.getInfoDatabase()["nbProducts"] == \
+        nbMasterProducts + dictReport["nbProductsAdded"]
+    assert dictReport["nbProductsAdded"] < nbSecondaryProducts
+    databaseManager.closeDatabase()
+
+    # Update mode : products of master are replaced
+    dictReport = databaseManager.joinDatabase(demoDatabaseName, secondaryName,
+                                              "joinresult.db", True)
+    assert dictReport["nbProductsUpdated"] > 0
+    assert dictReport["maintenance"]["sizeAfter"] > 0
+    databaseManager.closeDatabase()
+
+class FailingDatabaseManager():
+    """ Database manager whose join fails with an exception """
+    def __init__(self, databaseManager, exception):
+        self.logger = databaseManager.logger
+        self.exception = exception
+
+    def joinDatabase(self, *dummy):
+        """ Fail as a join with a missing database """
+        raise self.exception
+
+def test_joinThreadedTaskError():
+    """ Test join thread always sends a final error message """
+    # Call init fixture
+    configApp, databaseManager, dummy = initEnv()
+    for exception in (CalcalExceptions.DatabaseException(configApp, "Missing reference"),
+                      KeyError("unexpected")):
+        joinQueue = queue.Queue()
+        joinTask = JoinThreadedTask.JoinThreadedTask(
+            FailingDatabaseManager(databaseManager, exception), joinQueue, "End",
+            "master.db", "secondary.db", "result.db", False)
+        joinTask.start()
+        joinTask.join()
+        message = joinQueue.get(0)
+        assert message.endswith("!")
+        assert joinTask.getReport() is None
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_DatabaseMaintenance.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        Database maintenance : integrity check, optimize and vacuum
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Copy demo database in a test directory without opening it """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager, demoDatabaseName
+
+def test_runMaintenance():
+    """ Test statistics and free pages given back after a bulk operation """
+    # Call init fixture
+    configApp, databaseManager, demoDatabaseName = initEnv()
+    baseTestDirPath = os.path.dirname(databaseManager.buildDbNamePath(demoDatabaseName))
+    shutil.copyfile(os.path.join(baseTestDirPath, "..", "demo.db"),
+                    os.path.join(baseTestDirPath, "maintenance.db"))
+    databaseManager.openDatabase("maintenance.db")
+    database = databaseManager.getDatabase()
+
+    # Free many pages
+    database.connDB.execute("CREATE TABLE filler(data BLOB)")
+    database.connDB.executemany("INSERT INTO filler VALUES(zeroblob(4096))",
+                                [()] * 2000)
+    database.connDB.commit()
+    database.connDB.execute("DROP TABLE filler")
+    database.connDB.commit()
+
+    dictReport = database.runMaintenance(True)
+    assert dictReport["freePagesRatio"] > \
+        float(configApp.get('Database', 'MaintenanceFreePagesRatio'))
+    assert dictReport["vacuumMode"] in ("incremental", "full")
+    assert dictReport["sizeAfter"] < dictReport["sizeBefore"]
+    assert database.connDB.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert database.connDB.execute("""SELECT COUNT(*) FROM sqlite_master
+                                      WHERE name='sqlite_stat1'""").fetchone()[0] == 1
+
+    # Nothing to give back on next maintenance
+    dictReport = database.runMaintenance(False)
+    assert dictReport["vacuumMode"] == ""
+    databaseManager.closeDatabase()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_DatabaseManager.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        class DatabaseManager : databases kept opened for a quick return
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+import sqlite3
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+from util import StringUtil
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Copy demo database 3 times in a test directory """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+    configApp.set('Database', 'NbOpenDatabasesCached', '2')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    listDbNames = ["cached1.db", "cached2.db", "cached3.db"]
+    for dbName in listDbNames:
+        shutil.copyfile(os.path.join(baseDirPath, configApp.get('Resources', 'DemoDatabaseName')),
+                        os.path.join(baseTestDirPath, dbName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+
+    # Values returned to each test calling function
+    return databaseManager, listDbNames
+
+def test_switchDatabases():
+    """ Test databases kept opened are reused, least recently used one is closed """
+    # Call init fixture
+    databaseManager, listDbNames = initEnv()
+    databaseManager.openDatabase(listDbNames[0])
+    database1 = databaseManager.getDatabase()
+    databaseManager.closeDatabase(True)
+    assert databaseManager.getDatabase() is None
+    databaseManager.openDatabase(listDbNames[1])
+    database2 = databaseManager.getDatabase()
+    databaseManager.closeDatabase(True)
+
+    # Return to first database : same object
+    databaseManager.openDatabase(listDbNames[0])
+    assert databaseManager.getDatabase() is database1
+    assert database1.getInfoDatabase()["nbProducts"] > 0
+    databaseManager.closeDatabase(True)
+
+    # Third database : second one, least recently used, is closed
+    databaseManager.openDatabase(listDbNames[2])
+    databaseManager.closeDatabase(True)
+    assert database2.connDB is None
+    assert database1.connDB is not None
+
+    databaseManager.closeAllDatabases()
+    assert database1.connDB is None
+    assert databaseManager.getDatabase() is None
+
+def test_databaseModifiedWhileKeptOpened():
+    """ Test a database modified by another program is reopened, a deleted one is closed """
+    # Call init fixture
+    databaseManager, listDbNames = initEnv()
+    databaseManager.openDatabase(listDbNames[0])
+    database1 = databaseManager.getDatabase()
+    databaseManager.closeDatabase(True)
+
+    connDB = sqlite3.connect(databaseManager.buildDbNamePath(listDbNames[0]))
+    connDB.create_function("foldName", 1, StringUtil.foldName)
+    connDB.execute("""INSERT INTO products(familyName, code, name, source, dateSource, urlSource)
+                      VALUES('Family', 999999, 'Added by another program', '', '', '')""")
+    connDB.commit()
+    connDB.close()
+    databaseManager.openDatabase(listDbNames[0])
+    database = databaseManager.getDatabase()
+    assert database is not database1
+    assert database1.connDB is None
+    assert "Added by another program" in database.getListFoodstuffName("Family")
+    databaseManager.closeDatabase(True)
+
+    databaseManager.deleteDatabase(listDbNames[0])
+    assert database.connDB is None
+    assert not databaseManager.existsDatabase(listDbNames[0])
+    databaseManager.closeAllDatabases()
+
+def test_backupOnlyWhenClosedByUser():
+    """ Test a modified database kept opened is not saved when closed by switch or exit """
+    # Call init fixture
+    databaseManager, listDbNames = initEnv()
+    dbName = listDbNames[1]
+    for backupPath in databaseManager.getListBackups(dbName):
+        os.remove(backupPath)
+    databaseManager.openDatabase(dbName)
+    databaseManager.getDatabase().insertPortion(["Switch test", "2026/10/18", "XYZ007",
+                                                 "Ration", "Day", 1],
+                                                [["Jus de fruits (aliment moyen)", 100.0]])
+    databaseManager.closeDatabase(True)
+    databaseManager.closeAllDatabases()
+    assert databaseManager.getListBackups(dbName) == []
+    assert databaseManager.getLastMaintenanceReport()["vacuumMode"] != "full"
+
+    # Closed by user : saved
+    databaseManager.openDatabase(dbName)
+    databaseManager.getDatabase().deletePatient("XYZ007")
+    databaseManager.closeDatabase()
+    assert len(databaseManager.getListBackups(dbName)) == 1
@@ -194,3 +194,79 @@ def test_2Patholology():
     database.deletePathology(name2)
     # Close demo database
     databaseManager.closeDatabase()
+
+def test_transactionPatientPathologies():
+    """ Test unit of work : one commit for several modifications, nested savepoints """
+    # Call init fixture
+    dummy, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    database.savePathology("diabete type A", "Probleme pancréas", "TMD", [400, 328])
+
+    totalChangesBefore = database.connDB.total_changes
+    with database.transaction():
+        database.insertPatientInDatabase(["TRS001", "1970", "F", "165", ""])
+        database.updatePatientPathologies("TRS001", ["diabete type A"])
+        assert database.isInTransaction()
+        assert database.connDB.in_transaction
+
+        # Error in nested unit of work : only its modifications are cancelled
+        with pytest.raises(ValueError):
+            with database.transaction():
+                database.updatePatientInDatabase(["TRS001", "1980", "F", "170", ""])
+                raise ValueError("Cancel nested unit of work")
+        assert database.getInfoPatient("TRS001")["birthYear"] == 1970
+    assert not database.isInTransaction()
+    assert not database.connDB.in_transaction
+    assert database.connDB.total_changes > totalChangesBefore
+    assert database.getPathologies4Patient("TRS001") == ["diabete type A"]
+
+    # Error in unit of work : all its modifications are cancelled
+    with pytest.raises(ValueError):
+        with database.transaction():
+            database.insertPatientInDatabase(["TRS002", "1970", "F", "165", ""])
+            database.updatePatientPathologies("TRS002", ["diabete type A"])
+            raise ValueError("Cancel unit of work")
+    assert "TRS002" not in database.getAllPatientCodes()
+    assert not database.connDB.in_transaction
+
+    database.deletePatient("TRS001")
+    database.deletePathology("diabete type A")
+    # Close demo database
+    databaseManager.closeDatabase()
+
+def test_deletePatientsCascade():
+    """ Test that portions and pathologies of patients are deleted with them """
+    # Call init fixture
+    dummy, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    cursor = database.connDB.cursor()
+    cursor.execute("PRAGMA foreign_key_list(portionsDetails)")
+    assert cursor.fetchone() is not None
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name='portionsDetailsIdx'")
+    assert cursor.fetchone() is not None
+
+    database.savePathology("Test pathology", "Test", "Ref", [25000])
+    listPatientCodes = ["ABC001", "ABC002", "ABC003"]
+    for patientCode in listPatientCodes:
+        database.insertPatientInDatabase([patientCode, "1970", "M", "170", ""])
+        database.updatePatientPathologies(patientCode, ["Test pathology"])
+        database.insertPortion(["Lunch " + patientCode, "2026/10/18", patientCode,
+                                "Lunch", "Day", 1],
+                               [["Jus de fruits (aliment moyen)", 200.0]])
+
+    database.deletePatient(listPatientCodes[0])
+    database.deletePatients(listPatientCodes[1:])
+    for tableName, condition in [("patientInfo", "code LIKE 'ABC%'"),
+                                 ("patientPathologies", "patientCode LIKE 'ABC%'"),
+                                 ("portions", "patient LIKE 'ABC%'"),
+                                 ("portionsDetails", "portionCode NOT IN " +
+                                  "(SELECT code FROM portions)")]:
+        cursor.execute("SELECT COUNT(*) FROM " + tableName + " WHERE " + condition)
+        assert cursor.fetchone()[0] == 0
+
+    database.deletePathology("Test pathology")
+    cursor.execute("""SELECT COUNT(*) FROM pathologiesConstituants
+                      WHERE pathologyName='Test pathology'""")
+    assert cursor.fetchone()[0] == 0
+    cursor.close()
+    databaseManager.closeDatabase()
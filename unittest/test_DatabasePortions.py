@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_DatabasePortions.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        Database portions : codes, pages and totals
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+from util import QualifierReducer
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Copy demo database in a test directory without opening it """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager, demoDatabaseName
+
+def test_getPortionCode():
+    """ Test portion code allocation and search ignoring case """
+    # Call init fixture
+    dummy, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    cursor = database.connDB.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name='portionsIdsIdx'")
+    assert cursor.fetchone() is not None
+    cursor.close()
+
+    listCodes = []
+    for numPortion in range(3):
+        fields4ThisPortion = ["Code test " + str(numPortion), "2026/10/18", "XYZ001",
+                              "Lunch", "Day", 1]
+        assert database.getPortionCode(*fields4ThisPortion[:3]) == (None, False)
+        code = database.insertPortion(fields4ThisPortion,
+                                      [["Jus de fruits (aliment moyen)", 100.0]])
+        assert database.getPortionCode(*fields4ThisPortion[:3]) == (code, True)
+        listCodes.append(code)
+    assert listCodes == sorted(set(listCodes))
+    assert database.getPortionCode("CODE TEST 1", "2026/10/18", "xyz001") == \
+           (listCodes[1], True)
+
+    database.deletePatient("XYZ001")
+    databaseManager.closeDatabase()
+
+def test_portionCodeAfterDelete():
+    """ Test code returned by insertPortion when highest portion code was deleted """
+    # Call init fixture
+    dummy, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+
+    fields4ThisPortion = ["Deleted test", "2026/10/18", "XYZ006", "Lunch", "Day", 1]
+    code = database.insertPortion(list(fields4ThisPortion),
+                                  [["Jus de fruits (aliment moyen)", 100.0]])
+    database.deletePortion(code)
+    fields4ThisPortion[0] = "New test"
+    newCode = database.insertPortion(list(fields4ThisPortion),
+                                     [["Jus de fruits (aliment moyen)", 100.0]])
+    assert database.getPortionCode(*fields4ThisPortion[:3]) == (newCode, True)
+
+    database.deletePatient("XYZ006")
+    databaseManager.closeDatabase()
+
+def test_getPortionsPage():
+    """ Test portions filtering and pagination by sqlite """
+    # Call init fixture
+    dummy, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+
+    for numPortion in range(5):
+        fields4ThisPortion = ["Page test " + str(numPortion), "2026/10/18", "XYZ002",
+                              "Ration", "Day", 1]
+        database.insertPortion(fields4ThisPortion,
+                               [["Jus de fruits (aliment moyen)", 100.0]])
+    listFilters = ["PAGE TEST", "", "XYZ002", "ration", ""]
+    listPortions, nbPortions = database.getPortionsPage(listFilters, 0, 2)
+    assert nbPortions == 5
+    assert [portion[0] for portion in listPortions] == ["Page test 0", "Page test 1"]
+    listPortions, nbPortions = database.getPortionsPage(listFilters, 4, 2, withCode=True)
+    assert nbPortions == 5
+    assert len(listPortions) == 1 and listPortions[0][1] == "Page test 4"
+    assert len(database.getPortionsFiltred(listFilters)) == 5
+
+    # Wildcards typed by user are not interpreted
+    assert database.getPortionsPage(["Page_test", "%"], 0, 2)[1] == 0
+    assert database.getPortionsPage(["", "", "XYZ00"])[1] == 0
+
+    database.deletePatient("XYZ002")
+    databaseManager.closeDatabase()
+
+def test_portionTotals():
+    """ Test portions totals saved with portions """
+    # Call init fixture
+    configApp, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    qualifierReducer = QualifierReducer.QualifierReducer(configApp)
+    energyCode = int(configApp.get('Energy', 'EnergyTotalKcalCode'))
+    waterCode = int(configApp.get('Water', 'WaterCode'))
+
+    listNamesQties = [["Jus de fruits (aliment moyen)", 100.0],
+                      ["Cidre (aliment moyen)", 250.0]]
+    fields4ThisPortion = ["Totals test", "2026/10/18", "XYZ003", "Ration", "Day", 1]
+    for quantityFactor in (1.0, 2.0):
+        listQuantities = [[name, quantity * quantityFactor] for name, quantity in listNamesQties]
+        database.insertPortion(list(fields4ThisPortion), listQuantities)
+        portionCode, exist = database.getPortionCode(*fields4ThisPortion[:3])
+        assert exist
+        dictTotals = database.getPortionTotals([portionCode], [energyCode, waterCode])
+        for constituantCode in (energyCode, waterCode):
+            listComponents = []
+            for name, quantity in listQuantities:
+                productCode = database.getInfoFood(name)["code"]
+                listComponents.append((database.getInfoComponent(productCode, constituantCode),
+                                       quantity))
+            value = sum(component["value"] * quantity / 100.0
+                        for component, quantity in listComponents)
+            qualifier = qualifierReducer.reduce("".join(component["qualifValue"]
+                                                        for component, dummy in listComponents),
+                                                value)
+            assert dictTotals[portionCode][constituantCode][0] == qualifier
+            assert dictTotals[portionCode][constituantCode][1] == pytest.approx(value)
+
+    database.deletePortion(portionCode)
+    assert database.getPortionTotals([portionCode], [energyCode]) == {portionCode: dict()}
+    databaseManager.closeDatabase()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_DatabaseSchemaMigrator.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        module SchemaMigrator : migrations of database structure
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+import sqlite3
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+from database import SchemaMigrator
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Copy demo database in a test directory without opening it """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager, demoDatabaseName
+
+def getIndexNames(database):
+    """ Return names of indexes created in database """
+    cursor = database.connDB.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='index'")
+    listNames = [result[0] for result in cursor.fetchall()]
+    cursor.close()
+    return listNames
+
+def test_upgradeOnOpen():
+    """ Test that a database without schemaVersion table is upgraded when opened """
+    # Call init fixture
+    configApp, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+
+    lastVersion = SchemaMigrator.SchemaMigrator(configApp, database.connDB).getLastVersion()
+    assert database.getSchemaVersion() == lastVersion
+    listIndexNames = getIndexNames(database)
+    assert "compositionProductsIdx" in listIndexNames
+    assert "portionsDetailsIdx" in listIndexNames
+    assert "pathologiesConstituantsIdx" in listIndexNames
+    assert "patientPathologiesIdx" in listIndexNames
+
+    databaseManager.closeDatabase()
+
+def test_upgradeOnlyOnce():
+    """ Test that migrations already applied are not applied again """
+    # Call init fixture
+    configApp, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    databaseManager.closeDatabase()
+
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    migrator = SchemaMigrator.SchemaMigrator(configApp, database.connDB)
+    assert migrator.upgrade() == 0
+    cursor = database.connDB.cursor()
+    cursor.execute("SELECT COUNT(*) FROM schemaVersion")
+    assert cursor.fetchone()[0] == len(SchemaMigrator.SchemaMigrator.MIGRATIONS)
+    cursor.close()
+
+    databaseManager.closeDatabase()
+
+def test_foreignKeysOrphanRows(caplog):
+    """ Test that rows without parent are moved aside by migration 8 and logged """
+    # Call init fixture
+    configApp, dummy, dummy = initEnv()
+    connDB = sqlite3.connect(":memory:")
+    for tableDefinition in ["portions(code INTEGER PRIMARY KEY, patient TEXT)",
+                            "portionsDetails(portionCode INTEGER, productCode INTEGER, " +
+                            "quantity REAL)",
+                            "products(code INTEGER PRIMARY KEY)",
+                            "compositionProducts(productCode INTEGER, productCodePart INTEGER, " +
+                            "quantityPercent REAL)",
+                            "pathologies(name TEXT PRIMARY KEY)",
+                            "pathologiesConstituants(pathologyName TEXT, constituantCode INTEGER)",
+                            "patientInfo(code TEXT PRIMARY KEY)",
+                            "patientPathologies(patientCode TEXT, pathologyName TEXT)"]:
+        connDB.execute("CREATE TABLE " + tableDefinition)
+    connDB.execute("INSERT INTO portions(code) VALUES(1)")
+    connDB.executemany("INSERT INTO portionsDetails VALUES(?, 10, 100.0)", [(1,), (2,), (3,)])
+    connDB.commit()
+
+    cursor = connDB.cursor()
+    SchemaMigrator.SchemaMigrator(configApp, connDB).migrationForeignKeys(cursor)
+    cursor.execute("SELECT portionCode FROM portionsDetails")
+    assert cursor.fetchall() == [(1,)]
+    cursor.execute("SELECT portionCode, productCode, quantity FROM portionsDetailsOrphans")
+    assert sorted(cursor.fetchall()) == [(2, 10, 100.0), (3, 10, 100.0)]
+    cursor.execute("""SELECT COUNT(*) FROM sqlite_master
+                      WHERE name='compositionProductsOrphans'""")
+    assert cursor.fetchone()[0] == 0
+    cursor.close()
+    connDB.close()
+    assert "2 rows of portionsDetails without parent row moved in portionsDetailsOrphans" in \
+        caplog.text
+
+def test_convertValuesToCompactLayout():
+    """ Test conversion of constituantsValues heap table to compact layout """
+    # Call init fixture
+    dummy, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    assert not database.isCompactValuesLayout()
+    cursor = database.connDB.cursor()
+    cursor.execute("""SELECT COUNT(*) FROM
+                        (SELECT DISTINCT productCode, constituantCode FROM constituantsValues)""")
+    nbValues = cursor.fetchone()[0]
+    cursor.execute("SELECT productCode, constituantCode FROM constituantsValues LIMIT 1")
+    productCode, constituantCode = cursor.fetchone()
+    dictComponent = database.getInfoComponent(productCode, constituantCode)
+    cursor.close()
+
+    assert database.convertValuesToCompactLayout()
+    assert database.isCompactValuesLayout()
+    assert not database.convertValuesToCompactLayout()
+    cursor = database.connDB.cursor()
+    cursor.execute("SELECT COUNT(*) FROM constituantsValues")
+    assert cursor.fetchone()[0] == nbValues
+    cursor.close()
+    assert database.getInfoComponent(productCode, constituantCode) == dictComponent
+    assert "constituantsValuesLevelIdx" in getIndexNames(database)
+
+    databaseManager.closeDatabase()
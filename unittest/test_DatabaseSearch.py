@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_DatabaseSearch.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        Database searches : products names, filters on constituants
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+import sqlite3
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Copy demo database in a test directory without opening it """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager, demoDatabaseName
+
+def test_productsNamesIndex():
+    """ Test products names search ignoring case and accents with trigram index """
+    # Call init fixture
+    dummy, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    assert database.isProductsNamesIndexed
+
+    foodname = "Légumes, pur jus (aliment moyen)"
+    for part in ["légumes, pur", "LEGUMES, PUR", "gumes, p", "l?gumes*jus"]:
+        assert foodname in database.getProductsNamesContainingPart(part)
+    listFoodnamesIndexed = database.getProductsNamesContainingPart("jus")
+    database.isProductsNamesIndexed = False
+    assert database.getProductsNamesContainingPart("jus") == listFoodnamesIndexed
+    database.isProductsNamesIndexed = True
+
+    # Index updated by Database write methods
+    productName = "Jus Écrasé Test"
+    database.insertNewComposedProduct(productName, "New Family", 300.0, dict(),
+                                      [["Jus de fruits (aliment moyen)", 200.0],
+                                       [foodname, 100.0]])
+    assert database.getProductsNamesContainingPart("jus ecrase") == [productName]
+    database.deleteUserProduct(productName)
+    assert database.getProductsNamesContainingPart("jus ecrase") == []
+
+    databaseManager.closeDatabase()
+
+def test_getProductComponents4Filters():
+    """ Test search of products with several filters in one request """
+    # Call init fixture
+    dummy, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    listFilters = [[25000, ">=", 5.0, "Protein"], [40000, "<=", 2.0, "Lipid"],
+                   [25000, "<=", 20.0, "Protein"]]
+
+    # Reference result : products matching each filter
+    cursor = database.connDB.cursor()
+    setExpected = None
+    for constituantCode, selectedOperator, level, dummy in listFilters:
+        cursor.execute("""SELECT name FROM products, constituantsValues
+                          WHERE productCode=code AND constituantCode=? AND value""" +
+                       selectedOperator + "?", (constituantCode, level))
+        setNames = set(result[0] for result in cursor.fetchall())
+        setExpected = setNames if setExpected is None else setExpected & setNames
+    cursor.close()
+    assert len(setExpected) > 0
+
+    listProductsValues = database.getProductComponents4Filters(listFilters, 10000)
+    assert set(product for product, dummy in listProductsValues) == setExpected
+    for dummy, listQualifierValues in listProductsValues:
+        assert len(listQualifierValues) == 2
+        assert 5.0 <= listQualifierValues[0][1] <= 20.0
+        assert listQualifierValues[1][1] <= 2.0
+
+    # Result limited to nbMaxResults + 1
+    assert len(database.getProductComponents4Filters(listFilters, 1)) == 2
+    with pytest.raises(ValueError):
+        database.getProductComponents4Filters([[25000, "; DROP", 5.0, "Protein"]], 10)
+    with pytest.raises(ValueError):
+        database.getProductComponents4Filters([], 10)
+
+    databaseManager.closeDatabase()
+
+def test_constituantsStats():
+    """ Test constituants statistics and estimation of search results """
+    # Call init fixture
+    dummy, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+
+    cursor = database.connDB.cursor()
+    cursor.execute("""SELECT constituantCode, shortcut, unit, MIN(value), MAX(value)
+                      FROM constituantsValues
+                      INNER JOIN constituantsNames
+                      ON constituantsValues.constituantCode = constituantsNames.code
+                      GROUP BY constituantCode
+                      ORDER BY shortcut""")
+    assert database.getMinMaxForConstituants() == cursor.fetchall()
+
+    # Estimation of one filter is near real number of products
+    listFilters = [[25000, ">=", 5.0, "Protein"]]
+    cursor.execute("""SELECT COUNT(*) FROM constituantsValues
+                      WHERE constituantCode=25000 AND value >= 5.0""")
+    nbProducts = cursor.fetchone()[0]
+    nbEstimated = database.estimateNbProducts4Filters(listFilters)
+    assert abs(nbEstimated - nbProducts) <= 0.15 * nbProducts
+    assert database.getSelectivity4Filters([[25000, "<", -1.0, "Protein"]]) == [0.0]
+    assert database.getSelectivity4Filters([[-1, ">=", 0.0, "Unknown"]]) == [0.0]
+
+    # Statistics updated when a group is created
+    productName = "Stats Test Group"
+    database.insertNewComposedProduct(productName, "New Family", 300.0,
+                                      {25000: ['-', 1000.0]},
+                                      [["Jus de fruits (aliment moyen)", 200.0],
+                                       ["Légumes, pur jus (aliment moyen)", 100.0]])
+    cursor.execute("SELECT maxValue FROM constituantsStats WHERE constituantCode=25000")
+    assert cursor.fetchone()[0] == 1000.0
+    cursor.close()
+
+    database.deleteUserProduct(productName)
+    databaseManager.closeDatabase()
+
+def test_productsNamesModifiedByOtherProgram():
+    """ Test products can be modified without CalcAl SQL functions and are found """
+    # Call init fixture
+    dummy, databaseManager, demoDatabaseName = initEnv()
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    databasePath = database.getDatabasePath()
+    cursor = database.connDB.cursor()
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type='trigger'")
+    assert not [result for result in cursor.fetchall() if "foldName" in result[0]]
+    cursor.close()
+
+    # Other program without foldName() function
+    connDB = sqlite3.connect(databasePath)
+    connDB.execute("""INSERT INTO products(familyName, code, name, source, dateSource, urlSource)
+                      VALUES('Family', 999998, 'Pâté Externe Test', '', '', '')""")
+    connDB.commit()
+    assert database.getProductsNamesContainingPart("pate externe") == ["Pâté Externe Test"]
+    connDB.execute("UPDATE products SET name='Pâté Renommé Test' WHERE code=999998")
+    connDB.commit()
+    assert database.getProductsNamesContainingPart("pate externe") == []
+    assert database.getProductsNamesContainingPart("pate renomme") == ["Pâté Renommé Test"]
+    databaseManager.closeDatabase()
+
+    # Indexed when database is opened
+    databaseManager.openDatabase(demoDatabaseName)
+    database = databaseManager.getDatabase()
+    cursor = database.connDB.cursor()
+    cursor.execute("SELECT COUNT(*) FROM productsNamesIndexPending")
+    assert cursor.fetchone()[0] == 0
+    cursor.close()
+    assert database.getProductsNamesContainingPart("pate renomme") == ["Pâté Renommé Test"]
+    connDB.execute("DELETE FROM products WHERE code=999998")
+    connDB.commit()
+    connDB.close()
+    assert database.getProductsNamesContainingPart("pate renomme") == []
+    databaseManager.closeDatabase()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_DatabaseSnapshot.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        module DatabaseSnapshot : copies and backups with sqlite backup API
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+import sqlite3
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Open a copy of demo database """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+    databaseManager.openDatabase(demoDatabaseName)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager
+
+def test_copyOpenedDatabase():
+    """ Test copy of an opened database with modifications not checkpointed """
+    # Call init fixture
+    configApp, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    database.insertPortion(["Snapshot test", "2026/10/18", "XYZ004", "Ration", "Day", 1],
+                           [["Jus de fruits (aliment moyen)", 100.0]])
+    nbPortions = len(database.getPortions())
+
+    listProgress = []
+    databaseManager.copyDatabase(database.getDbname(), "snapshotcopy",
+                                 lambda *progress: listProgress.append(progress))
+    assert listProgress and listProgress[-1][0] == listProgress[-1][1]
+    with pytest.raises(ValueError):
+        databaseManager.copyDatabase(database.getDbname(), "snapshotcopy")
+
+    connCopy = sqlite3.connect(databaseManager.buildDbNamePath("snapshotcopy"))
+    assert connCopy.execute("SELECT COUNT(*) FROM portions").fetchone()[0] == nbPortions
+    assert connCopy.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    connCopy.close()
+    databaseManager.closeDatabase()
+    databaseManager.deleteDatabase("snapshotcopy")
+
+def test_rotatingBackups():
+    """ Test that only last backups are kept and a backup is made when closing """
+    # Call init fixture
+    configApp, databaseManager = initEnv()
+    dbName = databaseManager.getDatabase().getDbname()
+    nbRotatingBackups = int(configApp.get('Database', 'NbRotatingBackups'))
+    for backupPath in databaseManager.getListBackups(dbName):
+        os.remove(backupPath)
+
+    # Modified database saved when closed
+    databaseManager.getDatabase().insertPortion(["Backup test", "2026/10/18", "XYZ005",
+                                                 "Ration", "Day", 1],
+                                                [["Jus de fruits (aliment moyen)", 100.0]])
+    databaseManager.closeDatabase()
+    assert len(databaseManager.getListBackups(dbName)) == 1
+
+    # Not modified : no new backup
+    databaseManager.openDatabase(dbName)
+    databaseManager.closeDatabase()
+    assert len(databaseManager.getListBackups(dbName)) == 1
+
+    backupDirPath = os.path.dirname(databaseManager.getListBackups(dbName)[0])
+    for numBackup in range(nbRotatingBackups + 2):
+        # Older backups names
+        shutil.copyfile(databaseManager.getListBackups(dbName)[-1],
+                        os.path.join(backupDirPath,
+                                     os.path.splitext(dbName)[0] + "_2000010" + str(numBackup) +
+                                     "_000000.db"))
+    backupPath = databaseManager.backupDatabase(dbName)
+    listBackups = databaseManager.getListBackups(dbName)
+    assert len(listBackups) == nbRotatingBackups
+    assert listBackups[-1] == backupPath
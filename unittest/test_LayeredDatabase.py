@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_LayeredDatabase.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        layered database : read only reference file and user file
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import hashlib
+import os
+import os.path
+import shutil
+import sqlite3
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+from util import CalcalExceptions
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Create a layered database on a copy of demo database """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    # Reference file out of databases directory : never opened to be modified
+    referenceDirPath = os.path.join(baseTestDirPath, "reference")
+    if not os.path.exists(referenceDirPath):
+        os.mkdir(referenceDirPath)
+    referencePath = os.path.join(referenceDirPath, "reference.db")
+    shutil.copyfile(os.path.join(baseDirPath, configApp.get('Resources', 'DemoDatabaseName')),
+                    referencePath)
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+    if databaseManager.existsDatabase("layered"):
+        databaseManager.deleteDatabase("layered")
+
+    # Values returned to each test calling function
+    return databaseManager, referencePath
+
+def getFileHash(filePath):
+    """ Return hash of a file content """
+    with open(filePath, "rb") as fileToHash:
+        return hashlib.sha256(fileToHash.read()).hexdigest()
+
+def test_layeredDatabase():
+    """ Test requests read reference and user files, modifications are in user file """
+    # Call init fixture
+    databaseManager, referencePath = initEnv()
+    hashReference = getFileHash(referencePath)
+    databaseManager.createLayeredDatabase("layered", referencePath)
+    with pytest.raises(ValueError):
+        databaseManager.createLayeredDatabase("layered", referencePath)
+    databaseManager.openDatabase("layered.db")
+    database = databaseManager.getDatabase()
+    assert database.isLayered()
+    nbProducts = database.getInfoDatabase()["nbProducts"]
+    assert nbProducts > 0
+    assert database.getInfoDatabase()["nbConstituants"] > 0
+
+    # New group saved in user file
+    database.insertNewComposedProduct("Layered group", "New Family", 300.0, None,
+                                      [["Jus de fruits (aliment moyen)", 200.0],
+                                       ["Cidre (aliment moyen)", 100.0]])
+    with pytest.raises(ValueError):
+        database.insertNewComposedProduct("Cidre (aliment moyen)", "New Family", 300.0, None,
+                                          [["Jus de fruits (aliment moyen)", 200.0],
+                                           ["Cidre (aliment moyen)", 100.0]])
+    assert database.getInfoDatabase()["nbProducts"] == nbProducts + 1
+    cursor = database.connDB.cursor()
+    cursor.execute("SELECT name FROM main.products")
+    assert cursor.fetchall() == [("Layered group",)]
+    cursor.close()
+    assert "Layered group" in database.getListFoodstuffName("New Family")
+    assert database.getProductsNamesContainingPart("cidre") == ["Cidre (aliment moyen)"]
+    assert database.getProductsNamesContainingPart("layered") == ["Layered group"]
+
+    # Background readers see both files
+    readerDatabase = database.getReaderDatabase()
+    assert readerDatabase.getInfoDatabase()["nbProducts"] == nbProducts + 1
+    database.releaseReaderDatabase(readerDatabase)
+
+    database.insertPortion(["Layered portion", "2026/10/18", "", "Ration", "Day", 1],
+                           [["Layered group", 100.0], ["Cidre (aliment moyen)", 50.0]])
+    database.deleteUserProduct("Layered group")
+    databaseManager.closeDatabase()
+
+    assert getFileHash(referencePath) == hashReference
+    assert os.path.getsize(databaseManager.buildDbNamePath("layered")) < \
+        os.path.getsize(referencePath)
+
+def test_layeredEnergyCorrection():
+    """ Test energies of reference products are corrected in user file """
+    # Call init fixture
+    databaseManager, referencePath = initEnv()
+    configApp = databaseManager.configApp
+    energyCodes = (int(configApp.get('Energy', 'EnergyTotalKcalCode')),
+                   int(configApp.get('Energy', 'EnergyTotalKJCode')))
+    foodName = "Cidre (aliment moyen)"
+    connDB = sqlite3.connect(referencePath)
+    connDB.execute("""DELETE FROM constituantsValues
+                      WHERE constituantCode IN (?, ?) AND
+                            productCode = (SELECT code FROM products WHERE name=?)""",
+                   energyCodes + (foodName,))
+    connDB.commit()
+    connDB.close()
+    hashReference = getFileHash(referencePath)
+
+    databaseManager.createLayeredDatabase("layered", referencePath)
+    databaseManager.openDatabase("layered.db")
+    database = databaseManager.getDatabase()
+    cursor = database.connDB.cursor()
+    cursor.execute("""SELECT constituantCode FROM main.constituantsValues
+                      WHERE productCode = (SELECT code FROM products WHERE name=?)
+                      ORDER BY constituantCode""", (foodName,))
+    assert tuple(result[0] for result in cursor.fetchall()) == tuple(sorted(energyCodes))
+    cursor.close()
+    # Reference products are queued once
+    assert database.correctEnergyKcal() == 0
+    databaseManager.closeDatabase()
+    databaseManager.openDatabase("layered.db")
+    assert databaseManager.getDatabase().correctEnergyKcal() == 0
+    databaseManager.closeDatabase()
+    assert getFileHash(referencePath) == hashReference
+
+def test_referenceModified():
+    """ Test a reference file modified by another program is read again,
+        a database of databases directory can't be a reference """
+    # Call init fixture
+    databaseManager, referencePath = initEnv()
+    with pytest.raises(ValueError):
+        databaseManager.createLayeredDatabase("layered",
+                                              databaseManager.buildDbNamePath("reference"))
+    databaseManager.createLayeredDatabase("layered", referencePath)
+    databaseManager.openDatabase("layered.db")
+    database = databaseManager.getDatabase()
+    nbProducts = database.getInfoDatabase()["nbProducts"]
+
+    connDB = sqlite3.connect(referencePath)
+    connDB.execute("""INSERT INTO products(familyName, code, name, source, dateSource, urlSource)
+                      VALUES('Family', 999997, 'Added in reference', '', '', '')""")
+    connDB.commit()
+    connDB.close()
+    assert database.getInfoDatabase()["nbProducts"] == nbProducts + 1
+    databaseManager.closeDatabase()
+
+def test_missingReference():
+    """ Test a layered database can't be opened without its reference file """
+    # Call init fixture
+    databaseManager, referencePath = initEnv()
+    databaseManager.createLayeredDatabase("layered", referencePath)
+    os.remove(referencePath)
+    with pytest.raises(CalcalExceptions.DatabaseException):
+        databaseManager.openDatabase("layered.db")
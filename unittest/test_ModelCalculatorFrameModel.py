@@ -374,6 +374,9 @@ def test_groupFood():
 
     # Take a picture of model
     fullTableBeforeGroup = calculatorFrameModel.getFullTable()
+    dummy, totalQuantity, dictTotal = calculatorFrameModel.totalLine.getRawValue()
+    dictTotal = {codeComponent: list(qualifierQuantity)
+                 for codeComponent, qualifierQuantity in dictTotal.items()}
 
     # Group 2 foodstuffs
     familyName = "New Family"
@@ -391,6 +394,14 @@ def test_groupFood():
             approx(float(quantity1) + float(quantity2))
     assert fullTableBeforeGroup != fullTableAfterGroup
 
+    # V0.56 : values of group computed by database same as total line
+    productCode = database.getInfoFood(productName)["code"]
+    assert len(dictTotal) > 0
+    for codeComponent, qualifierQuantity in dictTotal.items():
+        dictComponent = database.getInfoComponent(productCode, codeComponent)
+        assert dictComponent["qualifValue"] == qualifierQuantity[0]
+        assert dictComponent["value"] == approx(qualifierQuantity[1] * 100.0 / totalQuantity)
+
     calculatorFrameModel.deleteFoodInModel([productName], True)
 
     # Close demo database
@@ -216,3 +216,32 @@ def test_addMissingComponents():
     assert name == foodname
     assert quantity == quantityR
     assert dictComponentValueFormated[unknownComponent] == "-"
+
+def test_initWithInfoFoodComponents():
+    """ Test constructor with values read by Database.getInfoFoodsComponents() """
+    # Call init fixture
+    configApp, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+
+    foodname = "Jus de fruits (aliment moyen)"
+    listFollowedComponents = [400, 10110, 54104]
+    quantity = 100.
+    dictInfoFoodsComponents = database.getInfoFoodsComponents([foodname, "Unknown food"],
+                                                              listFollowedComponents)
+    assert list(dictInfoFoodsComponents.keys()) == [foodname]
+    foodstuff = Foodstuff.Foodstuff(configApp, database,
+                                    foodname, quantity,
+                                    listFollowedComponents=listFollowedComponents,
+                                    infoFoodComponents=dictInfoFoodsComponents[foodname])
+
+    assert foodstuff.getData("code") == 2004
+    assert not foodstuff.getData("isGroup")
+    for codeComp in listFollowedComponents:
+        dictComponent = database.getInfoComponent(foodstuff.getData("code"), codeComp)
+        component = foodstuff.dictComponents[codeComp]
+        assert component.getData("value") == approx(dictComponent["value"])
+        assert component.getData("qualifValue") == dictComponent["qualifValue"]
+        assert component.getData("shortcut") == dictComponent["shortcut"]
+
+    # Close demo database
+    databaseManager.closeDatabase()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_NutrientMatrixCache.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        module NutrientMatrixCache : in memory cache of constituants values
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Open a copy of demo database with nutrient cache enabled """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+    configApp.set('Database', 'NutrientCacheEnabled', 'True')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+    databaseManager.openDatabase(demoDatabaseName)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager
+
+def callWithoutCache(database, methodName, *args):
+    """ Call a database method using SQL requests only """
+    nutrientCache = database.nutrientCache
+    database.nutrientCache = None
+    try:
+        result = getattr(database, methodName)(*args)
+    finally:
+        database.nutrientCache = nutrientCache
+    return result
+
+def test_cacheSameResultsAsDatabase():
+    """ Test that values read in cache are the same as those read in database """
+    # Call init fixture
+    dummy, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    assert database.getNutrientCache() is not None
+    assert database.getNutrientCache().isLoaded()
+
+    listFoodNames = ["Jus de fruits (aliment moyen)", "Légumes, pur jus (aliment moyen)",
+                     "Unknown food name"]
+    listComponentCodes = [code for code, dummy1, dummy2 in database.getListComponents()]
+    listComponentCodes.append(-1)
+    assert database.getInfoFoodsComponents(listFoodNames, listComponentCodes) == \
+           callWithoutCache(database, "getInfoFoodsComponents",
+                            listFoodNames, listComponentCodes)
+    assert database.getInfoComponent(2004, listComponentCodes[0]) == \
+           callWithoutCache(database, "getInfoComponent", 2004, listComponentCodes[0])
+
+    for familyName in database.getListFamilyFoodstuff()[:3]:
+        assert database.getListFoodstuffName(familyName) == \
+               callWithoutCache(database, "getListFoodstuffName", familyName)
+    assert database.getListFamilyFoodstuff() == \
+           callWithoutCache(database, "getListFamilyFoodstuff")
+    for part in ["jus", "Jus", "l?gumes", "LÉGUMES", "pur*"]:
+        assert database.getProductsNamesContainingPart(part) == \
+               callWithoutCache(database, "getProductsNamesContainingPart", part)
+
+    databaseManager.closeDatabase()
+
+def test_cachePatchedAndInvalidated():
+    """ Test that cache follows products inserted and deleted by user """
+    # Call init fixture
+    dummy, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    nutrientCache = database.getNutrientCache()
+
+    productName = "Jus Cache Test"
+    familyName = "New Family"
+    listComponentCodes = [code for code, dummy1, dummy2 in database.getListComponents()][:2]
+    dictComponentsQualifierQuantity = {listComponentCodes[0]: ['-', 12.5]}
+    database.insertNewComposedProduct(productName, familyName, 300.0,
+                                      dictComponentsQualifierQuantity,
+                                      [["Jus de fruits (aliment moyen)", 200.0],
+                                       ["Légumes, pur jus (aliment moyen)", 100.0]])
+    assert nutrientCache.isLoaded()
+    assert database.existFoodstuffName(productName)
+    assert database.getInfoFoodsComponents([productName], listComponentCodes) == \
+           callWithoutCache(database, "getInfoFoodsComponents",
+                            [productName], listComponentCodes)
+
+    database.deleteUserProduct(productName)
+    assert not nutrientCache.isLoaded()
+    assert not database.existFoodstuffName(productName)
+    assert nutrientCache.isLoaded()
+
+    databaseManager.closeDatabase()
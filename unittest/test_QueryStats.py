@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Name : test_QueryStats.py
+    Author : Thierry Maillard (TMD)
+    Date : 18/10/2026
+    Role : Tests unitaires du projet Calcal avec py.test
+        module QueryStats : measurement of SQL requests
+    Use : See unittest.sh
+
+    Licence : GPLv3
+    Copyright (c) 2015 - Thierry Maillard
+
+    This file is part of Calcal project.
+
+    Calcal project is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Calcal project is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Calcal project.  If not, see <http://www.gnu.org/licenses/>.
+    """
+import configparser
+import os
+import os.path
+import shutil
+import sqlite3
+
+import pytest
+
+import CalcAl
+from database import DatabaseManager
+
+# Code to execute before and at the end of all test
+@pytest.fixture(scope="session")
+def initEnv():
+    """ Code to be executed when called by test function
+        Open a copy of demo database """
+    fileConfigApp = 'CalcAl.ini'
+    configApp = configparser.RawConfigParser()
+    configApp.read(fileConfigApp, encoding="utf-8")
+    CalcAl.setLocaleCalcal(configApp, '.')
+    configApp.set('Database', 'QueryStatsEnabled', 'True')
+
+    baseDirPath = os.path.join(configApp.get('Resources', 'ResourcesDir'),
+                               configApp.get('Resources', 'DatabaseDir'))
+    baseTestDirPath = os.path.join(baseDirPath, "test")
+    if not os.path.exists(baseTestDirPath):
+        os.mkdir(baseTestDirPath)
+    demoDatabaseName = configApp.get('Resources', 'DemoDatabaseName')
+    shutil.copyfile(os.path.join(baseDirPath, demoDatabaseName),
+                    os.path.join(baseTestDirPath, demoDatabaseName))
+
+    databaseManager = DatabaseManager.DatabaseManager(configApp, '.', baseTestDirPath)
+    databaseManager.openDatabase(demoDatabaseName)
+
+    # Values returned to each test calling function
+    return configApp, databaseManager
+
+def test_getQueryStats():
+    """ Test counters of SQL requests by Database method """
+    # Call init fixture
+    dummy, databaseManager = initEnv()
+    database = databaseManager.getDatabase()
+    database.resetQueryStats()
+    assert database.getQueryStats() == dict()
+
+    listFoodNames = ["Jus de fruits (aliment moyen)", "Légumes, pur jus (aliment moyen)"]
+    database.getInfoFoodsComponents(listFoodNames, [25000, 40000])
+    database.getInfoFoodsComponents(listFoodNames[:1], [25000])
+    database.getListFamilyFoodstuff()
+    dictStats = database.getQueryStats()
+    assert dictStats["getInfoFoodsComponents"]["calls"] == 2
+    assert dictStats["getInfoFoodsComponents"]["rows"] == 2 * 2 + 1
+    assert dictStats["getInfoFoodsComponents"]["maxTime"] <= \
+           dictStats["getInfoFoodsComponents"]["totalTime"]
+    assert dictStats["getListFamilyFoodstuff"]["rows"] > 0
+
+    # Requests executed by background readers are counted too
+    readerDatabase = database.getReaderDatabase()
+    try:
+        readerDatabase.getListFamilyFoodstuff()
+    finally:
+        database.releaseReaderDatabase(readerDatabase)
+    assert database.getQueryStats()["getListFamilyFoodstuff"]["calls"] == 2
+    databaseManager.closeDatabase()
+
+def test_slowQueryLog(caplog):
+    """ Test that requests slower than SlowQueryMs are logged """
+    # Call init fixture
+    configApp, databaseManager = initEnv()
+    slowQueryMs = configApp.get('Database', 'SlowQueryMs')
+    configApp.set('Database', 'SlowQueryMs', '-1')
+    databaseManager.closeDatabase()
+    databaseManager.openDatabase(configApp.get('Resources', 'DemoDatabaseName'))
+    configApp.set('Database', 'SlowQueryMs', slowQueryMs)
+    database = databaseManager.getDatabase()
+    database.getListFamilyFoodstuff()
+    assert "Slow SQL request in getListFamilyFoodstuff" in caplog.text
+    databaseManager.closeDatabase()
+
+def test_queryStatsDisabled():
+    """ Test connections are not instrumented when QueryStatsEnabled is False """
+    # Call init fixture
+    configApp, databaseManager = initEnv()
+    databaseManager.closeDatabase()
+    configApp.set('Database', 'QueryStatsEnabled', 'False')
+    try:
+        databaseManager.openDatabase(configApp.get('Resources', 'DemoDatabaseName'))
+        database = databaseManager.getDatabase()
+        database.getListFamilyFoodstuff()
+        assert database.getQueryStats() == dict()
+        assert type(database.connDB) is sqlite3.Connection
+    finally:
+        configApp.set('Database', 'QueryStatsEnabled', 'True')
+        databaseManager.closeDatabase()
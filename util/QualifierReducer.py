@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+************************************************************************************
+Class : QualifierReducer
+Author : Thierry Maillard (TMD)
+Date : 18/10/2026
+
+Role : Reduce qualifiers of values summed in a total to one qualifier.
+
+Rules are read in config file section [QualifValue].
+Used by TotalLine and registered as SQL function reduceQualifier(qualifiers, value)
+on each connection of a database so that totals can be computed by sqlite.
+
+Licence : GPLv3
+Copyright (c) 2016 - Thierry Maillard
+
+This file is part of CalcAl project.
+
+CalcAl project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CalcAl project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CalcAl project.  If not, see <http://www.gnu.org/licenses/>.
+************************************************************************************
+"""
+from util import CalcalExceptions
+
+class QualifierReducer():
+    """ Qualifiers reduction rules """
+    def __init__(self, configApp):
+        self.configApp = configApp
+        # table for qualification reduction rules
+        self.qRulesS = self.configApp.get('QualifValue', 'QRulesS').split(";")
+        self.qRules0 = self.configApp.get('QualifValue', 'QRules0').split(";")
+        self.qRulesO = self.configApp.get('QualifValue', 'QRulesO').split(";")
+        self.near0 = float(self.configApp.get("Limits", "near0"))
+
+    def reduce(self, qualif2Reduce, value):
+        """ Reduce qualif2Reduce expression by applying rules read in config file """
+        qualifResult = "".join(set(qualif2Reduce))
+        nbReduction = 0
+        while nbReduction < 5 and len(qualifResult) > 1:
+            # Apply rules
+            if value >= self.near0:
+                qRule2apply = self.qRulesS
+            else: # For value near 0
+                qRule2apply = self.qRules0
+            qRule2apply = qRule2apply + self.qRulesO
+            for rule in qRule2apply:
+                if rule[0] in qualifResult and rule[1] in qualifResult:
+                    qualifResult = qualifResult.replace(rule[0], rule[2])
+                    qualifResult = qualifResult.replace(rule[1], rule[2])
+                qualifResult = "".join(set(qualifResult))
+            nbReduction = nbReduction + 1
+        if nbReduction >= 5:
+            raise CalcalExceptions.CalcalInternalError(self.configApp,
+                                                       "reducQualifier don't converge : " +
+                                                       qualif2Reduce +
+                                                       " can't be reduce : " + qualifResult +
+                                                       ". Check config/[QualifValue]/QRules")
+        return qualifResult
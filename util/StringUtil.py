@@ -0,0 +1,18 @@
+"""
+************************************************************************************
+Class : StringUtil
+Role : Utilities to compare strings
+Date : 18/10/2026
+************************************************************************************
+"""
+import unicodedata
+
+def foldName(name):
+    """ Return name without accents and in lower case
+        used to compare products names ignoring case and accents
+        Wildcards * and ? are kept unchanged """
+    if name is None:
+        return None
+    decomposedName = unicodedata.normalize('NFKD', name)
+    return "".join(car for car in decomposedName
+                   if not unicodedata.combining(car)).casefold()